@@ -13,7 +13,7 @@ from geopandas import GeoDataFrame
 from mapmatching import ST_Matching
 from mapmatching.graph import GeoDigraph
 
-from maptools.trajectory import Trajectory
+from maptools.trajectory import Trajectory, TrajectoryCollection
 from maptools.geo.linestring import merge_linestrings
 
 # local debug
@@ -348,23 +348,26 @@ def plot_matching_result(traj:Trajectory, matcher: ST_Matching, res:dict, title:
         
     return fig, ax
 
-def pipeline(pts, traj_id, dist_eps=CELL_SERVICE_RADIUS, plot=False, save_img=None, title='', verbose=False):
+PREPROCESS_PARAMS = dict(
+    radius = UPDATE_RADIUS, 
+    speed_limit = SPEED_LIMIT, 
+    dis_limit = DISTANCE_LIMIT, 
+    angle_limit = ANGLE_LIMIT, 
+    alpha = DRIFT_ALPHA, 
+    tolerance = SIMPLIFY_TOLERANCE,
+    strict = False, 
+    verbose = False, 
+)
+
+def pipeline(pts, traj_id, dist_eps=CELL_SERVICE_RADIUS, plot=False, save_img=None, title='', verbose=False,
+             traj=None):
     global lineid_2_waitingtime, matcher
 
-    # step 1: preprocess
-    traj = Trajectory(pts, traj_id=traj_id, traj_id_col='traj_id', utm_crs=UTM_CRS, t='dt')
+    # step 1: preprocess, skipped when a preprocessed `traj` (e.g. from `TrajectoryCollection`) is given
+    if traj is None:
+        traj = Trajectory(pts, traj_id=traj_id, traj_id_col='traj_id', utm_crs=UTM_CRS, t='dt')
+        traj.preprocess(**PREPROCESS_PARAMS, plot=False)
     res = {'traj': traj, 'match_res': {}}
-    traj.preprocess(
-        radius = UPDATE_RADIUS, 
-        speed_limit = SPEED_LIMIT, 
-        dis_limit = DISTANCE_LIMIT, 
-        angle_limit = ANGLE_LIMIT, 
-        alpha = DRIFT_ALPHA, 
-        tolerance = SIMPLIFY_TOLERANCE,
-        strict = False, 
-        verbose = False, 
-        plot = False
-    )
 
     # step 2: map-matching
     match_res = matcher.matching(traj.points, simplify = False)
@@ -485,12 +488,15 @@ def exp(trajs, out_folder=None, save_imgs=True, debug=False):
     matching_lst = []
     raw_points_lst = []
     
-    for traj_id, pts in trajs.groupby('traj_id'):
+    # preprocess all trajectories at once
+    collection = TrajectoryCollection(trajs, traj_id_col='traj_id', t='dt', utm_crs=UTM_CRS)
+    collection.preprocess(**PREPROCESS_PARAMS)
+
+    for traj_id, traj in collection.items():
         fn_name = traj_id
-        pts.reset_index(drop=True, inplace=True)
 
         # try:
-        result = pipeline(pts, traj_id=traj_id, plot=save_imgs, title=f"traj_id: {traj_id}")
+        result = pipeline(None, traj_id=traj_id, plot=save_imgs, title=f"traj_id: {traj_id}", traj=traj)
         if 'match_res' not in result:
             result['match_res'] = {'probs': {'norm_prob': 0}}
         # except:
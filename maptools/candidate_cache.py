@@ -0,0 +1,235 @@
+import os
+import sqlite3
+import shapely
+import numpy as np
+import geopandas as gpd
+from pathlib import Path
+from loguru import logger
+from collections import OrderedDict
+
+from .query import _prepare_query_object, ensure_spatial_index, query_spatial_index, \
+    grouped_top_k, build_candidates
+from .geo.spatial_index import network_fingerprint
+
+
+class CandidateCache:
+    """
+    `find_nearest_geometries` 的候选缓存，适用于基站轨迹这类大量重复的查询坐标.
+
+    - 查询点的投影坐标按 `precision` 量化为格网 (floor(x / precision), floor(y / precision))，
+      以 (格网, radius, top_k) 为键缓存候选边在 `geometries` 中的位置，内存中为容量 `maxsize` 的 LRU；
+    - 设置 `cache_dir` 后，未命中内存的键再查询 `cache_dir/candidates.sqlite`，供并行的 worker 共享；
+    - 缓存的是格网中心以 radius + ε（ε 为格网的半对角线）检索、并按 k-th 距离 + 2ε 截断的候选超集，
+      命中后仍按查询点的精确距离过滤、选取 top-k，因此结果与直接调用 `find_nearest_geometries` 一致；
+    - 键带有路网的版本（`network_fingerprint`），checkpoint 变化时自动失效，旧版本的磁盘记录随之清除.
+
+    Example:
+    >>> cache = CandidateCache(df_edges, precision=1, cache_dir='./cache', ckpt='./cache/network.ckpt')
+    >>> cands, _ = cache.find_nearest_geometries(traj.points, query_id='pid', max_distance=500, top_k=8)
+    >>> cache.stats, cache.hit_rate
+    """
+
+    def __init__(self, geometries, precision=1.0, maxsize=100_000, cache_dir=None, ckpt=None,
+                 way_id=None, sindex=None):
+        assert geometries.crs is not None and geometries.crs.is_projected, "geometries must be in a projected crs"
+        self.precision = float(precision)
+        self.maxsize = maxsize
+        self.cache_dir = Path(cache_dir) if cache_dir is not None else None
+        self.way_id = way_id
+        self.sindex = sindex
+
+        self._memory = OrderedDict()
+        self._conn, self._pid = None, None
+        self.stats = {'hits': 0, 'disk_hits': 0, 'misses': 0}
+        self.set_network(geometries, ckpt)
+
+    def __getstate__(self):
+        # sqlite 连接不能跨进程共享，worker 中重新连接
+        state = self.__dict__.copy()
+        state['_conn'], state['_pid'] = None, None
+        return state
+
+    @property
+    def hit_rate(self):
+        total = sum(self.stats.values())
+        return (self.stats['hits'] + self.stats['disk_hits']) / total if total else 0.0
+
+    def set_network(self, geometries, ckpt=None):
+        """
+        绑定路网，版本变化时清空缓存.
+        """
+        self.geometries = geometries
+        self.ckpt = ckpt
+        self._set_version(network_fingerprint(geometries, ckpt))
+
+    def _set_version(self, fingerprint):
+        version = f"{fingerprint}:{self.precision}:{self.way_id}"
+        if version == getattr(self, 'version', None):
+            return
+        self.version = version
+        self._memory.clear()
+        if self.cache_dir is not None:
+            conn = self._connect()
+            with conn:
+                conn.execute("DELETE FROM cands WHERE version != ?", (self.version, ))
+
+    def check_network(self):
+        """
+        checkpoint 变化（重新保存）时使缓存失效.
+        """
+        if self.ckpt is None:
+            return False
+        fingerprint = network_fingerprint(self.geometries, self.ckpt)
+        if f"{fingerprint}:{self.precision}:{self.way_id}" == self.version:
+            return False
+
+        logger.warning(f"Network checkpoint {self.ckpt} changed, the candidate cache is invalidated.")
+        self._set_version(fingerprint)
+        return True
+
+    def clear(self):
+        self._memory.clear()
+        if self.cache_dir is not None:
+            conn = self._connect()
+            with conn:
+                conn.execute("DELETE FROM cands")
+        for key in self.stats:
+            self.stats[key] = 0
+
+    def _connect(self):
+        if self._conn is None or self._pid != os.getpid():
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(self.cache_dir / 'candidates.sqlite', timeout=60)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS cands "
+                               "(version TEXT, key TEXT, edges BLOB, PRIMARY KEY (version, key))")
+            self._pid = os.getpid()
+
+        return self._conn
+
+    def _put(self, key, edges):
+        edges.flags.writeable = False
+        self._memory[key] = edges
+        if len(self._memory) > self.maxsize:
+            self._memory.popitem(last=False)
+
+    def _search(self, cells, radius, top_k):
+        """以格网中心检索候选超集，返回每个格网的候选边位置"""
+        eps = self.precision * np.sqrt(2) / 2
+        centers = gpd.GeoSeries(shapely.points((cells + 0.5) * self.precision), crs=self.geometries.crs)
+        if self.sindex is None:
+            ensure_spatial_index(self.geometries)
+        cands = query_spatial_index(centers, self.geometries, radius + eps, 'dwithin', self.sindex)
+        dists = shapely.distance(np.asarray(centers.values, dtype=object)[cands[0]],
+                                 np.asarray(self.geometries.geometry.values, dtype=object)[cands[1]])
+
+        thres = np.full(len(cells), radius + eps)
+        if top_k:
+            # 查询点的 top-k 都在格网中心的 k-th 距离 + 2ε 以内
+            ways = self.geometries[self.way_id].values[cands[1]] if self.way_id is not None else None
+            rows = grouped_top_k(cands[0], dists, top_k, ways)
+            n_sel = np.bincount(cands[0][rows], minlength=len(cells))
+            kth = np.full(len(cells), -np.inf)
+            np.maximum.at(kth, cands[0][rows], dists[rows])
+            full = n_sel >= top_k
+            thres[full] = np.minimum(thres[full], kth[full] + 2 * eps)
+
+        keep = dists <= thres[cands[0]]
+        q_idx, t_idx = cands[0][keep], cands[1][keep]
+        order = np.argsort(q_idx, kind='stable')
+
+        return np.split(t_idx[order].astype(np.int64), np.cumsum(np.bincount(q_idx, minlength=len(cells)))[:-1])
+
+    def query(self, geoms, radius, top_k=None):
+        """
+        返回与 `query_spatial_index` 相同格式的 (2, M) 候选对（radius + ε 内的超集）.
+        """
+        geoms = np.asarray(geoms, dtype=object)
+        assert shapely.get_type_id(geoms).max(initial=0) == 0, "only Point queries are cached"
+        xy = np.column_stack([shapely.get_x(geoms), shapely.get_y(geoms)])
+        cells, inverse = np.unique(np.floor(xy / self.precision).astype(np.int64), axis=0, return_inverse=True)
+        inverse = inverse.ravel()
+
+        keys = [f"{cx},{cy},{radius},{top_k}" for cx, cy in cells.tolist()]
+        edges = [None] * len(keys)
+        for i, key in enumerate(keys):
+            res = self._memory.get(key)
+            if res is not None:
+                self._memory.move_to_end(key)
+                edges[i] = res
+        missing = [i for i, res in enumerate(edges) if res is None]
+        self.stats['hits'] += len(keys) - len(missing)
+        if missing and self.cache_dir is not None:
+            conn = self._connect()
+            found = {}
+            for start in range(0, len(missing), 500):
+                chunk = [keys[i] for i in missing[start: start + 500]]
+                rows = conn.execute(f"SELECT key, edges FROM cands WHERE version = ? AND key IN "
+                                    f"({','.join('?' * len(chunk))})", (self.version, *chunk))
+                found.update({key: np.frombuffer(blob, dtype=np.int64) for key, blob in rows})
+            for i in missing:
+                if keys[i] in found:
+                    edges[i] = found[keys[i]]
+                    self._put(keys[i], edges[i])
+            self.stats['disk_hits'] += len(found)
+            missing = [i for i in missing if edges[i] is None]
+
+        if missing:
+            self.stats['misses'] += len(missing)
+            for i, res in zip(missing, self._search(cells[missing], radius, top_k)):
+                edges[i] = res
+                self._put(keys[i], res)
+            if self.cache_dir is not None:
+                conn = self._connect()
+                with conn:
+                    conn.executemany("INSERT OR REPLACE INTO cands VALUES (?, ?, ?)",
+                                     [(self.version, keys[i], edges[i].tobytes()) for i in missing])
+
+        # 格网的候选展开到每个查询点
+        counts = np.array([len(res) for res in edges], dtype=np.int64)
+        offsets = np.concatenate([[0], np.cumsum(counts)])
+        flat = np.concatenate(edges) if edges else np.empty(0, dtype=np.int64)
+        n_pts = counts[inverse]
+        q_idx = np.repeat(np.arange(len(geoms)), n_pts)
+        local = np.arange(n_pts.sum()) - np.repeat(np.cumsum(n_pts) - n_pts, n_pts)
+
+        return np.vstack([q_idx, flat[np.repeat(offsets[inverse], n_pts) + local]])
+
+    def find_nearest_geometries(self, query_point, query_id='qid', max_distance=50, top_k=None,
+                                check_diff=False, project=False, keep_geom=True):
+        """
+        与 `find_nearest_geometries(query_point, self.geometries, ...)`（'dwithin' 谓词）相同的结果.
+        """
+        self.check_network()
+        query = _prepare_query_object(query_point, query_id, self.geometries.crs)
+        cands = self.query(query.values, max_distance, top_k)
+        if len(cands[0]) == 0:
+            return None, None
+
+        return build_candidates(query, self.geometries, cands, query_id, max_distance, top_k,
+                                check_diff, project, keep_geom, self.way_id)
+
+
+if __name__ == "__main__":
+    import time
+    import tempfile
+    from .query import find_nearest_geometries
+
+    rng = np.random.default_rng(0)
+    starts = rng.uniform(0, 50_000, (200_000, 2))
+    edges = gpd.GeoDataFrame(geometry=shapely.linestrings(np.stack([starts, starts + rng.normal(0, 200, (200_000, 2))], 1)),
+                             crs=32649)
+    # 5000 个基站，20 万个轨迹点
+    towers = rng.uniform(0, 50_000, (5_000, 2))
+    pts = gpd.GeoDataFrame(geometry=shapely.points(towers[rng.integers(0, 5_000, 200_000)]), crs=32649)
+
+    start = time.perf_counter()
+    ans, _ = find_nearest_geometries(pts, edges, max_distance=500, top_k=8)
+    print(f"find_nearest_geometries: {time.perf_counter() - start:.2f} s")
+
+    cache = CandidateCache(edges, cache_dir=tempfile.mkdtemp())
+    for i in range(2):
+        start = time.perf_counter()
+        res, _ = cache.find_nearest_geometries(pts, max_distance=500, top_k=8)
+        print(f"CandidateCache round {i}: {time.perf_counter() - start:.2f} s, stats: {cache.stats}, "
+              f"same result: {res[['qid', 'dist_p2c']].equals(ans[['qid', 'dist_p2c']])}")
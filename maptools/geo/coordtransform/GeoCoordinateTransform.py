@@ -1,45 +1,233 @@
+import shapely
+import numpy as np
+import pandas as pd
 import geopandas as gpd
-from shapely.geometry import Point, LineString, Polygon
-from shapely.ops import transform
-from coordtransform import gcj_to_wgs
-from coordTransform_py import wgs84_to_gcj02 as wgs_to_gcj
-
-def convert_point(point, convert_func):
-    return Point(convert_func(point.x, point.y))
-
-def convert_line(line, convert_func):
-    return LineString([convert_point(pt, convert_func) for pt in line.coords])
-
-def convert_polygon(polygon, convert_func):
-    exterior = convert_line(polygon.exterior, convert_func)
-    interiors = [convert_line(interior, convert_func) for interior in polygon.interiors]
-    return Polygon(exterior, interiors)
-
-def transform_geometry(geometry, convert_func):
-    if isinstance(geometry, Point):
-        return convert_point(geometry, convert_func)
-    elif isinstance(geometry, LineString):
-        return convert_line(geometry, convert_func)
-    elif isinstance(geometry, Polygon):
-        return convert_polygon(geometry, convert_func)
-    else:
-        raise ValueError("不支持的几何类型")
+from functools import lru_cache
+from pyproj import CRS, Transformer
+
+from . import coordTransform_np as ct_np
+from .coordTransform_py import gcj02_to_wgs84 as gcj_to_wgs
+from .coordTransform_py import wgs84_to_gcj02 as wgs_to_gcj
+
+
+COORD_SYS_ALIASES = {
+    'wgs': 'wgs', 'wgs84': 'wgs', 'WGS-84': 'wgs', 'WGS84': 'wgs',
+    'gcj': 'gcj', 'gcj02': 'gcj', 'GCJ-02': 'gcj', 'GCJ02': 'gcj',
+    'bd': 'bd', 'bd09': 'bd', 'BD-09': 'bd', 'BD09': 'bd',
+}
+
+VECTORIZED_CONVERTERS = {
+    ('wgs', 'gcj'): ct_np.wgs84_to_gcj02,
+    ('wgs', 'bd'): ct_np.wgs84_to_bd09,
+    ('gcj', 'wgs'): ct_np.gcj02_to_wgs84,
+    ('gcj', 'bd'): ct_np.gcj02_to_bd09,
+    ('bd', 'wgs'): ct_np.bd09_to_wgs84,
+    ('bd', 'gcj'): ct_np.bd09_to_gcj02,
+}
+
+
+def parse_coord_sys(crs):
+    """
+    将 'WGS-84' / 'GCJ-02' / 'BD-09' 等写法统一为 'wgs' / 'gcj' / 'bd'，无法识别时返回 None
+    """
+    if isinstance(crs, str):
+        return COORD_SYS_ALIASES.get(crs, None)
+
+    return None
 
 def coordinate_converter(source_crs, target_crs):
     """
-    返回一个转换函数，该函数根据源坐标系和目标坐标系进行转换。
-    您需要根据您的具体转换逻辑来实现这个函数。
+    返回一个标量转换函数，该函数根据源坐标系和目标坐标系进行转换。
     """
-    # 示例：假设您有 gcj_to_wgs 和 wgs_to_gcj 等函数
-    if source_crs == 'GCJ-02' and target_crs == 'WGS-84':
+    src, dst = parse_coord_sys(source_crs), parse_coord_sys(target_crs)
+    if src == 'gcj' and dst == 'wgs':
         return gcj_to_wgs
-    elif source_crs == 'WGS-84' and target_crs == 'GCJ-02':
+    elif src == 'wgs' and dst == 'gcj':
         return wgs_to_gcj
-    # 添加更多的条件以支持不同的转换
     else:
         raise ValueError("不支持的坐标系转换")
 
+def get_coords_converter(source_crs, target_crs):
+    """
+    返回一个向量化的转换函数：输入 (N, 2) 的坐标数组，输出 (N, 2) 的坐标数组，可直接用于 `shapely.transform`。
+
+    Args:
+        source_crs (str): 源坐标系, 'wgs' / 'gcj' / 'bd'.
+        target_crs (str): 目标坐标系, 'wgs' / 'gcj' / 'bd'.
+
+    Returns:
+        Function: (N, 2) ndarray -> (N, 2) ndarray
+    """
+    src, dst = parse_coord_sys(source_crs), parse_coord_sys(target_crs)
+    if src is None or dst is None:
+        raise ValueError(f"不支持的坐标系转换: {source_crs} -> {target_crs}")
+    if src == dst:
+        return lambda coords: coords
+
+    convert_func = VECTORIZED_CONVERTERS[(src, dst)]
+
+    def _convert(coords):
+        xs, ys = convert_func(coords[:, 0], coords[:, 1])
+        return np.column_stack([xs, ys])
+
+    return _convert
+
+def transform_geometries(geoms, source_crs, target_crs):
+    """
+    转换几何对象的坐标系。所有几何的顶点通过 `shapely.transform` 一次性取出，经向量化函数转换后写回，
+    支持任意混合的 Point、LineString、Polygon（含内环）以及 Multi* / GeometryCollection 类型。
+
+    Args:
+        geoms (gpd.GeoSeries | np.ndarray | BaseGeometry): 待转换的几何对象.
+        source_crs (str): 源坐标系, 'wgs' / 'gcj' / 'bd'.
+        target_crs (str): 目标坐标系, 'wgs' / 'gcj' / 'bd'.
+
+    Returns:
+        与输入同类型的几何对象，GeoSeries 保留原有的 index 与 crs.
+    """
+    convert_func = get_coords_converter(source_crs, target_crs)
+    if isinstance(geoms, gpd.GeoSeries):
+        res = shapely.transform(np.asarray(geoms.values, dtype=object), convert_func)
+        return gpd.GeoSeries(res, index=geoms.index, crs=geoms.crs, name=geoms.name)
+
+    return shapely.transform(geoms, convert_func)
+
 def convert_geodf_coordinates(geodf, source_crs, target_crs):
-    convert_func = coordinate_converter(source_crs, target_crs)
-    geodf['geometry'] = geodf['geometry'].apply(lambda geom: transform_geometry(geom, convert_func))
+    geom_col = geodf.geometry.name
+    geodf[geom_col] = transform_geometries(geodf.geometry, source_crs, target_crs)
+
     return geodf
+
+
+@lru_cache(maxsize=128)
+def _get_transformer(source_crs, target_crs):
+    return Transformer.from_crs(source_crs, target_crs, always_xy=True)
+
+def get_transformer(source_crs, target_crs):
+    """
+    获取缓存的 pyproj Transformer（always_xy=True），相同的 (source_crs, target_crs) 只创建一次.
+    """
+    return _get_transformer(CRS.from_user_input(source_crs), CRS.from_user_input(target_crs))
+
+
+class CoordTransformPipeline:
+    """
+    将 GCJ-02 / BD-09 / WGS-84 与任意 pyproj 支持的投影（如 EPSG 编码）串联成一个向量化的坐标转换函数，
+    几何对象的顶点只需取出、写回一次。例如 'gcj' -> 32649 依次执行 gcj -> wgs 与 4326 -> 32649.
+
+    GCJ-02 与 BD-09 并非 pyproj 可识别的 CRS，转换结果的 `crs` 按仓库惯例标记为 EPSG:4326.
+
+    Example:
+    >>> pipeline = CoordTransformPipeline('gcj', 32649)
+    >>> xy = pipeline(coords)
+    >>> geoms = pipeline.transform(gdf.geometry)
+    """
+
+    def __init__(self, source_crs, target_crs):
+        self.source_crs = source_crs
+        self.target_crs = target_crs
+
+        src, dst = parse_coord_sys(source_crs), parse_coord_sys(target_crs)
+        if src is not None and dst is not None:
+            # 两端均为 wgs / gcj / bd 时直接转换（相同时原样返回），不经过 GCJ 逆变换的近似
+            self.pre = get_coords_converter(src, dst) if src != dst else None
+            self.post = None
+        else:
+            self.pre = get_coords_converter(src, 'wgs') if src not in (None, 'wgs') else None
+            self.post = get_coords_converter('wgs', dst) if dst not in (None, 'wgs') else None
+
+        src_crs = CRS.from_user_input(4326 if src is not None else source_crs)
+        dst_crs = CRS.from_user_input(4326 if dst is not None else target_crs)
+        self.crs = dst_crs
+        self.transformer = get_transformer(src_crs, dst_crs) if src_crs != dst_crs else None
+
+    def __call__(self, coords):
+        if self.pre is not None:
+            coords = self.pre(coords)
+        if self.transformer is not None:
+            xs, ys = self.transformer.transform(coords[:, 0], coords[:, 1])
+            coords = np.column_stack([xs, ys])
+        if self.post is not None:
+            coords = self.post(coords)
+
+        return coords
+
+    def transform(self, geoms):
+        """
+        转换几何对象，GeoSeries 保留原有的 index，并设置为目标 crs.
+        """
+        if isinstance(geoms, gpd.GeoSeries):
+            res = shapely.transform(np.asarray(geoms.values, dtype=object), self)
+            return gpd.GeoSeries(res, index=geoms.index, crs=self.crs, name=geoms.name)
+
+        return shapely.transform(geoms, self)
+
+
+def to_crs(data, crs, source_crs=None, inplace=False):
+    """
+    `GeoDataFrame.to_crs` 的扩展版本，支持 'wgs' / 'gcj' / 'bd' 作为源/目标坐标系，单次遍历完成转换.
+
+    Args:
+        data (gpd.GeoDataFrame | gpd.GeoSeries): 待转换数据.
+        crs: 目标坐标系, 'wgs' / 'gcj' / 'bd' 或任意 pyproj 可识别的 CRS.
+        source_crs (optional): 源坐标系, 默认为 `data.crs`. 数据为 GCJ-02 / BD-09 坐标时需显式指定.
+        inplace (bool, optional): 是否原地修改. Defaults to False.
+
+    Returns:
+        转换后的数据, inplace 时返回 None.
+    """
+    if source_crs is None:
+        source_crs = data.crs
+    if source_crs is None:
+        raise ValueError("Cannot transform naive geometries. Please set a crs or `source_crs` first.")
+
+    pipeline = CoordTransformPipeline(source_crs, crs)
+    if isinstance(data, gpd.GeoSeries):
+        if inplace:
+            raise ValueError("`inplace` is not supported for GeoSeries.")
+        return pipeline.transform(data)
+
+    geoms = pipeline.transform(data.geometry)
+    if not inplace:
+        data = data.copy()
+    data[data.geometry.name] = geoms
+    data.set_crs(pipeline.crs, allow_override=True, inplace=True)
+
+    return None if inplace else data
+
+
+class CoordTransformAccessor:
+    """
+    GeoSeries / GeoDataFrame 的 `ct` 访问器.
+
+    Example:
+    >>> gdf.ct.to_crs('wgs', source_crs='gcj')
+    >>> gdf.ct.to_crs(gdf.estimate_utm_crs(), source_crs='gcj')
+    """
+
+    def __init__(self, obj):
+        self._obj = obj
+
+    def to_crs(self, crs, source_crs=None, inplace=False):
+        return to_crs(self._obj, crs, source_crs, inplace)
+
+
+pd.api.extensions.register_series_accessor('ct')(CoordTransformAccessor)
+pd.api.extensions.register_dataframe_accessor('ct')(CoordTransformAccessor)
+
+
+if __name__ == "__main__":
+    import time
+    from shapely import LineString, MultiPolygon, Point, Polygon
+
+    n = 500_000
+    route = LineString(np.column_stack([np.linspace(113.8, 114.3, n), np.linspace(22.5, 22.7, n)]))
+    shell = [(114.0, 22.5), (114.1, 22.5), (114.1, 22.6), (114.0, 22.5)]
+    hole = [(114.02, 22.51), (114.05, 22.51), (114.05, 22.54), (114.02, 22.51)]
+    gdf = gpd.GeoDataFrame(geometry=[route, Point(114, 22.5), Polygon(shell, [hole]),
+                                     MultiPolygon([Polygon(shell), Polygon(hole)])], crs=4326)
+
+    start = time.perf_counter()
+    gdf = convert_geodf_coordinates(gdf, 'gcj', 'wgs')
+    print(f"convert {shapely.get_num_coordinates(gdf.geometry.values).sum()} vertices: "
+          f"{time.perf_counter() - start:.2f} s")
@@ -4,3 +4,14 @@ from .coordTransform_py import bd09_to_wgs84, bd09_to_gcj02
 
 from .coordTransform_py import wgs84_to_bd09 as wgs_to_bd
 from .coordTransform_py import gcj02_to_wgs84 as gcj_to_wgs
+
+from .coordTransform_np import wgs84_to_bd09 as wgs84_to_bd09_vec, wgs84_to_gcj02 as wgs84_to_gcj02_vec
+from .coordTransform_np import gcj02_to_bd09 as gcj02_to_bd09_vec, gcj02_to_wgs84 as gcj02_to_wgs84_vec
+from .coordTransform_np import bd09_to_wgs84 as bd09_to_wgs84_vec, bd09_to_gcj02 as bd09_to_gcj02_vec
+
+from .coordTransform_np import wgs84_to_bd09 as wgs_to_bd_vec
+from .coordTransform_np import gcj02_to_wgs84 as gcj_to_wgs_vec
+from .coordTransform_np import gcj02_to_wgs84_iterative
+from .coordTransform_grid import GCJOffsetGrid
+from .GeoCoordinateTransform import transform_geometries, convert_geodf_coordinates
+from .GeoCoordinateTransform import CoordTransformPipeline, get_transformer, to_crs
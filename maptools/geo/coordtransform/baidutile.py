@@ -1,61 +1,134 @@
 import math
+import itertools
 import numpy as np
+from pathlib import Path
 import mercantile as mt
 from mercantile import tile, Sequence, LL_EPSILON
 
+from . import coordTransform_nb as ct_nb
+from . import coordTransform_np as ct_np
 from .coordTransform_bd import bd_mc_to_coord, bd_coord_to_mc
 from .coordTransform_py import bd09_to_gcj02, bd09_to_wgs84
 
 
-def merge_tiles_bd(tiles, arrays):
+TILE_DTYPE = np.dtype([
+    ('x', np.int64), ('y', np.int64), ('z', np.int8),
+    ('west', np.float64), ('south', np.float64), ('east', np.float64), ('north', np.float64),
+])
+
+
+def _tile_xyz(tiles):
+    if isinstance(tiles, np.ndarray) and tiles.dtype.names is not None:
+        return tiles['x'], tiles['y'], tiles['z']
+
+    return np.array([(t.x, t.y, t.z) for t in tiles]).reshape(-1, 3).T
+
+
+def mosaic_extent_bd(tiles, sys='bd'):
+    """
+    Bounding box of a set of tiles, computed from the tile indices only.
+
+    Parameters
+    ----------
+    tiles : list of mercantile.Tile objects, or a structured array with `x`, `y`, `z` fields
+    sys : str, optional
+        Coordinate system of the extent, 'bd', 'gcj' or 'wgs'.
+
+    Returns
+    -------
+    extent : tuple
+        [west, south, east, north] in long/lat.
+    """
+    xs, ys, zs = _tile_xyz(tiles)
+    west, south, east, north = bounds_bd_array(xs, ys, zs, sys)
+
+    return west.min(), south.min(), east.max(), north.max()
+
+
+def merge_tiles_bd(tiles, arrays, filename=None, dtype=np.uint8):
     """
     Merge a set of tiles into a single array.
 
     Parameters
     ---------
-    tiles : list of mercantile.Tile objects
+    tiles : list of mercantile.Tile objects, or a structured array from `tiles_bd_array`
         The tiles to merge.
-    arrays : list of numpy arrays
-        The corresponding arrays (image pixels) of the tiles. This list
-        has the same length and order as the `tiles` argument.
+    arrays : iterable of numpy arrays
+        The corresponding arrays (image pixels) of the tiles, in the same
+        order as the `tiles` argument. It may be a lazy iterator (e.g. a
+        generator that reads and decodes one tile at a time), and is
+        consumed only once.
+    filename : str, optional
+        If given, the mosaic is written into a memory-mapped .npy file
+        instead of being allocated in RAM, so peak memory is bounded by a
+        few tiles. The returned image is then a read-only memmap, reopen it
+        with `np.load(filename, mmap_mode='r')`.
+    dtype : data-type, optional
+        Data type of the merged array.
 
     Returns
     -------
-    img : np.ndarray
+    img : np.ndarray or np.memmap
         Merged arrays.
     extent : tuple
         Bounding box [west, south, east, north] of the returned image
         in long/lat.
     """
     # create (n_tiles x 2) array with column for x and y coordinates
-    tile_xys = np.array([(t.x, t.y) for t in tiles])
-    # print(tile_xys)
+    xs, ys, _ = _tile_xyz(tiles)
+    tile_xys = np.column_stack([xs, ys])
 
     # get indices starting at zero
     indices = tile_xys - tile_xys.min(axis=0)
 
-    # the shape of individual tile images
-    h, w, d = arrays[0].shape
+    # the shape of individual tile images, peeked from the first tile
+    arrays = iter(arrays)
+    first = next(arrays)
+    h, w, d = first.shape
+    arrays = itertools.chain([first], arrays)
 
     # number of rows and columns in the merged tile
     n_x, n_y = (indices + 1).max(axis=0)
 
-    # empty merged tiles array to be filled in
-    img = np.zeros((h * n_y, w * n_x, d), dtype=np.uint8)
-
-    for ind, arr in zip(indices, arrays):
-        x, y = ind
-        img[(n_y - y - 1) * h : (n_y - y) * h, x * w : (x + 1) * w, :] = arr
+    def _check(arr):
+        if np.shape(arr) != (h, w, d):
+            raise ValueError(f"All tiles must have the shape {(h, w, d)}, got {np.shape(arr)}")
+        return arr
 
-    bounds = np.array([bounds_bd(t) for t in tiles])
-    west, south, east, north = (
-        min(bounds[:, 0]),
-        min(bounds[:, 1]),
-        max(bounds[:, 2]),
-        max(bounds[:, 3]),
-    )
-
-    return img, (west, south, east, north)
+    # empty merged tiles array to be filled in
+    shape = (int(h * n_y), int(w * n_x), int(d))
+    if filename is None:
+        img = np.zeros(shape, dtype=dtype)
+        for ind, arr in zip(indices, arrays):
+            x, y = ind
+            img[(n_y - y - 1) * h : (n_y - y) * h, x * w : (x + 1) * w, :] = _check(arr)
+
+        return img, mosaic_extent_bd(tiles)
+
+    # Only the .npy header is written up front, the data section is a sparse file of zeros. Each tile
+    # row is written at its offset through an unbuffered file, so written pages are not kept resident
+    # by a writable mapping, and peak memory stays at a few tiles.
+    Path(filename).parent.mkdir(parents=True, exist_ok=True)
+    header = np.lib.format.open_memmap(filename, mode='w+', dtype=dtype, shape=shape)
+    offset = header.offset
+    del header
+
+    itemsize = np.dtype(dtype).itemsize
+    row_bytes = shape[1] * d * itemsize
+    tile_row_bytes = w * d * itemsize
+    with open(filename, 'r+b', buffering=0) as f:
+        for ind, arr in zip(indices, arrays):
+            x, y = ind
+            buf = np.ascontiguousarray(_check(arr), dtype=dtype)
+            pos = offset + (n_y - y - 1) * h * row_bytes + x * tile_row_bytes
+            for row in buf:
+                f.seek(pos)
+                f.write(row)
+                pos += row_bytes
+
+    img = np.load(filename, mmap_mode='r')
+
+    return img, mosaic_extent_bd(tiles)
 
 
 def tile_bd(lng, lat, zoom):
@@ -165,3 +238,155 @@ def bounds_bd(tile:mt.Tile, sys='bd'):
     
     return mt.LngLatBbox(ul_lon_deg, lr_lat_deg, lr_lon_deg, ul_lat_deg)
 
+
+def tile_bd_array(lngs, lats, zoom):
+    """Get the tile indices of many (lng, lat) at one zoom level.
+
+    Args:
+        lngs (array-like): BD-09 longitudes.
+        lats (array-like): BD-09 latitudes.
+        zoom (int): zoom level.
+
+    Returns:
+        tuple: (xtiles, ytiles) integer arrays.
+    """
+    Z2 = math.pow(2, 18 - zoom) * 256
+    xs, ys = ct_nb.bd_coord_to_mc(lngs, lats)
+
+    return np.floor(xs / Z2).astype(np.int64), np.floor(ys / Z2).astype(np.int64)
+
+
+def bounds_bd_array(xs, ys, zs, sys='bd'):
+    """Returns the bounding boxes of many tiles, the vectorized version of `bounds_bd`.
+
+    Args:
+        xs, ys, zs (array-like): tile indices and zoom levels.
+        sys (str, optional): coordinate system of the bounds, 'bd', 'gcj' or 'wgs'. Defaults to 'bd'.
+
+    Returns:
+        tuple: (west, south, east, north) arrays.
+    """
+    assert sys in ['gcj', 'wgs', 'bd']
+    f = 256 * np.power(2.0, 18 - np.asarray(zs, dtype=np.float64))
+    xs = np.asarray(xs, dtype=np.float64) * f
+    ys = np.asarray(ys, dtype=np.float64) * f
+
+    west, south = ct_nb.bd_mc_to_coord(xs, ys)
+    east, north = ct_nb.bd_mc_to_coord(xs + f, ys + f)
+
+    if sys == 'gcj':
+        west, south = ct_np.bd09_to_gcj02(west, south)
+        east, north = ct_np.bd09_to_gcj02(east, north)
+    elif sys == 'wgs':
+        west, south = ct_np.bd09_to_wgs84(west, south)
+        east, north = ct_np.bd09_to_wgs84(east, north)
+
+    return west, south, east, north
+
+
+def _tile_ranges_bd(west, south, east, north, zooms, truncate=False):
+    """The (zoom, x range, y range) blocks enumerated by `tiles_bd`."""
+    if truncate:
+        west, south = mt.truncate_lnglat(west, south)
+        east, north = mt.truncate_lnglat(east, north)
+    if west > east:
+        bboxes = [(-180.0, south, east, north), (west, south, 180.0, north)]
+    else:
+        bboxes = [(west, south, east, north)]
+
+    if not isinstance(zooms, Sequence):
+        zooms = [zooms]
+
+    ranges = []
+    for w, s, e, n in bboxes:
+        w, s = bd_coord_to_mc(max(-180.0, w), max(-85.051129, s))
+        e, n = bd_coord_to_mc(min(180.0, e), min(85.051129, n))
+
+        for z in zooms:
+            f = math.pow(2, 18 - z) * 256
+            ranges.append((z, math.floor(w / f), math.ceil(e / f) + 1,
+                              math.floor(s / f), math.ceil(n / f) + 1))
+
+    return ranges
+
+
+def iter_tiles_bd_chunks(west, south, east, north, zooms, truncate=False,
+                         sys='bd', chunk_size=1_000_000, with_bounds=True):
+    """Get the tiles overlapped by a geographic bounding box in chunks.
+
+    The tiles are the same as, and in the same order as, the ones yielded by `tiles_bd`,
+    but are produced as structured arrays (`TILE_DTYPE`) of at most `chunk_size` tiles, so
+    a bbox covering tens of millions of tiles never materializes as one Python list.
+
+    Parameters
+    ----------
+    west, south, east, north : float
+        Bounding values in decimal degrees.
+    zooms : int or sequence of int
+        One or more zoom levels.
+    truncate : bool, optional
+        Whether or not to truncate inputs to web mercator limits.
+    sys : str, optional
+        Coordinate system of the tile bounds, 'bd', 'gcj' or 'wgs'.
+    chunk_size : int, optional
+        Maximum number of tiles per chunk.
+    with_bounds : bool, optional
+        Whether or not to fill the bounds fields (left as NaN otherwise).
+
+    Yields
+    ------
+    np.ndarray
+        Structured array with the fields of `TILE_DTYPE`.
+    """
+    for z, x0, x1, y0, y1 in _tile_ranges_bd(west, south, east, north, zooms, truncate):
+        n_y = y1 - y0
+        total = (x1 - x0) * n_y
+        for start in range(0, total, chunk_size):
+            k = np.arange(start, min(start + chunk_size, total), dtype=np.int64)
+            chunk = np.empty(len(k), dtype=TILE_DTYPE)
+            chunk['x'] = x0 + k // n_y
+            chunk['y'] = y0 + k % n_y
+            chunk['z'] = z
+            if with_bounds:
+                chunk['west'], chunk['south'], chunk['east'], chunk['north'] = \
+                    bounds_bd_array(chunk['x'], chunk['y'], z, sys)
+            else:
+                for key in ['west', 'south', 'east', 'north']:
+                    chunk[key] = np.nan
+
+            yield chunk
+
+
+def tiles_bd_array(west, south, east, north, zooms, truncate=False, sys='bd', with_bounds=True):
+    """Get all the tiles overlapped by a geographic bounding box as one structured array.
+
+    See `iter_tiles_bd_chunks` for the parameters.
+
+    Returns
+    -------
+    np.ndarray
+        Structured array with the fields of `TILE_DTYPE`.
+    """
+    chunks = list(iter_tiles_bd_chunks(west, south, east, north, zooms, truncate,
+                                       sys=sys, chunk_size=1 << 62, with_bounds=with_bounds))
+    if not chunks:
+        return np.empty(0, dtype=TILE_DTYPE)
+
+    return np.concatenate(chunks)
+
+
+if __name__ == "__main__":
+    import time
+
+    bbox = (113.75, 22.45, 114.65, 22.85)
+    start = time.perf_counter()
+    tiles = list(tiles_bd(*bbox, 17))
+    bounds = [bounds_bd(t, 'wgs') for t in tiles]
+    loop_cost = time.perf_counter() - start
+
+    start = time.perf_counter()
+    arr = tiles_bd_array(*bbox, 17, sys='wgs')
+    vec_cost = time.perf_counter() - start
+
+    print(f"{len(arr)} tiles, loop: {loop_cost:.2f} s, array: {vec_cost:.2f} s, "
+          f"speedup: {loop_cost / vec_cost:.0f}x")
@@ -3,41 +3,58 @@ import ctypes
 import os
 import math
 
+from . import coordTransform_nb
 from .coordTransform_py import bd09_to_wgs84,wgs84_to_bd09
 
-lib = ctypes.cdll.LoadLibrary(os.path.join(os.path.dirname(__file__), './baiduCoord.so'))
+try:
+    lib = ctypes.cdll.LoadLibrary(os.path.join(os.path.dirname(__file__), './baiduCoord.so'))
+except OSError:
+    # `baiduCoord.so` 需在本地编译, 缺失时退回到 numba 实现 (coordTransform_nb)
+    lib = None
 
 
 class coords_type(ctypes.Structure):
     _fields_ = [('x', ctypes.c_double), ('y', ctypes.c_double)]
 
 
-LL2MC_lng = lib.LL2MC_lng
-LL2MC_lat = lib.LL2MC_lat
-MC2LL_lat = lib.MC2LL_lat
-MC2LL_lng = lib.MC2LL_lng
-for i in [LL2MC_lng, LL2MC_lat, MC2LL_lat, MC2LL_lng]:
-    i.argtypes = [ctypes.c_double, ctypes.c_double]
-    i.restype = ctypes.c_double
+if lib is not None:
+    LL2MC_lng = lib.LL2MC_lng
+    LL2MC_lat = lib.LL2MC_lat
+    MC2LL_lat = lib.MC2LL_lat
+    MC2LL_lng = lib.MC2LL_lng
+    for i in [LL2MC_lng, LL2MC_lat, MC2LL_lat, MC2LL_lng]:
+        i.argtypes = [ctypes.c_double, ctypes.c_double]
+        i.restype = ctypes.c_double
 
 
-LL2MC, MC2LL = lib.LL2MC, lib.MC2LL
-for i in [LL2MC, MC2LL]:
-    i.argtypes = [ctypes.c_double, ctypes.c_double]
-    i.restype = coords_type
+    LL2MC, MC2LL = lib.LL2MC, lib.MC2LL
+    for i in [LL2MC, MC2LL]:
+        i.argtypes = [ctypes.c_double, ctypes.c_double]
+        i.restype = coords_type
 
 
 def bd_coord_to_mc(lng, lat):
+    if lib is None:
+        x, y = coordTransform_nb._ll_to_mc(float(lng), float(lat))
+        return x, y
+
     coord = LL2MC(lng, lat)
     return coord.x, coord.y
 
 
 def bd_mc_to_coord(lng, lat):
+    if lib is None:
+        x, y = coordTransform_nb._mc_to_ll(float(lng), float(lat))
+        return x, y
+
     coord = MC2LL(lng, lat)
     return coord.x, coord.y
 
 
 def bd_mc_to_coord_old(lng, lat):
+    if lib is None:
+        return bd_mc_to_coord(lng, lat)
+
     return MC2LL_lng(lng, lat), MC2LL_lat(lng, lat)
 
 
@@ -0,0 +1,231 @@
+import json
+import numpy as np
+from pathlib import Path
+
+from .coordTransform_np import CHUNK_SIZE, _as_lnglat_arrays, gcj_offset, out_of_china
+
+
+SHENZHEN_BBOX = (113.7, 22.4, 114.7, 22.9)
+
+# 双线性插值误差上界约为 step^2 / 8 * (|∂²f/∂x²| + |∂²f/∂y²|)，偏移场中起主导作用的是 sin(6πx)、
+# sin(2πx) 项，且 dlng 含 1 / cos(lat) 因子，实测最大误差约为 0.0058 * step^2 / cos(lat) 度，
+# 取 ERROR_FACTOR = 0.0065。默认步长 0.001 度（约 100 米）时，深圳约 7e-9 度，北纬 53° 约 1.1e-8 度（约 1 毫米）。
+# `build` 时在各单元上实测误差并乘以 ERROR_MARGIN 保存，以上估计只用于没有实测值的旧格网文件。
+ERROR_FACTOR = 0.0065
+ERROR_MARGIN = 1.1
+
+
+class GCJOffsetGrid:
+    """
+    预计算 bbox 范围内规则格网上的 GCJ 偏移量，按双线性插值批量转换坐标。
+
+    - 格网存储为 (ny, nx, 2) 的 .npy 文件（dlng, dlat），元数据写入同名 .json 文件，
+      以 `mmap_mode='r'` 加载后，多个 worker 进程可共享同一份页缓存；
+    - 格网之外、或格网单元跨越 `out_of_china` 边界的点回退到精确公式；
+    - 最大插值误差在 `build` 时实测并随元数据保存，见 `max_error`。
+
+    Example:
+    >>> grid = GCJOffsetGrid.build(SHENZHEN_BBOX, step=0.001, filename='./cache/sz_gcj_grid.npy')
+    >>> grid = GCJOffsetGrid.load('./cache/sz_gcj_grid.npy')  # worker 中
+    >>> lngs, lats = grid.gcj02_to_wgs84(lngs, lats)
+    """
+
+    def __init__(self, offsets, west, south, step, max_error=None):
+        self.offsets = offsets
+        self.west = float(west)
+        self.south = float(south)
+        self.step = float(step)
+        self._max_error = max_error
+
+    @property
+    def shape(self):
+        return self.offsets.shape[:2]
+
+    @property
+    def bounds(self):
+        ny, nx = self.shape
+        return (self.west, self.south,
+                self.west + (nx - 1) * self.step, self.south + (ny - 1) * self.step)
+
+    @property
+    def max_error(self):
+        """插值的最大误差（度）：`build` 时实测的结果，旧版本的格网文件没有实测值时按纬度估计"""
+        if self._max_error is not None:
+            return self._max_error
+
+        _, south, _, north = self.bounds
+        return ERROR_FACTOR * self.step ** 2 / np.cos(np.radians(max(abs(south), abs(north))))
+
+    def _measure_error(self):
+        """
+        比较各单元中心、边中点处的插值与精确公式，返回最大误差（度）。
+        双线性插值的误差约为 -step^2 / 2 * (tx(1-tx) * f_xx + ty(1-ty) * f_yy)，极值位于这三类点上。
+        """
+        ny, nx = self.shape
+        if nx < 2 or ny < 2:
+            return 0.
+        half = self.step / 2
+        lngs = self.west + np.arange(nx) * self.step
+        err = 0.
+        batch = max(1, CHUNK_SIZE // nx)
+        for j in range(0, ny, batch):
+            lats = self.south + np.arange(j, min(j + batch, ny)) * self.step
+            for xs, ys in [(lngs[:-1] + half, lats[lats < self.bounds[3]] + half),
+                           (lngs[:-1] + half, lats),
+                           (lngs, lats[lats < self.bounds[3]] + half)]:
+                x, y = (a.ravel() for a in np.meshgrid(xs, ys))
+                dlng, dlat, valid = self._interp_chunk(x, y)
+                ans_lng, ans_lat = gcj_offset(x, y)
+                if valid.any():
+                    err = max(err, np.abs(dlng - ans_lng)[valid].max(), np.abs(dlat - ans_lat)[valid].max())
+
+        return err
+
+    @classmethod
+    def build(cls, bbox, step=0.001, filename=None):
+        """
+        计算 bbox 范围内格网节点上的偏移量。
+
+        Args:
+            bbox (tuple): (west, south, east, north)，WGS84 / GCJ02 经纬度。
+            step (float, optional): 格网步长（度）. Defaults to 0.001.
+            filename (str, optional): 若指定，偏移量直接写入该 .npy 文件（memmap）. Defaults to None.
+
+        Returns:
+            GCJOffsetGrid: 格网对象。
+        """
+        west, south, east, north = bbox
+        nx = int(np.ceil((east - west) / step)) + 1
+        ny = int(np.ceil((north - south) / step)) + 1
+        lngs = west + np.arange(nx) * step
+
+        if filename is None:
+            offsets = np.empty((ny, nx, 2), dtype=np.float64)
+        else:
+            filename = Path(filename)
+            filename.parent.mkdir(parents=True, exist_ok=True)
+            offsets = np.lib.format.open_memmap(filename, mode='w+', dtype=np.float64, shape=(ny, nx, 2))
+
+        for j in range(ny):
+            offsets[j, :, 0], offsets[j, :, 1] = gcj_offset(lngs, np.full(nx, south + j * step))
+
+        grid = cls(offsets, west, south, step)
+        # 误差随纬度按 1 / cos(lat) 增长，实测后保存；留 10% 的余量覆盖单元内部的高阶项
+        grid._max_error = grid._measure_error() * ERROR_MARGIN
+        if filename is not None:
+            offsets.flush()
+            grid._save_meta(filename)
+
+        return grid
+
+    def _save_meta(self, filename):
+        meta = {'west': self.west, 'south': self.south, 'step': self.step, 'max_error': self._max_error}
+        with open(Path(filename).with_suffix('.json'), 'w') as f:
+            json.dump(meta, f)
+
+    def save(self, filename):
+        filename = Path(filename)
+        filename.parent.mkdir(parents=True, exist_ok=True)
+        np.save(filename, np.asarray(self.offsets))
+        self._save_meta(filename)
+
+        return filename
+
+    @classmethod
+    def load(cls, filename, mmap_mode='r'):
+        filename = Path(filename)
+        with open(filename.with_suffix('.json'), 'r') as f:
+            meta = json.load(f)
+        offsets = np.load(filename, mmap_mode=mmap_mode)
+
+        return cls(offsets, **meta)
+
+    @property
+    def _inside_china(self):
+        west, south, east, north = self.bounds
+        return not (out_of_china(west, south) or out_of_china(east, north))
+
+    def _interp_chunk(self, lng, lat):
+        ny, nx = self.shape
+        fx = (lng - self.west) / self.step
+        fy = (lat - self.south) / self.step
+        valid = (fx >= 0) & (fx <= nx - 1) & (fy >= 0) & (fy <= ny - 1)
+        ix = np.clip(fx, 0, nx - 2).astype(np.intp)
+        iy = np.clip(fy, 0, ny - 2).astype(np.intp)
+
+        if not self._inside_china:
+            # 单元的四个角点需同时位于国内，否则插值会抹平边界处的不连续
+            x0, y0 = self.west + ix * self.step, self.south + iy * self.step
+            valid &= ~out_of_china(x0, y0) & ~out_of_china(x0 + self.step, y0 + self.step)
+
+        # (dlng, dlat) 视作一个 complex128，每个角点只需一次 gather
+        grid = np.asarray(self.offsets).reshape(-1, 2).view(np.complex128).ravel()
+        tx, ty = fx - ix, fy - iy
+        idx = iy * nx + ix
+        res = grid[idx] * ((1 - tx) * (1 - ty))
+        res += grid[idx + 1] * (tx * (1 - ty))
+        idx += nx
+        res += grid[idx] * ((1 - tx) * ty)
+        res += grid[idx + 1] * (tx * ty)
+
+        return res.real, res.imag, valid
+
+    def offset(self, lng, lat):
+        """
+        计算 WGS84 -> GCJ02 的偏移量（度），格网内双线性插值，格网外回退到精确公式。
+        """
+        lng, lat = _as_lnglat_arrays(lng, lat)
+        shape = np.broadcast(lng, lat).shape
+        lng, lat = np.broadcast_to(lng, shape).ravel(), np.broadcast_to(lat, shape).ravel()
+
+        dlng = np.empty(lng.shape, dtype=np.float64)
+        dlat = np.empty(lat.shape, dtype=np.float64)
+        valid = np.empty(lng.shape, dtype=bool)
+        for i in range(0, len(lng), CHUNK_SIZE):
+            sl = slice(i, i + CHUNK_SIZE)
+            dlng[sl], dlat[sl], valid[sl] = self._interp_chunk(lng[sl], lat[sl])
+
+        idxs = np.flatnonzero(~valid)
+        if len(idxs):
+            dlng[idxs], dlat[idxs] = gcj_offset(lng[idxs], lat[idxs])
+
+        return dlng.reshape(shape), dlat.reshape(shape)
+
+    def wgs84_to_gcj02(self, lng, lat=None):
+        lng, lat = _as_lnglat_arrays(lng, lat)
+        dlng, dlat = self.offset(lng, lat)
+        return lng + dlng, lat + dlat
+
+    def gcj02_to_wgs84(self, lng, lat=None):
+        lng, lat = _as_lnglat_arrays(lng, lat)
+        dlng, dlat = self.offset(lng, lat)
+        return lng - dlng, lat - dlat
+
+
+if __name__ == '__main__':
+    import time
+    import tempfile
+    from .coordTransform_np import wgs84_to_gcj02
+
+    fn = Path(tempfile.mkdtemp()) / 'sz_gcj_grid.npy'
+    start = time.perf_counter()
+    GCJOffsetGrid.build(SHENZHEN_BBOX, step=0.001, filename=fn)
+    grid = GCJOffsetGrid.load(fn)
+    print(f"build grid {grid.shape}: {time.perf_counter() - start:.2f} s, max error: {grid.max_error:.1e} deg")
+
+    n = 10_000_000
+    west, south, east, north = SHENZHEN_BBOX
+    lng = np.random.uniform(west, east, n)
+    lat = np.random.uniform(south, north, n)
+
+    start = time.perf_counter()
+    exact = wgs84_to_gcj02(lng, lat)
+    exact_cost = time.perf_counter() - start
+
+    start = time.perf_counter()
+    interp = grid.wgs84_to_gcj02(lng, lat)
+    grid_cost = time.perf_counter() - start
+
+    err = max(np.abs(exact[0] - interp[0]).max(), np.abs(exact[1] - interp[1]).max())
+    print(f"exact: {exact_cost:.2f} s, grid: {grid_cost:.2f} s, "
+          f"speedup: {exact_cost / grid_cost:.1f}x, max error: {err:.1e} deg")
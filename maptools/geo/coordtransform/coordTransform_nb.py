@@ -0,0 +1,394 @@
+import math
+import numpy as np
+from numba import njit, prange
+
+from .coordTransform_py import x_pi, pi, a, ee
+
+"""
+Numba 编译的坐标转换核函数，`parallel=True` 时按 prange 在多核上并行。
+
+- 核函数使用 `cache=True` 编译，编译结果写入 `__pycache__`，之后的进程直接加载，不再支付 JIT 延迟；
+- 短生命周期的批处理任务可在启动时调用 `warmup()`，提前完成编译/加载缓存。
+"""
+
+# 百度墨卡托与百度经纬度互换的分段多项式系数，源于百度地图 JS API
+LL_BAND = np.array([75., 60., 45., 30., 15., 0.])
+MC_BAND = np.array([12890594.86, 8362377.87, 5591021., 3481989.83, 1678043.12, 0.])
+
+LL2MC = np.array([
+    [-0.0015702102444, 111320.7020616939, 1704480524535203, -10338987376042340,
+     26112667856603880, -35149669176653700, 26595700718403920, -10725012454188240,
+     1800819912950474, 82.5],
+    [0.0008277824516172526, 111320.7020463578, 647795574.6671607, -4082003173.641316,
+     10774905663.51142, -15171875531.51559, 12053065338.62167, -5124939663.577472,
+     913311935.9512032, 67.5],
+    [0.00337398766765, 111320.7020202162, 4481351.045890365, -23393751.19931662,
+     79682215.47186455, -115964993.2797253, 97236711.15602145, -43661946.33752821,
+     8477230.501135234, 52.5],
+    [0.00220636496208, 111320.7020209128, 51751.86112841131, 3796837.749470245,
+     992013.7397791013, -1221952.21711287, 1340652.697009075, -620943.6990984312,
+     144416.9293806241, 37.5],
+    [-0.0003441963504368392, 111320.7020576856, 278.2353980772752, 2485758.690035394,
+     6070.750963243378, 54821.18345352118, 9540.606633304236, -2710.55326746645,
+     1405.483844121726, 22.5],
+    [-0.0003218135878613132, 111320.7020701615, 0.00369383431289, 823725.6402795718,
+     0.46104986909093, 2351.343141331292, 1.58060784298199, 8.77738589078284,
+     0.37238884252424, 7.45],
+])
+
+MC2LL = np.array([
+    [1.410526172116255e-8, 0.00000898305509648872, -1.9939833816331, 200.9824383106796,
+     -187.2403703815547, 91.6087516669843, -23.38765649603339, 2.57121317296198,
+     -0.03801003308653, 17337981.2],
+    [-7.435856389565537e-9, 0.000008983055097726239, -0.78625201886289, 96.32687599759846,
+     -1.85204757529826, -59.36935905485877, 47.40033549296737, -16.50741931063887,
+     2.28786674699375, 10260144.86],
+    [-3.030883460898826e-8, 0.00000898305509983578, 0.30071316287616, 59.74293618442277,
+     7.357984074871, -25.38371002664745, 13.45380521110908, -3.29883767235584,
+     0.32710905363475, 6856817.37],
+    [-1.981981304930552e-8, 0.000008983055099779535, 0.03278182852591, 40.31678527705744,
+     0.65659298677277, -4.44255534477492, 0.85341911805263, 0.12923347998204,
+     -0.04625736007561, 4482777.06],
+    [3.09191371068437e-9, 0.000008983055096812155, 0.00006995724062, 23.10934304144901,
+     -0.00023663490511, -0.6321817810242, -0.00663494467273, 0.03430082397953,
+     -0.00466043876332, 2555164.4],
+    [2.890871144776878e-9, 0.000008983055095805407, -3.068298e-8, 7.47137025468032,
+     -0.00000353937994, -0.02145144861037, -0.00001234426596, 0.00010322952773,
+     -0.00000323890364, 826088.5],
+])
+
+
+""" 标量函数 """
+
+# 以下 GCJ/BD 相关函数均用 error_model='numpy' 编译：除零不抛异常、循环体无分支，LLVM 才能自动向量化
+
+@njit(cache=True, error_model='numpy')
+def _out_of_china(lng, lat):
+    return not ((lng > 73.66) & (lng < 135.05) & (lat > 3.86) & (lat < 53.55))
+
+
+@njit(cache=True, error_model='numpy')
+def _sin_small(x):
+    """
+    |x| <= π/2 时的 sin，17 阶 Taylor 展开，截断误差 < 5e-14；
+    以多项式代替 libm 调用（math.sin 约 30 ns），且可以向量化.
+    """
+    x2 = x * x
+    return x * (1.0 + x2 * (-1 / 6 + x2 * (1 / 120 + x2 * (-1 / 5040 + x2 * (1 / 362880 + x2 * (
+        -1 / 39916800 + x2 * (1 / 6227020800 + x2 * (-1 / 1307674368000 + x2 / 355687428096000))))))))
+
+
+@njit(cache=True, error_model='numpy')
+def _cos_small(x):
+    """|x| <= π/2 时的 cos，16 阶 Taylor 展开，截断误差 < 1e-14"""
+    x2 = x * x
+    return 1.0 + x2 * (-1 / 2 + x2 * (1 / 24 + x2 * (-1 / 720 + x2 * (1 / 40320 + x2 * (
+        -1 / 3628800 + x2 * (1 / 479001600 + x2 * (-1 / 87178291200 + x2 / 20922789888000)))))))
+
+
+@njit(cache=True, error_model='numpy')
+def _sin(x):
+    """任意 x 的 sin：x = kπ + r，|r| <= π/2，sin(x) = (-1)^k sin(r)"""
+    k = np.floor(x / pi + 0.5)
+    ret = _sin_small(x - k * pi)
+
+    return -ret if k - 2.0 * np.floor(k / 2.0) != 0.0 else ret
+
+
+@njit(cache=True, error_model='numpy', inline='always')
+def _multiple_angles(x):
+    """
+    由 θ = πx/120 的 sin、cos 经二倍角、和角公式递推 sin(4θ)、sin(10θ)、sin(40θ) 与 cos(40θ)，
+    即 sin(πx/30)、sin(πx/12)、sin(πx/3)、cos(πx/3). 国内 |x| < 32，|θ| < π/2.
+    """
+    theta = x * (pi / 120.0)
+    s1, c1 = _sin_small(theta), _cos_small(theta)
+    s2, c2 = 2.0 * s1 * c1, 1.0 - 2.0 * s1 * s1
+    s4, c4 = 2.0 * s2 * c2, 1.0 - 2.0 * s2 * s2
+    s5, c5 = s4 * c1 + c4 * s1, c4 * c1 - s4 * s1
+    s10, c10 = 2.0 * s5 * c5, 1.0 - 2.0 * s5 * s5
+    s20, c20 = 2.0 * s10 * c10, 1.0 - 2.0 * s10 * s10
+    s40, c40 = 2.0 * s20 * c20, 1.0 - 2.0 * s20 * s20
+
+    return s4, s10, s40, c40
+
+
+@njit(cache=True, error_model='numpy', inline='always')
+def _lng_terms(x):
+    """
+    `_transformlat` 与 `_transformlng` 中只依赖经度的三角项：返回两者共有的 sin(6πx)、sin(2πx) 项，
+    以及 `_transformlng` 独有的 sin(πx)、sin(πx/3)、sin(πx/12)、sin(πx/30) 项.
+    """
+    s_30, s_12, s_3, c_3 = _multiple_angles(x)
+    s_1 = s_3 * (3.0 - 4.0 * s_3 * s_3)
+    s_2 = 2.0 * s_1 * (c_3 * (4.0 * c_3 * c_3 - 3.0))
+    s_6 = s_2 * (3.0 - 4.0 * s_2 * s_2)
+
+    shared = (20.0 * s_6 + 20.0 * s_2) * 2.0 / 3.0
+    own = (20.0 * s_1 + 40.0 * s_3) * 2.0 / 3.0 + (150.0 * s_12 + 300.0 * s_30) * 2.0 / 3.0
+    return shared, own
+
+
+@njit(cache=True, error_model='numpy', inline='always')
+def _gcj_dlng(lng, lat):
+    """WGS84 -> GCJ02 的经度偏移量（度），国外的点为 0"""
+    x, y = lng - 105.0, lat - 35.0
+    shared, own = _lng_terms(x)
+    ret = 300.0 + x + 2.0 * y + 0.1 * x * x + 0.1 * x * y + 0.1 * math.sqrt(math.fabs(x)) + shared + own
+
+    # 国内纬度范围内 0 < radlat < π/2
+    radlat = lat / 180.0 * pi
+    sin_radlat = _sin_small(radlat)
+    sqrtmagic = math.sqrt(1 - ee * sin_radlat * sin_radlat)
+    dlng = (ret * 180.0) / (a / sqrtmagic * _cos_small(radlat) * pi)
+
+    return 0.0 if _out_of_china(lng, lat) else dlng
+
+
+@njit(cache=True, error_model='numpy', inline='always')
+def _gcj_dlat(lng, lat):
+    """WGS84 -> GCJ02 的纬度偏移量（度），国外的点为 0"""
+    x, y = lng - 105.0, lat - 35.0
+    shared, _ = _lng_terms(x)
+    ys_30, ys_12, ys_3, _ = _multiple_angles(y)
+    ys_1 = ys_3 * (3.0 - 4.0 * ys_3 * ys_3)
+    ret = -100.0 + 2.0 * x + 3.0 * y + 0.2 * y * y + 0.1 * x * y + 0.2 * math.sqrt(math.fabs(x)) + shared
+    ret += (20.0 * ys_1 + 40.0 * ys_3) * 2.0 / 3.0
+    ret += (160.0 * ys_12 + 320 * ys_30) * 2.0 / 3.0
+
+    sin_radlat = _sin_small(lat / 180.0 * pi)
+    magic = 1 - ee * sin_radlat * sin_radlat
+    dlat = (ret * 180.0) / ((a * (1 - ee)) / (magic * math.sqrt(magic)) * pi)
+
+    return 0.0 if _out_of_china(lng, lat) else dlat
+
+
+@njit(cache=True, error_model='numpy')
+def _rotate(x, y, dz, dtheta):
+    """
+    极坐标下 (z, θ) = (r + dz, atan2(y, x) + dtheta) 对应的直角坐标，不调用 atan2 与 sin/cos：
+    cos(φ + δ) = (x cosδ - y sinδ) / r，|δ| <= 3e-6 时 cosδ、sinδ 取 Taylor 展开的前两项即精确到双精度.
+    """
+    r = math.sqrt(x * x + y * y)
+    z = r + dz
+    c = 1.0 - 0.5 * dtheta * dtheta
+    s = dtheta - dtheta * dtheta * dtheta / 6.0
+    # atan2(0, 0) = 0
+    ux, uy = (x / r, y / r) if r > 0 else (1.0, 0.0)
+    return z * (ux * c - uy * s), z * (uy * c + ux * s)
+
+
+@njit(cache=True, error_model='numpy')
+def _gcj02_to_bd09(lng, lat):
+    x, y = _rotate(lng, lat, 0.00002 * _sin(lat * x_pi), 0.000003 * _sin(lng * x_pi + pi / 2))
+    return x + 0.0065, y + 0.006
+
+
+@njit(cache=True, error_model='numpy')
+def _bd09_to_gcj02(bd_lon, bd_lat):
+    x = bd_lon - 0.0065
+    y = bd_lat - 0.006
+    return _rotate(x, y, -0.00002 * _sin(y * x_pi), -0.000003 * _sin(x * x_pi + pi / 2))
+
+
+@njit(cache=True)
+def _convertor(x, y, factor):
+    x_temp = factor[0] + factor[1] * abs(x)
+    cc = abs(y) / factor[9]
+    y_temp = factor[2] + factor[3] * cc + factor[4] * cc ** 2 + factor[5] * cc ** 3 + \
+             factor[6] * cc ** 4 + factor[7] * cc ** 5 + factor[8] * cc ** 6
+    if x < 0:
+        x_temp = -x_temp
+    if y < 0:
+        y_temp = -y_temp
+    return x_temp, y_temp
+
+
+@njit(cache=True)
+def _ll_to_mc(lng, lat):
+    while lng > 180:
+        lng -= 360
+    while lng < -180:
+        lng += 360
+    lat = min(max(lat, -74.), 74.)
+
+    idx = len(LL_BAND) - 1
+    for i in range(len(LL_BAND)):
+        if abs(lat) >= LL_BAND[i]:
+            idx = i
+            break
+
+    return _convertor(lng, lat, LL2MC[idx])
+
+
+@njit(cache=True)
+def _mc_to_ll(x, y):
+    idx = len(MC_BAND) - 1
+    for i in range(len(MC_BAND)):
+        if abs(y) >= MC_BAND[i]:
+            idx = i
+            break
+
+    return _convertor(x, y, MC2LL[idx])
+
+
+""" 向量化核函数 """
+
+# 按块并行；块内每个循环只写一个数组，以便 LLVM 自动向量化
+BLOCK_SIZE = 1 << 14
+
+
+@njit(cache=True, error_model='numpy')
+def _gcj_offset_block(lng, lat, dlng, dlat):
+    for i in range(lng.shape[0]):
+        dlng[i] = _gcj_dlng(lng[i], lat[i])
+    for i in range(lng.shape[0]):
+        dlat[i] = _gcj_dlat(lng[i], lat[i])
+
+
+@njit(cache=True, error_model='numpy')
+def _shift_block(lng, lat, out_lng, out_lat, sign):
+    """out = (lng, lat) + sign * offset(lng, lat)，`out` 可以与输入为同一数组"""
+    dlng, dlat = np.empty_like(lng), np.empty_like(lat)
+    _gcj_offset_block(lng, lat, dlng, dlat)
+    for i in range(lng.shape[0]):
+        out_lng[i] = lng[i] + sign * dlng[i]
+    for i in range(lng.shape[0]):
+        out_lat[i] = lat[i] + sign * dlat[i]
+
+
+@njit(parallel=True, cache=True, error_model='numpy')
+def _gcj_offset_kernel(lng, lat, out_dlng, out_dlat):
+    n = lng.shape[0]
+    for b in prange((n + BLOCK_SIZE - 1) // BLOCK_SIZE):
+        s, e = b * BLOCK_SIZE, min(n, (b + 1) * BLOCK_SIZE)
+        _gcj_offset_block(lng[s:e], lat[s:e], out_dlng[s:e], out_dlat[s:e])
+
+
+@njit(parallel=True, cache=True, error_model='numpy')
+def _wgs84_to_gcj02(lng, lat, out_lng, out_lat):
+    n = lng.shape[0]
+    for b in prange((n + BLOCK_SIZE - 1) // BLOCK_SIZE):
+        s, e = b * BLOCK_SIZE, min(n, (b + 1) * BLOCK_SIZE)
+        _shift_block(lng[s:e], lat[s:e], out_lng[s:e], out_lat[s:e], 1.0)
+
+
+@njit(parallel=True, cache=True, error_model='numpy')
+def _gcj02_to_wgs84(lng, lat, out_lng, out_lat):
+    n = lng.shape[0]
+    for b in prange((n + BLOCK_SIZE - 1) // BLOCK_SIZE):
+        s, e = b * BLOCK_SIZE, min(n, (b + 1) * BLOCK_SIZE)
+        _shift_block(lng[s:e], lat[s:e], out_lng[s:e], out_lat[s:e], -1.0)
+
+
+@njit(parallel=True, cache=True, error_model='numpy')
+def _gcj02_to_bd09_kernel(lng, lat, out_lng, out_lat):
+    for i in prange(lng.shape[0]):
+        out_lng[i], out_lat[i] = _gcj02_to_bd09(lng[i], lat[i])
+
+
+@njit(parallel=True, cache=True, error_model='numpy')
+def _bd09_to_gcj02_kernel(lng, lat, out_lng, out_lat):
+    for i in prange(lng.shape[0]):
+        out_lng[i], out_lat[i] = _bd09_to_gcj02(lng[i], lat[i])
+
+
+@njit(parallel=True, cache=True)
+def _bd_coord_to_mc(lng, lat, out_x, out_y):
+    for i in prange(lng.shape[0]):
+        out_x[i], out_y[i] = _ll_to_mc(lng[i], lat[i])
+
+
+@njit(parallel=True, cache=True)
+def _bd_mc_to_coord(x, y, out_lng, out_lat):
+    for i in prange(x.shape[0]):
+        out_lng[i], out_lat[i] = _mc_to_ll(x[i], y[i])
+
+
+def _apply(kernel, xs, ys):
+    xs = np.asarray(xs, dtype=np.float64)
+    ys = np.asarray(ys, dtype=np.float64)
+    shape = np.broadcast(xs, ys).shape
+    xs = np.ascontiguousarray(np.broadcast_to(xs, shape)).ravel()
+    ys = np.ascontiguousarray(np.broadcast_to(ys, shape)).ravel()
+    out_x, out_y = np.empty_like(xs), np.empty_like(ys)
+    kernel(xs, ys, out_x, out_y)
+
+    return out_x.reshape(shape), out_y.reshape(shape)
+
+
+def gcj_offset(lng, lat):
+    """WGS84 -> GCJ02 的偏移量（度），国外的点偏移量为 0"""
+    return _apply(_gcj_offset_kernel, lng, lat)
+
+
+def wgs84_to_gcj02(lng, lat):
+    return _apply(_wgs84_to_gcj02, lng, lat)
+
+
+def gcj02_to_wgs84(lng, lat):
+    return _apply(_gcj02_to_wgs84, lng, lat)
+
+
+def gcj02_to_bd09(lng, lat):
+    return _apply(_gcj02_to_bd09_kernel, lng, lat)
+
+
+def bd09_to_gcj02(bd_lon, bd_lat):
+    return _apply(_bd09_to_gcj02_kernel, bd_lon, bd_lat)
+
+
+def wgs84_to_bd09(lng, lat):
+    return gcj02_to_bd09(*wgs84_to_gcj02(lng, lat))
+
+
+def bd09_to_wgs84(bd_lon, bd_lat):
+    return gcj02_to_wgs84(*bd09_to_gcj02(bd_lon, bd_lat))
+
+
+def bd_coord_to_mc(lng, lat):
+    """百度经纬度 -> 百度墨卡托"""
+    return _apply(_bd_coord_to_mc, lng, lat)
+
+
+def bd_mc_to_coord(x, y):
+    """百度墨卡托 -> 百度经纬度"""
+    return _apply(_bd_mc_to_coord, x, y)
+
+
+KERNELS = [gcj_offset, wgs84_to_gcj02, gcj02_to_wgs84, gcj02_to_bd09, bd09_to_gcj02,
+           wgs84_to_bd09, bd09_to_wgs84, bd_coord_to_mc, bd_mc_to_coord]
+
+
+def warmup():
+    """
+    触发全部核函数的编译。首次运行时编译结果写入磁盘缓存（`cache=True`），之后的进程调用 `warmup`
+    仅需加载缓存，适合在短生命周期的批处理任务启动时调用。
+    """
+    xs, ys = np.array([114.0, 0.0]), np.array([22.5, 0.0])
+    for kernel in KERNELS:
+        kernel(xs, ys)
+
+    return True
+
+
+if __name__ == '__main__':
+    import time
+    import numba
+
+    start = time.perf_counter()
+    warmup()
+    print(f"warmup: {time.perf_counter() - start:.2f} s")
+
+    n = 10_000_000
+    lng = np.random.uniform(73, 136, n)
+    lat = np.random.uniform(3, 54, n)
+
+    costs = {}
+    for n_threads in sorted({1, numba.config.NUMBA_NUM_THREADS}):
+        numba.set_num_threads(n_threads)
+        start = time.perf_counter()
+        wgs84_to_gcj02(lng, lat)
+        costs[n_threads] = time.perf_counter() - start
+        print(f"threads: {n_threads}, {costs[n_threads]:.2f} s, speedup over 1 thread: "
+              f"{costs[1] / costs[n_threads]:.1f}x")
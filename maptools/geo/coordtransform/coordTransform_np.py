@@ -0,0 +1,174 @@
+import numpy as np
+
+from . import coordTransform_nb as ct_nb
+
+
+def _as_lnglat_arrays(lng, lat=None):
+    """
+    将输入统一转换为 float64 的经纬度数组
+    :param lng: 经度数组，或 Point 类型的 GeoSeries / 几何数组（此时 lat 为 None）
+    :param lat: 纬度数组
+    :return: (lng, lat) 两个 np.ndarray
+    """
+    if lat is None:
+        import shapely
+        geoms = getattr(lng, 'values', lng)
+        return shapely.get_x(geoms).astype(np.float64), shapely.get_y(geoms).astype(np.float64)
+
+    lng = np.asarray(lng, dtype=np.float64)
+    lat = np.asarray(lat, dtype=np.float64)
+
+    return lng, lat
+
+
+def out_of_china(lng, lat):
+    """
+    逐元素判断是否在国内，不在国内不做偏移
+    :param lng: 经度数组
+    :param lat: 纬度数组
+    :return: bool 数组
+    """
+    return ~((lng > 73.66) & (lng < 135.05) & (lat > 3.86) & (lat < 53.55))
+
+
+# 批量转换的分块大小，`coordTransform_grid` 按此分批求值
+CHUNK_SIZE = 1 << 16
+
+
+def gcj_offset(lng, lat):
+    """
+    计算 WGS84 -> GCJ02 的偏移量（度），国外的点偏移量为 0。
+    由 `coordTransform_nb` 中可自动向量化（SIMD）的核函数计算：三角项以多项式与倍角公式递推代替 libm 调用，
+    逐元素与标量版本的差异 < 1e-13 度。
+    :param lng: 经度数组
+    :param lat: 纬度数组
+    :return: (dlng, dlat)
+    """
+    return ct_nb.gcj_offset(lng, lat)
+
+
+def gcj02_to_bd09(lng, lat=None):
+    """
+    火星坐标系(GCJ-02)转百度坐标系(BD-09)，向量化版本
+    :param lng: 火星坐标经度数组（或 Point GeoSeries）
+    :param lat: 火星坐标纬度数组
+    :return: (bd_lng, bd_lat)
+    """
+    return ct_nb.gcj02_to_bd09(*_as_lnglat_arrays(lng, lat))
+
+
+def bd09_to_gcj02(bd_lon, bd_lat=None):
+    """
+    百度坐标系(BD-09)转火星坐标系(GCJ-02)，向量化版本
+    :param bd_lon: 百度坐标经度数组（或 Point GeoSeries）
+    :param bd_lat: 百度坐标纬度数组
+    :return: (gg_lng, gg_lat)
+    """
+    return ct_nb.bd09_to_gcj02(*_as_lnglat_arrays(bd_lon, bd_lat))
+
+
+def wgs84_to_gcj02(lng, lat=None):
+    """
+    WGS84转GCJ02(火星坐标系)，向量化版本
+    :param lng: WGS84坐标系的经度数组（或 Point GeoSeries）
+    :param lat: WGS84坐标系的纬度数组
+    :return: (mglng, mglat)
+    """
+    return ct_nb.wgs84_to_gcj02(*_as_lnglat_arrays(lng, lat))
+
+
+def gcj02_to_wgs84(lng, lat=None):
+    """
+    GCJ02(火星坐标系)转GPS84，向量化版本
+    :param lng: 火星坐标系的经度数组（或 Point GeoSeries）
+    :param lat: 火星坐标系纬度数组
+    :return: (wgs_lng, wgs_lat)
+    """
+    return ct_nb.gcj02_to_wgs84(*_as_lnglat_arrays(lng, lat))
+
+
+def gcj02_to_wgs84_iterative(lng, lat=None, tol=1e-9, max_iter=10, return_info=False):
+    """
+    GCJ02(火星坐标系)转GPS84，迭代求逆版本。
+    `gcj02_to_wgs84` 只做一次线性近似 (lng * 2 - mglng)，误差可达米级；此处以其结果为初值做不动点迭代
+    w = w - (wgs84_to_gcj02(w) - g)，每一轮只对残差仍大于 `tol` 的元素重新计算。
+    :param lng: 火星坐标系的经度数组（或 Point GeoSeries）
+    :param lat: 火星坐标系纬度数组
+    :param tol: 收敛阈值（度），残差取经、纬度方向绝对误差的较大值，1e-9 度约为 0.1 毫米
+    :param max_iter: 最大迭代次数
+    :param return_info: 是否返回每个点的迭代次数、残差以及是否收敛
+    :return: (wgs_lng, wgs_lat) 或 (wgs_lng, wgs_lat, info)
+    """
+    lng, lat = _as_lnglat_arrays(lng, lat)
+    shape = np.broadcast(lng, lat).shape
+    lng, lat = np.broadcast_to(lng, shape).ravel(), np.broadcast_to(lat, shape).ravel()
+
+    dlng, dlat = gcj_offset(lng, lat)
+    wlng, wlat = lng - dlng, lat - dlat
+    iterations = np.zeros(lng.shape, dtype=np.int32)
+    residual = np.zeros(lng.shape, dtype=np.float64)
+
+    idxs = np.flatnonzero(~out_of_china(lng, lat))
+    for i in range(max_iter + 1):
+        if len(idxs) == 0:
+            break
+        _wlng, _wlat = wlng[idxs], wlat[idxs]
+        dlng, dlat = gcj_offset(_wlng, _wlat)
+        rlng = _wlng + dlng - lng[idxs]
+        rlat = _wlat + dlat - lat[idxs]
+        residual[idxs] = np.maximum(np.abs(rlng), np.abs(rlat))
+
+        active = residual[idxs] > tol
+        idxs, rlng, rlat = idxs[active], rlng[active], rlat[active]
+        if i == max_iter:
+            break
+        wlng[idxs] -= rlng
+        wlat[idxs] -= rlat
+        iterations[idxs] += 1
+
+    wlng, wlat = wlng.reshape(shape), wlat.reshape(shape)
+    if not return_info:
+        return wlng, wlat
+
+    info = {
+        'iterations': iterations.reshape(shape),
+        'residual': residual.reshape(shape),
+        'converged': (residual <= tol).reshape(shape),
+    }
+
+    return wlng, wlat, info
+
+
+def bd09_to_wgs84(bd_lon, bd_lat=None):
+    return ct_nb.bd09_to_wgs84(*_as_lnglat_arrays(bd_lon, bd_lat))
+
+
+def wgs84_to_bd09(lon, lat=None):
+    return ct_nb.wgs84_to_bd09(*_as_lnglat_arrays(lon, lat))
+
+
+if __name__ == '__main__':
+    import time
+    from . import coordTransform_py as ct
+
+    n = 10_000_000
+    lng = np.random.uniform(73, 136, n)
+    lat = np.random.uniform(3, 54, n)
+    # 核函数已编译并写入磁盘缓存后的耗时，首次运行的编译时间见 `coordTransform_nb.warmup`
+    ct_nb.warmup()
+
+    # 标量版本：逐点循环调用，按 20 万个点的耗时外推
+    n_scalar = 200_000
+    xs, ys = lng[:n_scalar].tolist(), lat[:n_scalar].tolist()
+    for name in ['wgs84_to_gcj02', 'gcj02_to_wgs84', 'gcj02_to_bd09', 'bd09_to_gcj02', 'wgs84_to_bd09', 'bd09_to_wgs84']:
+        start = time.perf_counter()
+        _ = globals()[name](lng, lat)
+        vec_cost = time.perf_counter() - start
+
+        func = getattr(ct, name)
+        start = time.perf_counter()
+        _ = [func(x, y) for x, y in zip(xs, ys)]
+        scalar_cost = (time.perf_counter() - start) * n / n_scalar
+
+        print(f"{name}: vectorized {vec_cost:.2f} s, scalar loop (extrapolated) {scalar_cost:.2f} s, "
+              f"speedup: {scalar_cost / vec_cost:.0f}x")
@@ -1,16 +1,50 @@
+import shapely
 import numpy as np
 import pandas as pd
 import geopandas as gpd
 from shapely import Point
+from scipy import sparse
+from pyproj import Geod
+from scipy.spatial import cKDTree
 
+from .projection import PROJECTION_CACHE
 
-def cal_pointwise_distance_geoseries(arr1, arr2, align=True):
+
+EARTH_RADIUS = 6_371_008.8
+WGS84_A = 6_378_137.0
+WGS84_E2 = 0.00669437999014
+GEOD = Geod(ellps='WGS84')
+# 每个分块中的元素个数上限，float64 时单个临时数组约 32 MB
+BLOCK_SIZE = 1 << 22
+
+
+def cal_pointwise_distance_xy(xy1, xy2):
+    """calculate pointwise distance between two already-projected coordinate arrays
+
+    Args:
+        xy1 (np.ndarray): (N, 2) projected coordinates.
+        xy2 (np.ndarray): (N, 2) projected coordinates.
+
+    Returns:
+        np.ndarray: Distance array
+    """
+    xy1, xy2 = np.asarray(xy1), np.asarray(xy2)
+    return np.hypot(xy1[:, 0] - xy2[:, 0], xy1[:, 1] - xy2[:, 1])
+
+def cal_pointwise_distance_geoseries(arr1, arr2, align=True, cache=PROJECTION_CACHE, metric='euclidean'):
     """calculate two geoseries distance
 
+    Geoseries in EPSG:4326 are measured in the UTM zone estimated from arr1. The UTM projection
+    context is looked up in `cache`, and when both arrays are Points with the same index, their
+    projected coordinates are cached too, so repeated calls on the same data skip the reprojection.
+
     Args:
         arr1 (gpd.GeoSeries): Geom array 1.
         arr2 (gpd.GeoSeries): Geom array 2.
         align (bool, optional): Align the two  Geom arrays. Defaults to True.
+        cache (ProjectionCache, optional): Projection cache. Defaults to PROJECTION_CACHE.
+        metric (str, optional): 'euclidean' for the distance in the estimated UTM zone, or one of
+            `DISTANCE_BACKENDS` to measure Points on the (lng, lat) directly. Defaults to 'euclidean'.
 
     Returns:
         pd.Series: Distance array
@@ -19,8 +53,6 @@ def cal_pointwise_distance_geoseries(arr1, arr2, align=True):
         arr1 = gpd.GeoSeries(arr1)
     if isinstance(arr2, pd.Series):
         arr2 = gpd.GeoSeries(arr2)
-    arr1.reset_index(drop=True)
-    arr2.reset_index(drop=True)
 
     crs_1 = arr1.crs
     crs_2 = arr2.crs
@@ -34,43 +66,343 @@ def cal_pointwise_distance_geoseries(arr1, arr2, align=True):
     else:
         assert crs_1 is not None and crs_2 is not None, "Turn `align` on to align geom1 and geom2"
 
-    if arr1.crs.to_epsg() == 4326:
-        crs = arr1.estimate_utm_crs()
-        dist = arr1.to_crs(crs).distance(arr2.to_crs(crs))
-    else:
-        dist = arr1.distance(arr2)
+    if metric in DISTANCE_BACKENDS:
+        arr1, arr2 = arr1.to_crs(4326).align(arr2.to_crs(4326))
+        types = np.concatenate([shapely.get_type_id(arr1.values), shapely.get_type_id(arr2.values)])
+        if not np.isin(types, [-1, 0]).all():
+            raise ValueError(f"Only Points are supported by the `{metric}` metric.")
+        return pd.Series(lnglat_distance(arr1, arr2, metric), index=arr1.index)
+    elif metric != 'euclidean':
+        raise ValueError(f"Unsupported metric: {metric}")
+
+    if arr2.crs != arr1.crs:
+        arr2 = arr2.to_crs(arr1.crs)
+    if arr1.crs.to_epsg() != 4326:
+        return arr1.distance(arr2)
+
+    ctx = cache.get_context(arr1)
+    is_points = (shapely.get_type_id(arr1.values) == 0).all() and (shapely.get_type_id(arr2.values) == 0).all()
+    if is_points and arr1.index.equals(arr2.index):
+        dist = cal_pointwise_distance_xy(cache.project_points(arr1, ctx), cache.project_points(arr2, ctx))
+        return pd.Series(dist, index=arr1.index)
+
+    return ctx.project(arr1).distance(ctx.project(arr2))
+
+def haversine_distance(lng1, lat1, lng2, lat2, radius=EARTH_RADIUS):
+    """Great-circle distance in meters between (lng1, lat1) and (lng2, lat2), broadcasting like numpy.
+
+    Args:
+        lng1, lat1, lng2, lat2 (array-like): Coordinates in degrees.
+        radius (float, optional): Earth radius in meters. Defaults to the mean radius.
+
+    Returns:
+        np.ndarray: Distance array.
+    """
+    lng1, lat1, lng2, lat2 = map(np.radians, (lng1, lat1, lng2, lat2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+
+    return 2 * radius * np.arcsin(np.sqrt(np.minimum(a, 1)))
+
+
+def equirectangular_distance(lng1, lat1, lng2, lat2):
+    """Equirectangular (local flat-earth) distance in meters, broadcasting like numpy.
+
+    The meridional and prime-vertical radii of curvature of the WGS84 ellipsoid are taken at the mean
+    latitude, so short distances are more accurate than the spherical haversine.
+
+    Args:
+        lng1, lat1, lng2, lat2 (array-like): Coordinates in degrees.
+
+    Returns:
+        np.ndarray: Distance array.
+    """
+    lng1, lat1, lng2, lat2 = (np.asarray(x, dtype=np.float64) for x in (lng1, lat1, lng2, lat2))
+    dlng = (lng2 - lng1 + 180) % 360 - 180
+    phi = np.radians((lat1 + lat2) / 2)
+    sin_phi = np.sin(phi)
+    w = 1 - WGS84_E2 * sin_phi * sin_phi
+    n = WGS84_A / np.sqrt(w)
+
+    x = np.radians(dlng) * n * np.cos(phi)
+    y = np.radians(lat2 - lat1) * (n * (1 - WGS84_E2) / w)
+
+    return np.sqrt(x * x + y * y)
+
+
+def geodesic_distance(lng1, lat1, lng2, lat2):
+    """Ellipsoidal (WGS84) geodesic distance in meters by Karney's algorithm (`pyproj.Geod.inv`),
+    broadcasting like numpy.
+
+    Args:
+        lng1, lat1, lng2, lat2 (array-like): Coordinates in degrees.
+
+    Returns:
+        np.ndarray: Distance array.
+    """
+    arrs = np.broadcast_arrays(*(np.asarray(x, dtype=np.float64) for x in (lng1, lat1, lng2, lat2)))
+    shape = arrs[0].shape
+    _, _, dist = GEOD.inv(*(np.ascontiguousarray(x).ravel() for x in arrs))
+
+    return np.asarray(dist, dtype=np.float64).reshape(shape)
+
+
+# 经纬度距离的三档精度（以 GeographicLib 的椭球测地线为真值，国内随机点对）：
+# - 'equirectangular': 平均纬度处椭球的子午圈、卯酉圈曲率半径下的平面近似，误差随距离平方增长，
+#                      相对误差约 2.5e-5 * (d / 150 km)^2，15 km 内 < 3 mm，75 km 约 0.4 m，150 km 约 3 m；
+# - 'haversine':       半径 6371008.8 m 的球面大圆距离，任意距离下相对误差 < 0.5%（约 5 m / km）；
+# - 'geodesic':        pyproj.Geod (Karney) 的椭球测地线，误差约 15 nm.
+# 单核吞吐（逐点）约为 equirectangular 15M/s，haversine 20M/s，geodesic 1.3M/s，见 `__main__`.
+DISTANCE_BACKENDS = {
+    'equirectangular': equirectangular_distance,
+    'haversine': haversine_distance,
+    'geodesic': geodesic_distance,
+}
+
+
+def lnglat_distance(xy1, xy2, metric='haversine'):
+    """Pointwise distance in meters between two (N, 2) arrays of (lng, lat) in degrees.
+
+    Args:
+        xy1 (np.ndarray | gpd.GeoSeries): (N, 2) coordinates or Point geometries.
+        xy2 (np.ndarray | gpd.GeoSeries): (N, 2) coordinates or Point geometries.
+        metric (str, optional): One of `DISTANCE_BACKENDS`. Defaults to 'haversine'.
+
+    Returns:
+        np.ndarray: Distance array
+    """
+    if metric not in DISTANCE_BACKENDS:
+        raise ValueError(f"Unsupported metric: {metric}, should be one of {list(DISTANCE_BACKENDS)}")
+    xy1, xy2 = _to_xy(xy1), _to_xy(xy2)
+
+    return DISTANCE_BACKENDS[metric](xy1[:, 0], xy1[:, 1], xy2[:, 0], xy2[:, 1])
+
+
+def _to_xy(points):
+    """(N, 2) float64 coordinates of a Point GeoSeries / geometry array / coordinate array."""
+    if isinstance(points, (gpd.GeoSeries, gpd.array.GeometryArray)) or \
+       (isinstance(points, np.ndarray) and points.dtype == object):
+        geoms = np.asarray(points, dtype=object)
+        return np.column_stack([shapely.get_x(geoms), shapely.get_y(geoms)])
+
+    return np.asarray(points, dtype=np.float64).reshape(-1, 2)
+
+
+def _to_unit_vectors(xy):
+    """Convert (lng, lat) in degrees to points on the unit sphere."""
+    lng, lat = np.radians(xy[:, 0]), np.radians(xy[:, 1])
+    cos_lat = np.cos(lat)
+
+    return np.column_stack([cos_lat * np.cos(lng), cos_lat * np.sin(lng), np.sin(lat)])
 
-    return dist
 
-def cal_distance_matrix_geoseries(points1, points2, align=True):
+def _block_distance(a, b, metric):
+    if metric in ('equirectangular', 'geodesic'):
+        return DISTANCE_BACKENDS[metric](a[:, None, 0], a[:, None, 1], b[None, :, 0], b[None, :, 1])
+
+    d = np.subtract.outer(a[:, 0], b[:, 0])
+    d *= d
+    for k in range(1, a.shape[1]):
+        tmp = np.subtract.outer(a[:, k], b[:, k])
+        tmp *= tmp
+        d += tmp
+    np.sqrt(d, out=d)
+
+    if metric == 'haversine':
+        # 弦长 c 与球面距离的关系 d = 2R * arcsin(c / 2)，避免了逐元素的三角函数与余弦公式的舍入误差
+        d *= 0.5
+        np.minimum(d, 1, out=d)
+        np.arcsin(d, out=d)
+        d *= 2 * EARTH_RADIUS
+
+    return d
+
+
+def distance_matrix(xy1, xy2, metric='haversine', dtype=np.float64, out=None,
+                    max_distance=None, block_size=BLOCK_SIZE):
+    """Pairwise distance matrix between two point sets, computed in memory-bounded row blocks.
+
+    Args:
+        xy1 (np.ndarray | gpd.GeoSeries): (n, 2) coordinates or Point geometries.
+        xy2 (np.ndarray | gpd.GeoSeries): (m, 2) coordinates or Point geometries.
+        metric (str, optional): 'euclidean' for projected coordinates, or one of `DISTANCE_BACKENDS`
+            ('equirectangular', 'haversine', 'geodesic') for (lng, lat) in degrees. Defaults to 'haversine'.
+        dtype (data-type, optional): Output dtype, e.g. np.float32 to halve the memory. Distances are
+            always computed in float64. Defaults to np.float64.
+        out (np.ndarray, optional): (n, m) array to fill in, e.g. a `np.lib.format.open_memmap`.
+        max_distance (float, optional): If given, only pairs within `max_distance` meters are kept and a
+            `scipy.sparse.csr_matrix` is returned. Pairs at distance 0 are stored explicitly.
+        block_size (int, optional): Maximum number of elements per block. Defaults to BLOCK_SIZE.
+
+    Returns:
+        np.ndarray | scipy.sparse.csr_matrix: Distance matrix of size n x m in meters.
+    """
+    if metric != 'euclidean' and metric not in DISTANCE_BACKENDS:
+        raise ValueError(f"Unsupported metric: {metric}")
+
+    xy1, xy2 = _to_xy(xy1), _to_xy(xy2)
+    n, m = len(xy1), len(xy2)
+    if metric == 'haversine':
+        xy1, xy2 = _to_unit_vectors(xy1), _to_unit_vectors(xy2)
+
+    if max_distance is None:
+        if out is None:
+            out = np.empty((n, m), dtype=dtype)
+        elif out.shape != (n, m):
+            raise ValueError(f"`out` must have shape {(n, m)}, got {out.shape}")
+    rows, cols, vals = [], [], []
+
+    step = max(1, block_size // max(m, 1))
+    for i in range(0, n, step):
+        d = _block_distance(xy1[i: i + step], xy2, metric)
+        if max_distance is None:
+            out[i: i + step] = d
+        else:
+            r, c = np.nonzero(d <= max_distance)
+            rows.append(r + i)
+            cols.append(c)
+            vals.append(d[r, c].astype(dtype))
+
+    if max_distance is None:
+        return out
+
+    if not vals:
+        return sparse.csr_matrix((n, m), dtype=dtype)
+
+    return sparse.csr_matrix(
+        (np.concatenate(vals), (np.concatenate(rows), np.concatenate(cols))), shape=(n, m))
+
+
+def _chord_to_arc(chord):
+    return 2 * EARTH_RADIUS * np.arcsin(np.minimum(chord / 2, 1))
+
+
+def _arc_to_chord(dist):
+    return 2 * np.sin(np.minimum(dist / EARTH_RADIUS, np.pi) / 2)
+
+
+def knn_distance(points1, points2, k=1, max_distance=None, metric='haversine', workers=-1,
+                 chunk_size=1_000_000):
+    """For each point in `points1`, find its k nearest neighbors in `points2` without a dense matrix.
+
+    A `scipy.spatial.cKDTree` is built on `points2`. For 'haversine' the tree holds the points on the unit
+    sphere, the chord length being monotonic in the great-circle distance, so the neighbors and distances
+    are exact; for 'euclidean' it holds the projected coordinates.
+
+    Args:
+        points1 (np.ndarray | gpd.GeoSeries): (n, 2) query coordinates or Point geometries.
+        points2 (np.ndarray | gpd.GeoSeries): (m, 2) coordinates or Point geometries to search.
+        k (int, optional): Number of neighbors. Defaults to 1.
+        max_distance (float, optional): Only return neighbors within `max_distance` meters.
+        metric (str, optional): 'haversine' for (lng, lat) in degrees, 'euclidean' for projected
+            coordinates. GeoSeries are converted to EPSG:4326 for 'haversine'; for 'euclidean', `points2`
+            is converted to the crs of `points1`, and EPSG:4326 is projected to the UTM zone estimated
+            from `points1`. A bare array is taken to be in the crs of the other GeoSeries, which must then
+            be projected for 'euclidean', otherwise a ValueError is raised. Defaults to 'haversine'.
+        workers (int, optional): Number of threads used by each query, -1 for all cores. Defaults to -1.
+        chunk_size (int, optional): Number of query points per chunk. Defaults to 1_000_000.
+
+    Returns:
+        tuple: (idxs, dists), arrays of shape (n, k), or (n,) when k == 1. Missing neighbors have
+            index -1 and distance inf.
+    """
+    if metric not in ('haversine', 'euclidean'):
+        raise ValueError(f"Unsupported metric: {metric}")
+
+    crs_1 = points1.crs if isinstance(points1, gpd.GeoSeries) else None
+    crs_2 = points2.crs if isinstance(points2, gpd.GeoSeries) else None
+    if metric == 'haversine':
+        # GeoSeries 统一到经纬度
+        points1 = points1.to_crs(4326) if crs_1 is not None and crs_1.to_epsg() != 4326 else points1
+        points2 = points2.to_crs(4326) if crs_2 is not None and crs_2.to_epsg() != 4326 else points2
+    elif crs_1 is not None and crs_2 is not None and crs_2 != crs_1:
+        points2 = points2.to_crs(crs_1)
+    elif (crs_1 is None) != (crs_2 is None) and (crs_1 or crs_2).is_geographic:
+        # 无法确定裸数组的坐标系，不做隐式的投影
+        raise ValueError("With metric='euclidean', a GeoSeries in a geographic crs can not be matched with "
+                         "a bare coordinate array. Pass both as GeoSeries, or both as projected arrays.")
+
+    xy1, xy2 = _to_xy(points1), _to_xy(points2)
+    if metric == 'euclidean' and crs_1 is not None and crs_1.to_epsg() == 4326:
+        ctx = PROJECTION_CACHE.get_context(points1)
+        xy1 = PROJECTION_CACHE.project_points(xy1, ctx)
+        xy2 = PROJECTION_CACHE.project_points(xy2, ctx) if crs_2 is not None else xy2
+
+    upper = np.inf if max_distance is None else max_distance
+    if metric == 'haversine':
+        xy1, xy2 = _to_unit_vectors(xy1), _to_unit_vectors(xy2)
+        upper = np.inf if max_distance is None else _arc_to_chord(max_distance)
+
+    n, m = len(xy1), len(xy2)
+    shape = (n,) if k == 1 else (n, k)
+    idxs = np.full(shape, -1, dtype=np.int64)
+    dists = np.full(shape, np.inf, dtype=np.float64)
+    if n == 0 or m == 0:
+        return idxs, dists
+
+    tree = cKDTree(xy2)
+    for i in range(0, n, chunk_size):
+        # 多线程查询，返回的 k 维结果不超过一个分块的大小
+        d, j = tree.query(xy1[i: i + chunk_size], k=k, distance_upper_bound=upper * (1 + 1e-12), workers=workers)
+        idxs[i: i + chunk_size] = j
+        dists[i: i + chunk_size] = d
+
+    missing = idxs >= m
+    idxs[missing] = -1
+    if metric == 'haversine':
+        dists[~missing] = _chord_to_arc(dists[~missing])
+    if max_distance is not None:
+        # 弦长换算的边界误差
+        over = dists > max_distance
+        idxs[over], dists[over] = -1, np.inf
+
+    return idxs, dists
+
+
+def cal_distance_matrix_geoseries(points1, points2, align=True, metric='euclidean', dtype=np.float64):
     """Generate a pairwise distance matrix between two GeoSeries.
 
     Args:
-        arr1 (gpd.GeoSeries): Geom array 1.
-        arr2 (gpd.GeoSeries): Geom array 2.
+        points1 (gpd.GeoSeries): Point array 1.
+        points2 (gpd.GeoSeries): Point array 2.
+        align (bool, optional): Align the crs of the two arrays. Defaults to True.
+        metric (str, optional): 'euclidean' measures in the UTM zone estimated from `points1` when the
+            points are in EPSG:4326 (as `cal_pointwise_distance_geoseries` does), the others in
+            `DISTANCE_BACKENDS` measure on the (lng, lat), which stays valid across UTM zones.
+            Defaults to 'euclidean'.
+        dtype (data-type, optional): Output dtype, e.g. np.float32 to halve the memory. Defaults to np.float64.
 
     Returns:
-        pd.DataFrame: A distance matrix of size n x m
+        pd.DataFrame: A distance matrix of size n x m, indexed by `points1.index` x `points2.index`.
+            Use `distance_matrix` directly to fill a memmap (`out`) or to get a sparse matrix
+            (`max_distance`).
     """
-    n, m = len(points1), len(points2)
+    crs_1, crs_2 = points1.crs, points2.crs
+    assert crs_1 is not None or crs_2 is not None, "arr1 and arr2 must have one has crs"
+    if align:
+        crs_1 = crs_1 if crs_1 is not None else crs_2
+        crs_2 = crs_2 if crs_2 is not None else crs_1
+    else:
+        assert crs_1 is not None and crs_2 is not None, "Turn `align` on to align geom1 and geom2"
+    points1 = gpd.GeoSeries(points1.values, index=points1.index, crs=crs_1)
+    points2 = gpd.GeoSeries(points2.values, index=points2.index, crs=crs_2)
 
-    # Replicate arr1 and arr2
-    repeated_arr1 = points1.repeat(m).reset_index(drop=True)
-    tiled_arr2 = np.tile(points2, n)
-    repeated_arr2 = gpd.GeoSeries(tiled_arr2, crs=points2.crs).reset_index(drop=True)
-    
-    # Calculate distances
-    distances = cal_pointwise_distance_geoseries(repeated_arr1, repeated_arr2, align=align)
+    if metric in DISTANCE_BACKENDS:
+        xy1, xy2 = _to_xy(points1.to_crs(4326)), _to_xy(points2.to_crs(4326))
+    elif points1.crs.to_epsg() == 4326:
+        ctx = PROJECTION_CACHE.get_context(points1)
+        xy1 = PROJECTION_CACHE.project_points(points1, ctx)
+        xy2 = PROJECTION_CACHE.project_points(points2.to_crs(4326), ctx)
+    else:
+        xy1, xy2 = _to_xy(points1), _to_xy(points2.to_crs(points1.crs))
 
-    # Reshape into matrix
-    distance_matrix = distances.values.reshape(n, m)
-    
-    return pd.DataFrame(distance_matrix, index=points1.index, columns=points2.index)
+    res = distance_matrix(xy1, xy2, metric=metric, dtype=dtype)
+
+    return pd.DataFrame(res, index=points1.index, columns=points2.index)
 
 
 if __name__ == "__main__":
-    # matrix = haversine_matrix(traj_points, points_, xy=True)
-    
+    import time
+
     # 创建两个测试 GeoSeries
     points1 = gpd.GeoSeries([Point(0, 0), Point(1, 1)])
     points2 = gpd.GeoSeries([Point(1, 1), Point(0, 0), Point(1, 1)])
@@ -80,6 +412,44 @@ if __name__ == "__main__":
     points2.set_crs(epsg=4326, inplace=True)
 
     # 计算两个 GeoSeries 之间的距离矩阵
-    distance_matrix = cal_distance_matrix_geoseries(points1, points2)
-    distance_matrix
+    print(cal_distance_matrix_geoseries(points1, points2))
+
+    # 20k x 20k 的 haversine 距离矩阵：float32 写入 memmap，以及 500 米截断的稀疏矩阵
+    import tempfile
+    n = 20_000
+    rng = np.random.default_rng(0)
+    xy1 = rng.uniform([113.8, 22.5], [114.3, 22.7], (n, 2))
+    xy2 = rng.uniform([113.8, 22.5], [114.3, 22.7], (n, 2))
+
+    fn = tempfile.mktemp(suffix='.npy')
+    out = np.lib.format.open_memmap(fn, mode='w+', dtype=np.float32, shape=(n, n))
+    start = time.perf_counter()
+    distance_matrix(xy1, xy2, dtype=np.float32, out=out)
+    print(f"{n} x {n} haversine -> float32 memmap: {time.perf_counter() - start:.2f} s")
+
+    start = time.perf_counter()
+    mat = distance_matrix(xy1, xy2, dtype=np.float32, max_distance=500)
+    print(f"{n} x {n} haversine, max_distance=500: {time.perf_counter() - start:.2f} s, nnz: {mat.nnz}")
+
+    # 500 万个点查询最近的 10 万个站点
+    xy1 = rng.uniform([73.66, 18.2], [135.05, 53.55], (5_000_000, 2))
+    xy2 = rng.uniform([73.66, 18.2], [135.05, 53.55], (100_000, 2))
+    start = time.perf_counter()
+    idxs, dists = knn_distance(xy1, xy2, k=3, max_distance=20_000)
+    print(f"knn: {len(xy1)} points x {len(xy2)} stations, k=3: {time.perf_counter() - start:.2f} s")
+
+    # 各精度档的吞吐与误差（以 geodesic 为真值）
+    n = 1_000_000
+    xy1 = rng.uniform([73.66, 18.2], [135.05, 53.55], (n, 2))
+    xy2 = xy1 + rng.uniform(-0.1, 0.1, (n, 2))
+    ans = lnglat_distance(xy1, xy2, 'geodesic')
+    for metric in DISTANCE_BACKENDS:
+        start = time.perf_counter()
+        dist = lnglat_distance(xy1, xy2, metric)
+        cost = time.perf_counter() - start
+        start = time.perf_counter()
+        distance_matrix(xy1[:2000], xy2[:2000], metric=metric)
+        mat_cost = time.perf_counter() - start
+        print(f"{metric:>15s}: pointwise {n / cost / 1e6:.1f}M pairs/s, matrix {4 / mat_cost:.1f}M pairs/s, "
+              f"max rel error within ~15 km: {np.abs(dist / ans - 1).max():.1e}")
 
@@ -3,6 +3,9 @@ from shapely import LineString, Point
 
 from math import atan2, cos, degrees, pi, radians, sin, sqrt
 
+from .coordtransform.GeoCoordinateTransform import to_crs
+from .projection import PROJECTION_CACHE
+
 def _is_point(input):
     if not isinstance(input, Point):
         raise TypeError(
@@ -31,13 +34,23 @@ def point_gdf_to_linestring(df, geom_col_name):
     else:
         raise RuntimeError("DataFrame needs at least two points to make line!")
     
-def convert_geom_to_utm_crs(gdf:gpd.GeoDataFrame, crs=None, inplace=True):
-    if crs is None:
+def convert_geom_to_utm_crs(gdf:gpd.GeoDataFrame, crs=None, inplace=True, ll_sys='wgs'):
+    """
+    Project `gdf` to the UTM crs. When the coordinates are GCJ-02 / BD-09 (`ll_sys` in ['gcj', 'bd']),
+    the datum shift and the projection are fused into one pass over the vertices.
+    """
+    if crs is None and gdf.crs is not None and gdf.crs.is_geographic:
+        # GCJ / BD 的偏移在百米量级，不影响 UTM 分带的估计
+        crs = PROJECTION_CACHE.get_context(gdf).crs.to_epsg()
+    elif crs is None:
         crs = gdf.estimate_utm_crs().to_epsg()
     
-    gdf.to_crs(crs, inplace=inplace)
+    if ll_sys == 'wgs':
+        res = gdf.to_crs(crs, inplace=inplace)
+    else:
+        res = to_crs(gdf, crs, source_crs=ll_sys, inplace=inplace)
     
-    return gdf
+    return gdf if inplace else res
 
 def convert_geom_to_wgs(gdf, crs='epsg:4326', inplace=True):
     gdf.to_crs(crs, inplace=inplace)
@@ -0,0 +1,68 @@
+import shapely
+import numpy as np
+
+
+# 每个分块中点-线对的个数，限制临时 Point 对象占用的内存
+CHUNK_SIZE = 1 << 20
+
+
+def linear_referencing_geom(point_geoms, line_geoms, keep_point=True, chunk_size=CHUNK_SIZE):
+    """
+    批量计算点在线上的投影，`point_geoms[i]` 投影到 `line_geoms[i]`.
+    全部基于 `shapely.line_locate_point` / `shapely.line_interpolate_point` 的向量化调用，按 `chunk_size` 分块.
+
+    Args:
+        point_geoms (array-like): 点几何数组（GeoSeries / np.ndarray）.
+        line_geoms (array-like): 与 point_geoms 等长的 LineString 几何数组.
+        keep_point (bool, optional): 是否返回投影点几何 `proj_point`. Defaults to True.
+        chunk_size (int, optional): 分块大小. Defaults to CHUNK_SIZE.
+
+    Returns:
+        dict: 各列均为长度 N 的 np.ndarray
+            - offset: 投影点距线起点的距离（沿线）;
+            - edge_len: 线的长度;
+            - dist_p2c: 点到投影点（即到线）的距离;
+            - proj_x, proj_y: 投影点坐标;
+            - proj_point: 投影点几何（keep_point 时）.
+    """
+    points = np.asarray(point_geoms, dtype=object)
+    lines = np.asarray(line_geoms, dtype=object)
+    assert points.shape == lines.shape, "point_geoms and line_geoms must have the same length"
+
+    n = len(points)
+    res = {key: np.empty(n, dtype=np.float64) for key in ['offset', 'edge_len', 'dist_p2c', 'proj_x', 'proj_y']}
+    if keep_point:
+        res['proj_point'] = np.empty(n, dtype=object)
+
+    for i in range(0, n, chunk_size):
+        sl = slice(i, i + chunk_size)
+        _points, _lines = points[sl], lines[sl]
+
+        offset = shapely.line_locate_point(_lines, _points)
+        proj = shapely.line_interpolate_point(_lines, offset)
+        px, py = shapely.get_x(proj), shapely.get_y(proj)
+        x, y = shapely.get_x(_points), shapely.get_y(_points)
+
+        res['offset'][sl] = offset
+        res['edge_len'][sl] = shapely.length(_lines)
+        res['dist_p2c'][sl] = np.hypot(x - px, y - py)
+        res['proj_x'][sl], res['proj_y'][sl] = px, py
+        if keep_point:
+            res['proj_point'][sl] = proj
+
+    return res
+
+
+if __name__ == "__main__":
+    import time
+
+    n = 2_000_000
+    rng = np.random.default_rng(0)
+    starts = rng.uniform(0, 50_000, (n, 2))
+    coords = np.stack([starts, starts + rng.normal(0, 100, (n, 2)), starts + rng.normal(0, 100, (n, 2))], axis=1)
+    lines = shapely.linestrings(coords)
+    points = shapely.points(starts + rng.normal(0, 50, (n, 2)))
+
+    start = time.perf_counter()
+    res = linear_referencing_geom(points, lines, keep_point=False)
+    print(f"{n} point-edge pairs: {time.perf_counter() - start:.2f} s")
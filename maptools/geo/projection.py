@@ -0,0 +1,148 @@
+import hashlib
+import shapely
+import numpy as np
+import geopandas as gpd
+from collections import OrderedDict
+from pyproj import CRS
+from pyproj.aoi import AreaOfInterest
+from pyproj.database import query_utm_crs_info
+
+from .coordtransform.GeoCoordinateTransform import get_transformer
+
+
+def query_utm_crs(x_center, y_center, datum_name="WGS 84"):
+    """
+    与 `GeoSeries.estimate_utm_crs` 相同，返回包含 (x_center, y_center) 的 UTM 投影.
+    """
+    utm_crs_list = query_utm_crs_info(
+        datum_name=datum_name,
+        area_of_interest=AreaOfInterest(
+            west_lon_degree=x_center,
+            south_lat_degree=y_center,
+            east_lon_degree=x_center,
+            north_lat_degree=y_center,
+        ),
+    )
+    if not utm_crs_list:
+        raise RuntimeError("Unable to determine UTM CRS")
+
+    return CRS.from_epsg(utm_crs_list[0].code)
+
+
+class ProjectionContext:
+    """
+    一个 UTM 投影的上下文：目标 crs 以及 EPSG:4326 -> crs 的 pyproj Transformer.
+    """
+
+    def __init__(self, crs):
+        self.crs = CRS.from_user_input(crs)
+        self.key = self.crs.to_string()
+        self.transformer = get_transformer(4326, self.crs)
+
+    def project_xy(self, xy):
+        """(N, 2) 经纬度 -> (N, 2) 投影坐标"""
+        xs, ys = self.transformer.transform(xy[:, 0], xy[:, 1])
+        return np.column_stack([xs, ys])
+
+    def project(self, geoms):
+        """投影任意几何对象，GeoSeries 保留 index."""
+        if isinstance(geoms, gpd.GeoSeries):
+            res = shapely.transform(np.asarray(geoms.values, dtype=object), self.project_xy)
+            return gpd.GeoSeries(res, index=geoms.index, crs=self.crs, name=geoms.name)
+
+        return shapely.transform(geoms, self.project_xy)
+
+    def __repr__(self):
+        return f"ProjectionContext({self.crs.to_string()})"
+
+
+class ProjectionCache:
+    """
+    UTM 投影缓存.
+
+    - UTM 带的划分（含挪威、斯瓦尔巴的特例）与南北半球的分界均落在整数经纬度上，
+      因此 `estimate_utm_crs` 的结果只与 bbox 中心所在的 1° x 1° 格网有关，以此作为投影上下文的键，
+      并在格网单元的中心解析 UTM 带（中心恰在带边界上时取东侧/北侧的带）；
+    - 已投影的坐标数组按 (crs, 坐标内容的摘要) 缓存在一个容量为 `maxsize` 的 LRU 中，
+      同一份数据重复计算距离时无需再次投影.
+
+    Example:
+    >>> ctx = PROJECTION_CACHE.get_context(gdf)
+    >>> xy = PROJECTION_CACHE.project_points(gdf.geometry, ctx)
+    >>> PROJECTION_CACHE.stats
+    """
+
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self._contexts = {}
+        self._arrays = OrderedDict()
+        self.stats = {'context_hits': 0, 'context_misses': 0, 'array_hits': 0, 'array_misses': 0}
+
+    def clear(self):
+        self._contexts.clear()
+        self._arrays.clear()
+        for key in self.stats:
+            self.stats[key] = 0
+
+    def get_context(self, data):
+        """
+        获取数据对应的 UTM 投影上下文.
+
+        Args:
+            data (gpd.GeoSeries | gpd.GeoDataFrame | tuple): EPSG:4326 的几何数据，或 (minx, miny, maxx, maxy).
+
+        Returns:
+            ProjectionContext
+        """
+        if isinstance(data, (gpd.GeoSeries, gpd.GeoDataFrame)):
+            assert data.crs is not None and data.crs.is_geographic, "data must be in a geographic crs"
+            minx, miny, maxx, maxy = data.total_bounds
+        else:
+            minx, miny, maxx, maxy = data
+        x_center, y_center = (minx + maxx) / 2, (miny + maxy) / 2
+
+        key = (int(np.floor(x_center)), int(np.floor(y_center)))
+        ctx = self._contexts.get(key)
+        if ctx is None:
+            self.stats['context_misses'] += 1
+            # 在格网单元的中心解析 UTM 带，中心恰好落在带边界上时结果也不依赖查询顺序
+            ctx = self._contexts[key] = ProjectionContext(query_utm_crs(key[0] + 0.5, key[1] + 0.5))
+        else:
+            self.stats['context_hits'] += 1
+
+        return ctx
+
+    def project_points(self, points, ctx=None):
+        """
+        投影 Point 数组，返回 (N, 2) 的投影坐标（只读），相同内容的输入直接返回缓存结果.
+
+        Args:
+            points (gpd.GeoSeries | np.ndarray): EPSG:4326 的 Point GeoSeries，或 (N, 2) 的经纬度数组.
+            ctx (ProjectionContext, optional): 投影上下文，默认由 `get_context` 根据 points 的范围确定.
+        """
+        if isinstance(points, (gpd.GeoSeries, np.ndarray)) and np.asarray(points).dtype == object:
+            geoms = np.asarray(points, dtype=object)
+            xy = np.column_stack([shapely.get_x(geoms), shapely.get_y(geoms)])
+        else:
+            xy = np.ascontiguousarray(points, dtype=np.float64).reshape(-1, 2)
+        if ctx is None:
+            ctx = self.get_context((*xy.min(axis=0), *xy.max(axis=0)))
+
+        key = (ctx.key, hashlib.blake2b(xy.tobytes(), digest_size=16).digest())
+        res = self._arrays.get(key)
+        if res is not None:
+            self.stats['array_hits'] += 1
+            self._arrays.move_to_end(key)
+            return res
+
+        self.stats['array_misses'] += 1
+        res = ctx.project_xy(xy)
+        res.flags.writeable = False
+        self._arrays[key] = res
+        if len(self._arrays) > self.maxsize:
+            self._arrays.popitem(last=False)
+
+        return res
+
+
+PROJECTION_CACHE = ProjectionCache()
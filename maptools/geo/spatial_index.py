@@ -0,0 +1,432 @@
+import os
+import json
+import hashlib
+import weakref
+import shapely
+import numpy as np
+from pathlib import Path
+from numba import njit
+
+
+NODE_DTYPE = np.dtype([
+    ('minx', np.float64), ('miny', np.float64), ('maxx', np.float64), ('maxy', np.float64),
+    ('index', np.int64),
+])
+
+
+@njit(cache=True)
+def _upper_bound(value, arr):
+    i, j = 0, len(arr) - 1
+    while i < j:
+        m = (i + j) >> 1
+        if arr[m] > value:
+            j = m
+        else:
+            i = m + 1
+
+    return arr[i]
+
+
+@njit(cache=True)
+def _query_boxes(minx, miny, maxx, maxy, indices, level_bounds, node_size, n_items, qboxes):
+    cap = max(16, len(qboxes) * 4)
+    out_q = np.empty(cap, dtype=np.int64)
+    out_i = np.empty(cap, dtype=np.int64)
+    n_out = 0
+    stack = np.empty(64 * node_size, dtype=np.int64)
+
+    for q in range(len(qboxes)):
+        qminx, qminy, qmaxx, qmaxy = qboxes[q, 0], qboxes[q, 1], qboxes[q, 2], qboxes[q, 3]
+        node = len(minx) - 1
+        n_stack = 0
+        while True:
+            end = min(node + node_size, _upper_bound(node, level_bounds))
+            for pos in range(node, end):
+                # NaN 的外包框（空几何）不与任何框相交
+                if not (maxx[pos] >= qminx and maxy[pos] >= qminy and minx[pos] <= qmaxx and miny[pos] <= qmaxy):
+                    continue
+                if node < n_items:
+                    if n_out == cap:
+                        cap *= 2
+                        out_q = np.concatenate((out_q, np.empty(cap - n_out, dtype=np.int64)))
+                        out_i = np.concatenate((out_i, np.empty(cap - n_out, dtype=np.int64)))
+                    out_q[n_out] = q
+                    out_i[n_out] = indices[pos]
+                    n_out += 1
+                else:
+                    stack[n_stack] = indices[pos]
+                    n_stack += 1
+            if n_stack == 0:
+                break
+            n_stack -= 1
+            node = stack[n_stack]
+
+    return out_q[:n_out], out_i[:n_out]
+
+
+class PackedRTree:
+    """
+    静态的、扁平数组存储的 packed R-tree（Sort-Tile-Recursive 打包），只依赖几何的外包框。
+
+    - 所有节点存储在一个 `NODE_DTYPE` 结构化数组中：前 n 个为按 STR 顺序排列的叶子（`index` 为原几何的位置），
+      其后逐层为内部节点（`index` 为第一个子节点的位置），根节点位于末尾；
+    - `save` 写出 .npy 与同名 .json（层级边界等元数据），`load` 以 `mmap_mode='r'` 打开，
+      与 `GCJOffsetGrid` 相同，worker 进程加载的开销为 O(1)，且共享同一份页缓存；
+    - `query` 返回与 `GeoSeries.sindex.query` 相同格式的 (2, M) 数组，外包框命中后再用 shapely 做精确的谓词判断。
+
+    Example:
+    >>> tree = PackedRTree.from_geometries(gdf.geometry)
+    >>> tree.save(sindex_path('./cache/network.ckpt'))
+    >>> tree = PackedRTree.load(sindex_path('./cache/network.ckpt'))  # worker 中
+    >>> cands = tree.query(points, predicate='dwithin', distance=50, geometries=gdf.geometry.values)
+    """
+
+    def __init__(self, nodes, level_bounds, node_size, n_items, fingerprint=None):
+        self.nodes = nodes
+        self.level_bounds = np.asarray(level_bounds, dtype=np.int64)
+        self.node_size = int(node_size)
+        self.n_items = int(n_items)
+        self.fingerprint = fingerprint
+
+    def __len__(self):
+        return self.n_items
+
+    @classmethod
+    def from_bounds(cls, bounds, node_size=16):
+        """
+        由 (N, 4) 的 (minx, miny, maxx, maxy) 数组构建.
+        """
+        bounds = np.asarray(bounds, dtype=np.float64).reshape(-1, 4)
+        n = len(bounds)
+
+        # STR: 按中心 x 切为 S 个竖条，每个竖条内按中心 y 排序
+        cx = (bounds[:, 0] + bounds[:, 2]) / 2
+        cy = (bounds[:, 1] + bounds[:, 3]) / 2
+        n_leaves = max(1, int(np.ceil(n / node_size)))
+        slice_size = int(np.ceil(np.sqrt(n_leaves))) * node_size
+        rank_x = np.empty(n, dtype=np.int64)
+        rank_x[np.argsort(np.nan_to_num(cx), kind='stable')] = np.arange(n)
+        order = np.lexsort((np.nan_to_num(cy), rank_x // slice_size))
+
+        levels, indices = [bounds[order]], [order]
+        level_bounds = [n]
+        while True:
+            cur = levels[-1]
+            starts = np.arange(0, len(cur), node_size)
+            parent = np.column_stack([
+                np.fmin.reduceat(cur[:, 0], starts), np.fmin.reduceat(cur[:, 1], starts),
+                np.fmax.reduceat(cur[:, 2], starts), np.fmax.reduceat(cur[:, 3], starts),
+            ]) if len(cur) else np.full((1, 4), np.nan)
+            levels.append(parent)
+            indices.append(level_bounds[-1] - len(cur) + starts if len(cur) else np.zeros(1, dtype=np.int64))
+            level_bounds.append(level_bounds[-1] + len(parent))
+            if len(parent) == 1:
+                break
+
+        boxes = np.concatenate(levels)
+        nodes = np.empty(len(boxes), dtype=NODE_DTYPE)
+        for i, key in enumerate(['minx', 'miny', 'maxx', 'maxy']):
+            nodes[key] = boxes[:, i]
+        nodes['index'] = np.concatenate(indices)
+
+        return cls(nodes, level_bounds, node_size, n)
+
+    @classmethod
+    def from_geometries(cls, geoms, node_size=16):
+        return cls.from_bounds(shapely.bounds(np.asarray(geoms, dtype=object)), node_size)
+
+    def save(self, filename):
+        filename = Path(filename)
+        filename.parent.mkdir(parents=True, exist_ok=True)
+        np.save(filename, np.asarray(self.nodes))
+        meta = {'level_bounds': self.level_bounds.tolist(), 'node_size': self.node_size, 'n_items': self.n_items,
+                'fingerprint': self.fingerprint}
+        with open(filename.with_suffix('.json'), 'w') as f:
+            json.dump(meta, f)
+
+        return filename
+
+    @classmethod
+    def load(cls, filename, mmap_mode='r'):
+        filename = Path(filename)
+        with open(filename.with_suffix('.json'), 'r') as f:
+            meta = json.load(f)
+        nodes = np.load(filename, mmap_mode=mmap_mode)
+
+        return cls(nodes, **meta)
+
+    def query_bounds(self, qboxes):
+        """
+        返回外包框相交的 (query 位置, 几何位置) 对.
+        """
+        qboxes = np.asarray(qboxes, dtype=np.float64).reshape(-1, 4)
+        nodes = np.asarray(self.nodes)
+
+        return _query_boxes(nodes['minx'], nodes['miny'], nodes['maxx'], nodes['maxy'], nodes['index'],
+                            self.level_bounds, self.node_size, self.n_items, qboxes)
+
+    def query(self, geoms, predicate=None, distance=None, geometries=None):
+        """
+        与 `STRtree.query` 相同的批量查询.
+
+        Args:
+            geoms (array-like): 查询几何.
+            predicate (str, optional): None 时只比较外包框，否则为 shapely 的二元谓词，如 'intersects'、'dwithin'.
+            distance (float, optional): 'dwithin' 的距离.
+            geometries (array-like, optional): 建树时的几何数组，谓词判断时需要.
+
+        Returns:
+            np.ndarray: (2, M) 的数组，第一行为查询几何的位置，第二行为树中几何的位置.
+        """
+        geoms = np.asarray(geoms, dtype=object)
+        qboxes = shapely.bounds(geoms)
+        if predicate == 'dwithin':
+            assert distance is not None, "`distance` is required by the 'dwithin' predicate"
+            qboxes = qboxes + np.array([-distance, -distance, distance, distance])
+
+        q_idx, t_idx = self.query_bounds(qboxes)
+        if predicate is not None:
+            assert geometries is not None, "`geometries` is required to test the predicate"
+            geometries = np.asarray(geometries, dtype=object)
+            if predicate == 'dwithin':
+                mask = shapely.dwithin(geoms[q_idx], geometries[t_idx], distance)
+            else:
+                mask = getattr(shapely, predicate)(geoms[q_idx], geometries[t_idx])
+            q_idx, t_idx = q_idx[mask], t_idx[mask]
+
+        return np.vstack([q_idx, t_idx])
+
+
+
+def _expand_ranges(starts, counts):
+    """[starts[i], starts[i] + counts[i]) 的拼接，以及每个元素所属的 i"""
+    owner = np.repeat(np.arange(len(counts)), counts)
+    offsets = np.cumsum(counts) - counts
+    local = np.arange(counts.sum()) - np.repeat(offsets, counts)
+
+    return owner, np.repeat(starts, counts) + local, local
+
+
+class GridIndex:
+    """
+    均匀格网哈希索引：以 (floor((x - x0) / cell_size), floor((y - y0) / cell_size)) 为格网键，
+    以 CSR 形式存储格网 -> 几何的映射（`cell_offsets`、`cell_items`）。格网数不超过几何-格网对数的 4 倍时
+    `cell_offsets` 按稠密格网直接寻址，否则只保存非空格网的有序键 `cell_keys`，以 `np.searchsorted` 查找.
+
+    固定半径 r 的查询令 cell_size = r 时，点的 [p - r, p + r] 查询框只落在 3x3 邻域中的至多 2x2 个格网内，
+    探测、去重与外包框过滤都是数组运算。跨越多个格网的几何在查询框与其格网范围的第一个公共格网中才计入，
+    因此无需对结果排序去重。接口与 `PackedRTree.query` 相同，可作为 `find_nearest_geometries` 的 `sindex`.
+
+    Example:
+    >>> grid = GridIndex.from_geometries(gdf.geometry, cell_size=500)
+    >>> cands = grid.query(points, predicate='dwithin', distance=500, geometries=gdf.geometry.values)
+    """
+
+    def __init__(self, bounds, x0, y0, cell_size, n_cols, n_rows, cell_offsets, cell_items, cell_keys=None):
+        self.bounds = bounds
+        self.x0, self.y0 = float(x0), float(y0)
+        self.cell_size = float(cell_size)
+        self.n_cols, self.n_rows = int(n_cols), int(n_rows)
+        self.cell_offsets = cell_offsets
+        self.cell_items = cell_items
+        self.cell_keys = cell_keys
+
+        self._item_cx0 = self._cell_x(bounds[:, 0])
+        self._item_cy0 = self._cell_y(bounds[:, 1])
+
+    def __len__(self):
+        return len(self.bounds)
+
+    def _cell_x(self, x):
+        return np.clip(np.floor((np.nan_to_num(x, nan=-np.inf) - self.x0) / self.cell_size), -1, self.n_cols) \
+                 .astype(np.int64)
+
+    def _cell_y(self, y):
+        return np.clip(np.floor((np.nan_to_num(y, nan=-np.inf) - self.y0) / self.cell_size), -1, self.n_rows) \
+                 .astype(np.int64)
+
+    def _cell_ranges(self, bounds):
+        cx0 = np.maximum(self._cell_x(bounds[:, 0]), 0)
+        cy0 = np.maximum(self._cell_y(bounds[:, 1]), 0)
+        cx1 = np.minimum(self._cell_x(bounds[:, 2]), self.n_cols - 1)
+        cy1 = np.minimum(self._cell_y(bounds[:, 3]), self.n_rows - 1)
+        valid = ~np.isnan(bounds).any(axis=1)
+        nx = np.where(valid, np.maximum(cx1 - cx0 + 1, 0), 0)
+        ny = np.where(valid, np.maximum(cy1 - cy0 + 1, 0), 0)
+
+        return cx0, cy0, nx, ny
+
+    def _enumerate_cells(self, bounds):
+        """每个外包框覆盖的格网：(框的位置, cx, cy)"""
+        cx0, cy0, nx, ny = self._cell_ranges(bounds)
+        owner, _, local = _expand_ranges(np.zeros(len(bounds), dtype=np.int64), nx * ny)
+        _nx = nx[owner]
+
+        return owner, cx0[owner] + local % _nx, cy0[owner] + local // _nx
+
+    @classmethod
+    def from_bounds(cls, bounds, cell_size):
+        bounds = np.asarray(bounds, dtype=np.float64).reshape(-1, 4)
+        x0, y0 = np.nanmin(bounds[:, 0]) if len(bounds) else 0, np.nanmin(bounds[:, 1]) if len(bounds) else 0
+        n_cols = int(np.floor((np.nanmax(bounds[:, 2]) - x0) / cell_size)) + 1 if len(bounds) else 1
+        n_rows = int(np.floor((np.nanmax(bounds[:, 3]) - y0) / cell_size)) + 1 if len(bounds) else 1
+
+        grid = cls(bounds, x0, y0, cell_size, n_cols, n_rows, None, None)
+        items, cx, cy = grid._enumerate_cells(bounds)
+        keys = cy * n_cols + cx
+        order = np.argsort(keys, kind='stable')
+        grid.cell_items = items[order]
+        if n_cols * n_rows <= 4 * max(len(keys), 1):
+            counts = np.bincount(keys, minlength=n_cols * n_rows)
+        else:
+            grid.cell_keys, counts = np.unique(keys[order], return_counts=True)
+        grid.cell_offsets = np.zeros(len(counts) + 1, dtype=np.int64)
+        np.cumsum(counts, out=grid.cell_offsets[1:])
+
+        return grid
+
+    @classmethod
+    def from_geometries(cls, geoms, cell_size):
+        return cls.from_bounds(shapely.bounds(np.asarray(geoms, dtype=object)), cell_size)
+
+    def query_bounds(self, qboxes):
+        """
+        返回外包框相交的 (query 位置, 几何位置) 对.
+        """
+        qboxes = np.asarray(qboxes, dtype=np.float64).reshape(-1, 4)
+        q_cx0 = np.maximum(self._cell_x(qboxes[:, 0]), 0)
+        q_cy0 = np.maximum(self._cell_y(qboxes[:, 1]), 0)
+
+        # 探测查询框覆盖的格网，展开格网中的几何
+        q_idx, cx, cy = self._enumerate_cells(qboxes)
+        keys = cy * self.n_cols + cx
+        if self.cell_keys is not None:
+            found = np.searchsorted(self.cell_keys, keys)
+            empty = found == len(self.cell_keys)
+            empty[~empty] = self.cell_keys[found[~empty]] != keys[~empty]
+            keys = np.where(empty, 0, found)
+        starts = self.cell_offsets[keys]
+        counts = self.cell_offsets[keys + 1] - starts
+        if self.cell_keys is not None:
+            counts[empty] = 0
+        owner, pos, _ = _expand_ranges(starts, counts)
+        q_idx, cx, cy, t_idx = q_idx[owner], cx[owner], cy[owner], self.cell_items[pos]
+
+        # 只在第一个公共格网中计入，并过滤外包框不相交的几何
+        keep = (cx == np.maximum(self._item_cx0[t_idx], q_cx0[q_idx])) & \
+               (cy == np.maximum(self._item_cy0[t_idx], q_cy0[q_idx]))
+        q_idx, t_idx = q_idx[keep], t_idx[keep]
+        tb, qb = self.bounds[t_idx], qboxes[q_idx]
+        keep = (tb[:, 2] >= qb[:, 0]) & (tb[:, 3] >= qb[:, 1]) & (tb[:, 0] <= qb[:, 2]) & (tb[:, 1] <= qb[:, 3])
+
+        return q_idx[keep], t_idx[keep]
+
+    query = PackedRTree.query
+
+
+_GRID_INDEX_CACHE = {}
+
+def get_grid_index(geometries, cell_size, rebuild=False):
+    """
+    获取 GeoDataFrame / GeoSeries 的格网索引，同一对象与 cell_size 只构建一次，对象回收时缓存随之释放.
+    缓存以几何数组对象与 crs 为指纹（O(1) 比较），原地 `to_crs` 或整列替换几何后自动重建；
+    逐元素原地修改几何（如 `gdf.loc[i, 'geometry'] = ...`）不改变几何数组对象，需传入 `rebuild=True`.
+    """
+    key = (id(geometries), float(cell_size))
+    values = geometries.geometry.values
+    cached = _GRID_INDEX_CACHE.get(key)
+    if cached is None:
+        weakref.finalize(geometries, _GRID_INDEX_CACHE.pop, key, None)
+    elif not rebuild and cached[1]() is values and cached[2] == values.crs:
+        return cached[0]
+
+    grid = GridIndex.from_bounds(shapely.bounds(np.asarray(values, dtype=object)), cell_size)
+    _GRID_INDEX_CACHE[key] = (grid, weakref.ref(values), values.crs)
+
+    return grid
+
+
+def network_fingerprint(geometries, ckpt=None):
+    """
+    路网的指纹：有 checkpoint 时取其路径、大小与修改时间，否则取几何外包框的摘要.
+    """
+    h = hashlib.blake2b(digest_size=16)
+    h.update(str(len(geometries)).encode())
+    if ckpt is not None and os.path.exists(ckpt):
+        st = os.stat(ckpt)
+        h.update(f"{os.path.abspath(ckpt)}:{st.st_size}:{st.st_mtime_ns}".encode())
+    else:
+        geoms = geometries.geometry.values if hasattr(geometries, 'geometry') else geometries
+        h.update(np.ascontiguousarray(shapely.bounds(np.asarray(geoms, dtype=object))).tobytes())
+
+    return h.hexdigest()
+
+
+def sindex_path(ckpt):
+    """网络 checkpoint 旁的空间索引文件路径，如 network.ckpt -> network.sindex.npy"""
+    ckpt = Path(ckpt)
+    return ckpt.with_name(f"{ckpt.stem}.sindex.npy")
+
+
+def load_or_build_sindex(geometries, ckpt):
+    """
+    加载 checkpoint 旁的空间索引，不存在或路网指纹（`network_fingerprint`）不一致时重新构建并保存.
+    """
+    fn = sindex_path(ckpt)
+    fingerprint = network_fingerprint(geometries, ckpt)
+    if fn.exists():
+        tree = PackedRTree.load(fn)
+        if tree.fingerprint == fingerprint:
+            return tree
+
+    tree = PackedRTree.from_geometries(geometries)
+    tree.fingerprint = fingerprint
+    tree.save(fn)
+
+    return PackedRTree.load(fn)
+
+if __name__ == "__main__":
+    import time
+    import tempfile
+
+    n = 1_000_000
+    rng = np.random.default_rng(0)
+    starts = rng.uniform(0, 100_000, (n, 2))
+    lines = shapely.linestrings(np.stack([starts, starts + rng.normal(0, 100, (n, 2))], axis=1))
+    points = shapely.points(rng.uniform(0, 100_000, (100_000, 2)))
+
+    start = time.perf_counter()
+    tree = shapely.STRtree(lines)
+    tree.query(points[:1])
+    print(f"STRtree build: {time.perf_counter() - start:.2f} s")
+
+    fn = Path(tempfile.mkdtemp()) / 'network.sindex.npy'
+    start = time.perf_counter()
+    PackedRTree.from_geometries(lines).save(fn)
+    print(f"PackedRTree build + save: {time.perf_counter() - start:.2f} s")
+
+    start = time.perf_counter()
+    packed = PackedRTree.load(fn)
+    print(f"PackedRTree load (mmap): {(time.perf_counter() - start) * 1e3:.2f} ms")
+
+    packed.query(points[:1])
+    start = time.perf_counter()
+    res = packed.query(points, 'dwithin', 50, lines)
+    packed_cost = time.perf_counter() - start
+    start = time.perf_counter()
+    ans = tree.query(points, 'dwithin', distance=50)
+    print(f"query {len(points)} points: PackedRTree {packed_cost:.2f} s, STRtree {time.perf_counter() - start:.2f} s, "
+          f"same result: {set(zip(*res)) == set(zip(*ans))}")
+
+    # 格网索引 vs STRtree：不同的查询半径（cell_size = radius）
+    for radius in [20, 50, 100, 200, 500]:
+        start = time.perf_counter()
+        grid = GridIndex.from_geometries(lines, radius)
+        build_cost = time.perf_counter() - start
+        start = time.perf_counter()
+        res = grid.query(points, 'dwithin', radius, lines)
+        grid_cost = time.perf_counter() - start
+        start = time.perf_counter()
+        ans = tree.query(points, 'dwithin', distance=radius)
+        print(f"radius {radius}: GridIndex build {build_cost:.2f} s, query {grid_cost:.2f} s, "
+              f"STRtree query {time.perf_counter() - start:.2f} s, same result: {len(res[0]) == len(ans[0])}")
@@ -1,26 +1,22 @@
 import geopandas as gpd
 import pandas as pd
 import numpy as np
-from shapely.geometry import Point, LineString, Polygon, MultiPolygon
-import coordTransform_py.CoordTransform_utils as ct
+from shapely.geometry import Point, LineString
+from maptools.geo.coordtransform.GeoCoordinateTransform import convert_geodf_coordinates
 
 
 def polyline_wgs_to_gcj(gdf):
     '''
     transfer the shapfile coordination system
     '''
-    gdf['geometry'] = gdf.apply(lambda i: LineString(pd.DataFrame(i.geometry.coords.xy).T.rename(
-        columns={0: 'x', 1: 'y'}).apply(lambda x: ct.wgs84_to_gcj02(x.x, x.y), axis=1)), axis=1)
-    return gdf
+    return convert_geodf_coordinates(gdf, 'wgs', 'gcj')
 
 
 def polyline_gcj_to_wgs(gdf):
     '''
     transfer the shapfile coordination system
     '''
-    gdf['geometry'] = gdf.apply(lambda i: LineString(pd.DataFrame(i.geometry.coords.xy).T.rename(
-        columns={0: 'x', 1: 'y'}).apply(lambda x: ct.gcj02_to_wgs84(x.x, x.y), axis=1)), axis=1)
-    return gdf
+    return convert_geodf_coordinates(gdf, 'gcj', 'wgs')
 
 
 # new function
@@ -28,50 +24,20 @@ def gdf_wgs_to_gcj(gdf):
     '''
     transfer the shapfile coordination system
     '''
-    if isinstance(gdf.iloc[0].geometry, Polygon):
-        gdf['geometry'] = gdf.apply(lambda i: Polygon(pd.DataFrame(i.geometry.exterior.coords.xy).T.rename(
-            columns={0: 'x', 1: 'y'}).apply(lambda x: ct.wgs84_to_gcj02(x.x, x.y), axis=1)), axis=1)
-    elif isinstance(gdf.iloc[0].geometry, LineString):
-        gdf['geometry'] = gdf.apply(lambda i: LineString(pd.DataFrame(i.geometry.coords.xy).T.rename(
-            columns={0: 'x', 1: 'y'}).apply(lambda x: ct.wgs84_to_gcj02(x.x, x.y), axis=1)), axis=1)
-    elif isinstance(gdf.iloc[0].geometry, MultiPolygon):
-        gdf['geometry'] = gdf.geometry.apply(lambda item: MultiPolygon([ Polygon(pd.DataFrame( geom.exterior.coords.xy ).T.rename(columns={0: 'x', 1: 'y'}).apply( lambda x: ct.wgs84_to_gcj02(x.x, x.y), axis=1)) for geom in item.geoms]) )
-    elif isinstance(gdf.iloc[0].geometry, Point):
-            gdf['geometry'] = gdf.apply(lambda i: Point(ct.wgs84_to_gcj02(i.geometry.x, i.geometry.y)), axis=1)
-    return gdf
+    return convert_geodf_coordinates(gdf, 'wgs', 'gcj')
 
 
 def gdf_gcj_to_wgs(gdf):
     '''
     transfer the shapfile coordination system
     '''
-    if isinstance(gdf.iloc[0].geometry, Polygon):
-        gdf['geometry'] = gdf.apply(lambda i: Polygon(pd.DataFrame(i.geometry.exterior.coords.xy).T.rename(
-            columns={0: 'x', 1: 'y'}).apply(lambda x: ct.gcj02_to_wgs84(x.x, x.y), axis=1)), axis=1)
-    elif isinstance(gdf.iloc[0].geometry, LineString):
-        gdf['geometry'] = gdf.apply(lambda i: LineString(pd.DataFrame(i.geometry.coords.xy).T.rename(
-            columns={0: 'x', 1: 'y'}).apply(lambda x: ct.gcj02_to_wgs84(x.x, x.y), axis=1)), axis=1)
-    elif isinstance(gdf.iloc[0].geometry, MultiPolygon):
-        gdf['geometry'] = gdf.geometry.apply(lambda item: MultiPolygon([ Polygon(pd.DataFrame( geom.exterior.coords.xy ).T.rename(columns={0: 'x', 1: 'y'}).apply( lambda x: ct.gcj02_to_wgs84(x.x, x.y), axis=1)) for geom in item.geoms]) )
-    elif isinstance(gdf.iloc[0].geometry, Point):
-            gdf['geometry'] = gdf.apply(lambda i: Point(ct.gcj02_to_wgs84(i.geometry.x, i.geometry.y)), axis=1)
-    return gdf
+    return convert_geodf_coordinates(gdf, 'gcj', 'wgs')
 
 def gdf_bd_to_wgs(gdf):
     '''
     transfer the shapfile coordination system
     '''
-    if isinstance(gdf.iloc[0].geometry, Polygon):
-        gdf['geometry'] = gdf.apply(lambda i: Polygon(pd.DataFrame(i.geometry.exterior.coords.xy).T.rename(
-            columns={0: 'x', 1: 'y'}).apply(lambda x: ct.bd09_to_wgs84(x.x, x.y), axis=1)), axis=1)
-    elif isinstance(gdf.iloc[0].geometry, LineString):
-        gdf['geometry'] = gdf.apply(lambda i: LineString(pd.DataFrame(i.geometry.coords.xy).T.rename(
-            columns={0: 'x', 1: 'y'}).apply(lambda x: ct.bd09_to_wgs84(x.x, x.y), axis=1)), axis=1)
-    elif isinstance(gdf.iloc[0].geometry, MultiPolygon):
-        gdf['geometry'] = gdf.geometry.apply(lambda item: MultiPolygon([ Polygon(pd.DataFrame( geom.exterior.coords.xy ).T.rename(columns={0: 'x', 1: 'y'}).apply( lambda x: ct.bd09_to_wgs84(x.x, x.y), axis=1)) for geom in item.geoms]) )
-    elif isinstance(gdf.iloc[0].geometry, Point):
-            gdf['geometry'] = gdf.apply(lambda i: Point(ct.bd09_to_wgs84(i.geometry.x, i.geometry.y)), axis=1)
-    return gdf
+    return convert_geodf_coordinates(gdf, 'bd', 'wgs')
 
 def coord_transfer( res, in_sys = 'gcj', out_sys = 'wgs' ):
     if in_sys != out_sys:
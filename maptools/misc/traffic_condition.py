@@ -16,7 +16,7 @@ from joblib import Parallel, delayed
 import os, sys
 sys.path.append( os.path.dirname(__file__) )
 from fishnet import fishnet_shp
-import coordTransfrom_shp as ct_shp
+from maptools.geo.coords_utils import xyxy_str_series_to_linestrings
 from area_boundary import get_boundary_city_level
 
 
@@ -50,9 +50,7 @@ def get_roads_conditions(  area, keys=['71646457c61fe244423c40254833dc22'], leve
         df_roads             = gpd.GeoDataFrame(json_data['trafficinfo']['roads'], crs={'init': 'epsg:4326'} ).reset_index().rename(columns={'index':'road_id'})
         df_roads.speed       = df_roads.speed.astype(float)
         df_roads.status      = df_roads.status.astype(int)
-        df_roads['geometry'] = df_roads.polyline.apply( lambda a: LineString( np.array( [  x.split(',') for x in a.split(';') ] ).astype(np.float) ) )
-        if coords_sys_output=='wgs':    
-            df_roads         = ct_shp.polyline_gcj_to_wgs( df_roads )
+        df_roads['geometry'] = xyxy_str_series_to_linestrings( df_roads.polyline, coords_sys_output, decimals=None )
     return df_roads
 
 def get_roads_conditions_batch(coords, keys, level = 6 ):
@@ -3,7 +3,7 @@ import geopandas as gpd
 from loguru import logger
 from copy import deepcopy
 
-from geo.coords_utils import str_to_point, xyxy_str_to_linestring
+from geo.coords_utils import str_series_to_points, xyxy_str_series_to_linestrings
 from cfg import MEMORY
 
 @MEMORY.cache()
@@ -55,21 +55,26 @@ def parse_line_and_stops(json_data, included_line_types: set=None, ll='wgs'):
             if str(line.get('type')) not in included_line_types:
                 continue
         
-        lines_data.append({**line, 'geometry': xyxy_str_to_linestring(coords_str, ll)})
+        lines_data.append({**line, 'polyline': coords_str})
 
         stops = line.get('busstops', [])
         for stop in stops:
-            stop_location_str = stop.get('location', '')
-            stops_data.append({
-                **stop,
-                'line_name': line_name,
-                'geometry': str_to_point(stop_location_str, ll)
-            })
+            stops_data.append({**stop, 'line_name': line_name})
 
-    # Convert to GeoDataFrame
-    geometry_gdf = gpd.GeoDataFrame(lines_data, geometry='geometry', crs=4326) \
-        if lines_data else gpd.GeoDataFrame()
-    stops_gdf = gpd.GeoDataFrame(stops_data, geometry='geometry', crs=4326) \
-        if stops_data else gpd.GeoDataFrame()
+    # Convert to GeoDataFrame, all the coordinate strings are decoded at once
+    if lines_data:
+        geometry_gdf = gpd.GeoDataFrame(lines_data)
+        geometry_gdf = gpd.GeoDataFrame(
+            geometry_gdf.drop(columns='polyline'),
+            geometry=xyxy_str_series_to_linestrings(geometry_gdf['polyline'], ll), crs=4326)
+    else:
+        geometry_gdf = gpd.GeoDataFrame()
+
+    if stops_data:
+        stops_gdf = gpd.GeoDataFrame(stops_data)
+        stops_gdf = gpd.GeoDataFrame(
+            stops_gdf, geometry=str_series_to_points(stops_gdf['location'].fillna(''), ll), crs=4326)
+    else:
+        stops_gdf = gpd.GeoDataFrame()
 
     return geometry_gdf, stops_gdf
@@ -6,7 +6,7 @@ import pandas as pd
 import geopandas as gpd
 from loguru import logger
 
-from geo.coords_utils import str_to_point, xsys_str_to_linestring
+from geo.coords_utils import str_series_to_points, xsys_str_series_to_linestrings
 from utils.misc import read_json_file
 from utils.serialization import save_checkpoint, load_checkpoint
 
@@ -161,7 +161,7 @@ def parse_amap_web_search_response(fn: str, ll: str = 'wgs') -> tuple[gpd.GeoDat
     df_lines = pd.DataFrame(lines)
 
     # Converting bus lines data to GeoDataFrame
-    geoms = df_lines.apply(lambda x: xsys_str_to_linestring(x['xs'], x['ys'], ll), axis=1)
+    geoms = xsys_str_series_to_linestrings(df_lines['xs'], df_lines['ys'], ll)
     df_lines = gpd.GeoDataFrame(df_lines, geometry=geoms, crs=4326)
        
     line_rename_dict = {
@@ -189,7 +189,7 @@ def parse_amap_web_search_response(fn: str, ll: str = 'wgs') -> tuple[gpd.GeoDat
     df_stations.loc[:, 'order'] = stops.index
     df_stations.loc[:, 'id'] = df_stations.station_id
     df_stations.loc[:, 'sequence'] = range(len(df_stations))
-    geoms = df_stations.location.apply(lambda x: str_to_point(x, ll))
+    geoms = str_series_to_points(df_stations.location, ll)
     df_stations = gpd.GeoDataFrame(df_stations, geometry=geoms)
 
     # Reorganizing bus stations data by bus stops
@@ -2,6 +2,8 @@
 import shapely
 import warnings
 import numpy as np
+import pandas as pd
+from numba import njit
 from loguru import logger
 
 import geopandas as gpd
@@ -10,7 +12,8 @@ from shapely import Point
 from shapely import geometry as shapely_geom
 
 #%%
-# from .ops.linear_referencing import linear_referencing_geom
+from .geo.linear_referencing import linear_referencing_geom
+from .geo.spatial_index import get_grid_index
 """ Aux """
 def to_proj(data, crs_prj=None):
     if crs_prj is None:
@@ -67,15 +70,27 @@ def retrieve_candidate_geometries(_query, gdf, cands, query_id):
     return df_cands
 
 def project_query_on_candidates(df_cands, project=True):
+    """
+    Project the query geometries onto the candidate edges.
+
+    Args:
+        df_cands (GeoDataFrame): Candidates with `query_geom` and `edge_geom` columns.
+        project (bool, optional): If False, only `dist_p2c` is computed, otherwise the columns of
+            `linear_referencing_geom` (offset, edge_len, dist_p2c, proj_x, proj_y, proj_point) are added.
+
+    Returns:
+        GeoDataFrame: The candidates.
+    """
+    query_geoms = np.asarray(df_cands['query_geom'].values, dtype=object)
+    edge_geoms = np.asarray(df_cands['edge_geom'].values, dtype=object)
     if not project:
-        cal_proj_dist = lambda x: x['query_geom'].distance(x['edge_geom'])
-        df_cands.loc[:, 'dist_p2c'] = df_cands.apply(cal_proj_dist, axis=1)
+        df_cands.loc[:, 'dist_p2c'] = shapely.distance(query_geoms, edge_geoms)
 
         return df_cands
 
-    # FIXME
-    df_projs = linear_referencing_geom(df_cands['query_geom'], df_cands['edge_geom'])
-    df_cands.loc[:, df_projs.keys()] = df_projs.values()
+    df_projs = linear_referencing_geom(query_geoms, edge_geoms)
+    for key, val in df_projs.items():
+        df_cands[key] = val
 
     return df_cands
     
@@ -92,44 +107,139 @@ def visualize_query_and_candidates(cands):
 
     return ax
 
+@njit(cache=True)
+def _grouped_top_k(codes, n_groups, dists, k, ways, dedup):
+    # 计数排序：按组号稳定排列，O(N)
+    offsets = np.zeros(n_groups + 1, dtype=np.int64)
+    for c in codes:
+        offsets[c + 1] += 1
+    offsets = np.cumsum(offsets)
+    order = np.empty(len(codes), dtype=np.int64)
+    cursor = offsets[:-1].copy()
+    for i in range(len(codes)):
+        order[cursor[codes[i]]] = i
+        cursor[codes[i]] += 1
+
+    # 每组维护一个按距离升序的、长度至多为 k 的缓冲区（插入排序），组内无额外的内存分配；
+    # 去重时同一 way 只保留距离最小的一条。距离相同时保持原有的行序，与稳定排序的结果一致
+    out = np.empty(len(codes), dtype=np.int64)
+    buf_d = np.empty(k, dtype=np.float64)
+    buf_i = np.empty(k, dtype=np.int64)
+    n_out = 0
+    for g in range(n_groups):
+        n_buf = 0
+        for p in range(offsets[g], offsets[g + 1]):
+            i = order[p]
+            d = dists[i]
+            if n_buf == k and not d < buf_d[k - 1]:
+                continue
+
+            pos = n_buf
+            if dedup:
+                for m in range(n_buf):
+                    if ways[buf_i[m]] == ways[i]:
+                        pos = m
+                        break
+                if pos < n_buf:
+                    if not d < buf_d[pos]:
+                        continue
+                    # 移除同一 way 的旧记录
+                    for m in range(pos, n_buf - 1):
+                        buf_d[m], buf_i[m] = buf_d[m + 1], buf_i[m + 1]
+                    n_buf -= 1
+
+            if n_buf < k:
+                n_buf += 1
+            j = n_buf - 1
+            while j > 0 and d < buf_d[j - 1]:
+                buf_d[j], buf_i[j] = buf_d[j - 1], buf_i[j - 1]
+                j -= 1
+            buf_d[j], buf_i[j] = d, i
+
+        out[n_out: n_out + n_buf] = buf_i[:n_buf]
+        n_out += n_buf
+
+    return out[:n_out]
+
+def grouped_top_k(group_ids, dists, k, dedup_ids=None):
+    """Select the k smallest distances of every group.
+
+    Args:
+        group_ids (np.ndarray): Group (query) id of each row, contiguous integers in [0, n_groups) are
+            used as is, other values are factorized.
+        dists (np.ndarray): Distance of each row.
+        k (int): Number of rows to keep per group.
+        dedup_ids (np.ndarray, optional): If given (e.g. way ids), only the nearest row of each
+            dedup id is kept within a group.
+
+    Returns:
+        np.ndarray: Row positions, ordered by group and then by distance.
+    """
+    group_ids = np.asarray(group_ids)
+    if len(group_ids) and np.issubdtype(group_ids.dtype, np.integer) and group_ids.min() >= 0 \
+       and group_ids.max() < 2 * len(group_ids):
+        codes, n_groups = group_ids.astype(np.int64), int(group_ids.max()) + 1
+    else:
+        codes, uniques = pd.factorize(group_ids, sort=True)
+        codes, n_groups = codes.astype(np.int64), len(uniques)
+
+    dedup = dedup_ids is not None
+    ways = pd.factorize(np.asarray(dedup_ids))[0] if dedup else np.empty(0, dtype=np.int64)
+
+    return _grouped_top_k(codes, n_groups, np.asarray(dists, dtype=np.float64), k, ways, dedup)
+
 def filter_top_k_candidates(df: gpd.GeoDataFrame,
                       pid: str = 'pid',
                       top_k: int = 5,
+                      way_id: str = None,
                       ):
     """Filter candidates, which belongs to the same way, and pickup the nearest one.
 
     Args:
         df (gpd.GeoDataFrame): df candidates.
-        top_k (int, optional): _description_. Defaults to 5.
-        pid (str, optional): _description_. Defaults to 'pid'.
+        pid (str, optional): The query id column. Defaults to 'pid'.
+        top_k (int, optional): Number of candidates kept for each query. Defaults to 5.
+        way_id (str, optional): If given, only the nearest candidate of each way is kept. Defaults to None.
 
     Returns:
         gpd.GeoDataFrame: The filtered candidates.
     """
-    # origin_size = df.shape[0]
-    df = df.sort_values([pid, 'dist_p2c'])\
-           .groupby(pid)\
-           .head(top_k)\
-           .reset_index(drop=True)
+    rows = grouped_top_k(df[pid].values, df['dist_p2c'].values, top_k,
+                         df[way_id].values if way_id is not None else None)
 
-    return df
+    return df.iloc[rows].reset_index(drop=True)
 
-def query_spatial_index(query_objects, gdf, radius, predicate):
+def query_spatial_index(query_objects, gdf, radius, predicate='dwithin', sindex=None):
     """
     Perform spatial indexing query.
 
     Args:
-        gdf: Base GeoDataFrame with spatial index.
         query_objects: Prepared query objects.
+        gdf: Base GeoDataFrame with spatial index.
         radius: Search radius.
-        predicate: Spatial predicate for querying (e.g., "intersects").
+        predicate: Spatial predicate for querying. 'dwithin' returns the geometries within `radius` of
+            the query objects; other predicates (e.g. "intersects") are tested against the square
+            buffers of side `2 * radius` around the query objects.
+        sindex (PackedRTree | GridIndex, optional): A prebuilt (e.g. memory-mapped) index of `gdf`,
+            used instead of `gdf.sindex`.
 
     Returns:
         Tuple: Indices of matched geometries in gdf.
     """
-    get_box = lambda geom: shapely_geom.box(geom.x - radius, geom.y - radius, geom.x + radius, geom.y + radius)
-    query_boxes = query_objects.apply(get_box)
-    return gdf.sindex.query_bulk(query_boxes, predicate)
+    geoms = np.asarray(query_objects.values, dtype=object)
+    if sindex is None:
+        sindex = gdf.sindex
+        query_kwargs = {}
+    else:
+        query_kwargs = {'geometries': gdf.geometry.values}
+
+    if predicate == 'dwithin':
+        return sindex.query(geoms, predicate='dwithin', distance=radius, **query_kwargs)
+
+    xmin, ymin, xmax, ymax = shapely.bounds(geoms).T
+    query_boxes = shapely.box(xmin - radius, ymin - radius, xmax + radius, ymax + radius)
+
+    return sindex.query(query_boxes, predicate=predicate, **query_kwargs)
 
 def process_query_results(query_objects, gdf, cands, query_id, project):
     """
@@ -156,48 +266,197 @@ def find_nearest_geometries_compare(query_point, geometries, max_distance, top_k
     return nearest_geometries.nsmallest(top_k, 'distance_to_query')
 
 def find_nearest_geometries(query_point: GeoDataFrame, geometries: GeoDataFrame, query_id='qid', 
-                            max_distance: float = 50, top_k=None, predicate: str = 'intersects', 
-                            check_diff=False, project=False, keep_geom=True):
-    # Ensure spatial index is built
-    ensure_spatial_index(geometries)
+                            max_distance: float = 50, top_k=None, predicate: str = 'dwithin', 
+                            check_diff=False, project=False, keep_geom=True, way_id=None, sindex=None,
+                            backend='strtree'):
+    # Candidate search backend: a prebuilt `sindex` (e.g. a memory-mapped `PackedRTree`, see `geo.spatial_index`),
+    # the uniform grid `GridIndex` with `cell_size = max_distance`, or the geopandas STRtree
+    if sindex is None and backend == 'grid':
+        assert max_distance, "`max_distance` is required by the 'grid' backend"
+        sindex = get_grid_index(geometries, max_distance)
+    elif sindex is None:
+        assert backend == 'strtree', f"Unknown candidate search backend: {backend}"
+        ensure_spatial_index(geometries)
     
     # Prepare query
     query = _prepare_query_object(query_point, query_id, geometries.crs)
     
     # Perform spatial indexing query
-    cands = query_spatial_index(query, geometries, max_distance, predicate)
+    cands = query_spatial_index(query, geometries, max_distance, predicate, sindex)
     if len(cands[0]) == 0:
         return None, None
 
-    # Process query results
-    df_cands = process_query_results(query, geometries, cands, query_id, project)
+    return build_candidates(query, geometries, cands, query_id, max_distance, top_k,
+                            check_diff, project, keep_geom, way_id)
 
-    # Further filtering and sorting
+def build_candidates(query, geometries, cands, query_id='qid', max_distance=50, top_k=None,
+                     check_diff=False, project=False, keep_geom=True, way_id=None):
+    """
+    Turn the (2, M) candidate pairs of a spatial index query into the result of `find_nearest_geometries`:
+    distance filtering and top-k selection on the raw arrays, then only the kept rows are materialized.
+    """
+    dists = shapely.distance(np.asarray(query.values, dtype=object)[cands[0]],
+                             np.asarray(geometries.geometry.values, dtype=object)[cands[1]])
     if max_distance:
-        df_cands.query(f"dist_p2c <= {max_distance}", inplace=True)
+        keep = np.flatnonzero(dists <= max_distance)
+        cands, dists = cands[:, keep], dists[keep]
     if top_k:
-        df_cands = filter_top_k_candidates(df_cands, query_id, top_k)
+        ways = geometries[way_id].values[cands[1]] if way_id is not None else None
+        rows = grouped_top_k(cands[0], dists, top_k, ways)
+        cands, dists = cands[:, rows], dists[rows]
 
-    if not keep_geom:
-        df_cands.drop(columns=["query_geom", "edge_geom"], inplace=True)
+    # Process query results
+    df_cands = retrieve_candidate_geometries(query, geometries, cands, query_id)
+    df_cands.loc[:, 'dist_p2c'] = dists
+    if project:
+        project_query_on_candidates(df_cands, project)
+    if top_k:
+        df_cands.reset_index(drop=True, inplace=True)
 
     # Check difference
     no_cands_query = None
     if check_diff:
-        cands_pid = set(cands[0])
+        cands_pid = set(df_cands[query_id])
         all_pid = set(query.index.unique())
         no_cands_query = all_pid.difference(cands_pid)
         logger.warning(f"{no_cands_query} has no neighbors within the {max_distance} search zone.")
 
+    if not keep_geom:
+        return pd.DataFrame(df_cands.drop(columns=["query_geom", "edge_geom"])), no_cands_query
+
     return df_cands.set_geometry('edge_geom').set_crs(geometries.crs), no_cands_query
 
 
-seg_geoms = gpd.read_file('../exp/subway_segments.geojson')
-to_proj(seg_geoms)
-query_point = Point(113.919274, 22.526933) 
+def find_nearest_geometries_batch(points: GeoDataFrame, geometries: GeoDataFrame, traj_id_col='traj_id',
+                                  point_id_col=None, max_distance: float = 50, top_k=None, way_id=None,
+                                  project=False, sindex=None, backend='strtree'):
+    """
+    Candidate search for the points of many trajectories with a single spatial index query.
 
-res, _ = find_nearest_geometries(query_point, seg_geoms, max_distance=1000, top_k=4)
-res.plot()
+    Args:
+        points (GeoDataFrame): Points of all trajectories, with a `traj_id_col` column.
+        geometries (GeoDataFrame): The edges.
+        traj_id_col (str, optional): Trajectory id column. Defaults to 'traj_id'.
+        point_id_col (str, optional): Point id column, the index of `points` is used if None.
+        max_distance, top_k, way_id, sindex, backend: See `find_nearest_geometries`, top-k is
+            selected per point.
+        project (bool, optional): Whether to add the columns of `linear_referencing_geom`
+            (except `proj_point`). Defaults to False.
 
+    Returns:
+        Tuple[pd.DataFrame, np.ndarray, np.ndarray]:
+            - Columnar candidates table keyed by (traj_id, point_id), sorted by trajectory and then by
+              the point order within the trajectory, with the non-geometry columns of `geometries`,
+              `eidx` (row position in `geometries`) and `dist_p2c`;
+            - The sorted unique trajectory ids;
+            - Group offsets, the candidates of `traj_ids[i]` are rows `offsets[i]: offsets[i + 1]`.
+
+    Example:
+    >>> cands, traj_ids, offsets = find_nearest_geometries_batch(pts, edges, 'traj_id', max_distance=500, top_k=8)
+    >>> for traj_id, df in iter_candidate_groups(cands, traj_ids, offsets): ...
+    """
+    if sindex is None and backend == 'grid':
+        assert max_distance, "`max_distance` is required by the 'grid' backend"
+        sindex = get_grid_index(geometries, max_distance)
+    elif sindex is None:
+        assert backend == 'strtree', f"Unknown candidate search backend: {backend}"
+        ensure_spatial_index(geometries)
+
+    if points.crs != geometries.crs:
+        points = points.to_crs(geometries.crs)
+    traj_codes, traj_ids = pd.factorize(points[traj_id_col].values, sort=True)
+    order = np.argsort(traj_codes, kind='stable')
+    query = gpd.GeoSeries(np.asarray(points.geometry.values, dtype=object)[order], crs=geometries.crs)
+    traj_codes = traj_codes[order]
+    point_ids = (points.index.values if point_id_col is None else points[point_id_col].values)[order]
+
+    # Single query over all points, filtering and top-k on the raw arrays
+    cands = query_spatial_index(query, geometries, max_distance, 'dwithin', sindex)
+    query_geoms = np.asarray(query.values, dtype=object)
+    edge_geoms = np.asarray(geometries.geometry.values, dtype=object)
+    dists = shapely.distance(query_geoms[cands[0]], edge_geoms[cands[1]])
+    if max_distance:
+        keep = np.flatnonzero(dists <= max_distance)
+        cands, dists = cands[:, keep], dists[keep]
+    if top_k:
+        ways = geometries[way_id].values[cands[1]] if way_id is not None else None
+        rows = grouped_top_k(cands[0], dists, top_k, ways)
+    else:
+        rows = np.argsort(cands[0], kind='stable')
+    cands, dists = cands[:, rows], dists[rows]
+
+    df_cands = pd.DataFrame(geometries.drop(columns=geometries.geometry.name).iloc[cands[1]]).reset_index(drop=True)
+    df_cands.insert(0, traj_id_col, traj_ids[traj_codes[cands[0]]])
+    df_cands.insert(1, point_id_col or (points.index.name or 'pid'), point_ids[cands[0]])
+    df_cands['eidx'] = cands[1]
+    df_cands['dist_p2c'] = dists
+    if project:
+        df_projs = linear_referencing_geom(query_geoms[cands[0]], edge_geoms[cands[1]], keep_point=False)
+        for key, val in df_projs.items():
+            df_cands[key] = val
+
+    offsets = np.zeros(len(traj_ids) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(traj_codes[cands[0]], minlength=len(traj_ids)), out=offsets[1:])
+
+    return df_cands, np.asarray(traj_ids), offsets
+
+def iter_candidate_groups(df_cands, traj_ids, offsets):
+    """Yield (traj_id, candidates) of the result of `find_nearest_geometries_batch`, without groupby."""
+    for i, traj_id in enumerate(traj_ids):
+        yield traj_id, df_cands.iloc[offsets[i]: offsets[i + 1]]
+
+if __name__ == "__main__":
+    import time
+
+    seg_geoms = gpd.read_file('../exp/subway_segments.geojson')
+    to_proj(seg_geoms)
+    query_point = Point(113.919274, 22.526933) 
+
+    res, _ = find_nearest_geometries(query_point, seg_geoms, max_distance=1000, top_k=4)
+    res.plot()
+
+    # 10 万个点的候选检索：box + intersects + 逐行 apply 计算距离 vs dwithin + 向量化距离
+    rng = np.random.default_rng(0)
+    xmin, ymin, xmax, ymax = seg_geoms.total_bounds
+    pts = gpd.GeoDataFrame(geometry=gpd.points_from_xy(rng.uniform(xmin, xmax, 100_000),
+                                                       rng.uniform(ymin, ymax, 100_000)), crs=seg_geoms.crs)
+
+    start = time.perf_counter()
+    query = _prepare_query_object(pts, 'qid', seg_geoms.crs)
+    boxes = query.apply(lambda geom: shapely_geom.box(geom.x - 500, geom.y - 500, geom.x + 500, geom.y + 500))
+    cands = seg_geoms.sindex.query(boxes.values, predicate='intersects')
+    df_cands = retrieve_candidate_geometries(query, seg_geoms, cands, 'qid')
+    df_cands.loc[:, 'dist_p2c'] = df_cands.apply(lambda x: x['query_geom'].distance(x['edge_geom']), axis=1)
+    df_cands.query("dist_p2c <= 500", inplace=True)
+    legacy_cost = time.perf_counter() - start
+
+    start = time.perf_counter()
+    res, _ = find_nearest_geometries(pts, seg_geoms, max_distance=500)
+    cost = time.perf_counter() - start
+    print(f"{len(pts)} points, {len(res)} candidates, legacy: {legacy_cost:.2f} s, dwithin: {cost:.2f} s")
+
+    # 500 万条候选的 top-k：sort + groupby.head vs grouped_top_k
+    df = pd.DataFrame({'pid': rng.integers(0, 500_000, 5_000_000),
+                       'way': rng.integers(0, 5_000, 5_000_000),
+                       'dist_p2c': rng.uniform(0, 500, 5_000_000)})
+    start = time.perf_counter()
+    df.sort_values(['pid', 'dist_p2c']).groupby('pid').head(5).reset_index(drop=True)
+    legacy_cost = time.perf_counter() - start
+
+    start = time.perf_counter()
+    filter_top_k_candidates(df, 'pid', 5)
+    cost = time.perf_counter() - start
+    print(f"top-5 of {len(df)} candidates, sort + groupby: {legacy_cost:.2f} s, grouped_top_k: {cost:.2f} s")
+
+    # 2000 条轨迹：逐条调用 vs 一次批量检索
+    pts = pts.assign(traj_id=rng.integers(0, 2_000, len(pts)))
+    start = time.perf_counter()
+    for _, traj in pts.groupby('traj_id'):
+        find_nearest_geometries(traj, seg_geoms, max_distance=500, top_k=8)
+    legacy_cost = time.perf_counter() - start
+
+    start = time.perf_counter()
+    cands, traj_ids, offsets = find_nearest_geometries_batch(pts, seg_geoms, 'traj_id', max_distance=500, top_k=8)
+    cost = time.perf_counter() - start
+    print(f"{len(traj_ids)} trajectories, per trajectory: {legacy_cost:.2f} s, batch: {cost:.2f} s")
 
-# %%
@@ -10,7 +10,7 @@ from shapely.geometry import LineString
 
 from cfg import DATA_FOLDER, EXP_FOLDER
 from geo.network import Network
-from geo.coords_utils import str_to_point
+from geo.coords_utils import str_series_to_points
 from provider.direction import get_subway_routes
 from utils.logger import make_logger
 from utils.dataframe import query_dataframe
@@ -37,7 +37,7 @@ def split_linestring_by_stations(line_id, df_lines, df_stations):
     line = df_lines.query(f"line_id == '{line_id}'")
     pts = df_stations.query(f"line_id == '{line_id}'")
     station_names = pts['name'].values
-    pts = gpd.GeoDataFrame(pts, geometry=pts.location.apply(lambda x: str_to_point(x, 'wgs')), crs=4326)
+    pts = gpd.GeoDataFrame(pts, geometry=str_series_to_points(pts.location, 'wgs'), crs=4326)
 
     geoms = shapely.ops.split(
         line.iloc[0]['geometry'],
@@ -448,7 +448,7 @@ class MetroNetwork(Network):
         df_nodes.index = df_nodes.index.astype(np.int64)
         df_nodes = df_nodes.assign(
             nid = df_nodes.index,
-            geometry = df_nodes.location.apply(lambda x:str_to_point(x, 'wgs'))
+            geometry = str_series_to_points(df_nodes.location, 'wgs')
         )
         df_nodes.drop(columns=['location'], inplace=True)
         df_nodes = df_nodes[['name', 'nid', 'bvid', 'line_name', 'line_id', 'sequence', 'geometry']]
@@ -1,2 +1,2 @@
 from .traj import Trajectory
-
+from .collection import TrajectoryCollection
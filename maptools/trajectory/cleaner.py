@@ -1,14 +1,32 @@
+import shapely
 import numpy as np
-from numba import njit
+import pandas as pd
+from numba import njit, prange
 from loguru import logger
 from geopandas import GeoDataFrame
-from shapely import LineString, Point
 
-from ..geo.geo_utils import convert_geom_to_utm_crs
+from ..geo.projection import PROJECTION_CACHE
 
 TRAJ_ID_COL = 'tid'
 
 
+def _points_xy(geoms, allow_empty=False):
+    """
+    逐点取坐标，结果与 `geoms` 逐行对应（`shapely.get_coordinates` 会跳过空几何，导致错位）.
+    `allow_empty=False` 时遇到空几何或 None 直接报错，否则其坐标为 NaN.
+    """
+    empty = shapely.is_missing(geoms) | shapely.is_empty(geoms)
+    if not empty.any():
+        return np.column_stack([shapely.get_x(geoms), shapely.get_y(geoms)])
+    if not allow_empty:
+        raise ValueError(f"Empty or None geometries found at rows {np.flatnonzero(empty)[:10].tolist()}.")
+
+    xy = np.full((len(geoms), 2), np.nan)
+    xy[~empty, 0], xy[~empty, 1] = shapely.get_x(geoms[~empty]), shapely.get_y(geoms[~empty])
+
+    return xy
+
+
 def calculate_angle_between_sides(adjacent_side1, adjacent_side2, opposite_side):
     """
     根据相邻两边和对边长度计算夹角（以度为单位）, 余弦定理计算夹角。
@@ -76,6 +94,10 @@ def clean_drift_traj_points(data: GeoDataFrame, col=[TRAJ_ID_COL, 'dt', 'geometr
 
     Returns:
     GeoDataFrame: The cleaned trajectory data with drift points removed based on the specified criteria.
+    DataFrame: The features of the (deduplicated) points sorted by [Rid, Time], i.e. `DRIFT_FEATURES` and 'angle'.
+
+    The x, y, t arrays are pulled out once and the features are computed by `clean_drift_mask`,
+    without shifted geometry columns.
 
     Examples:
     >>> cleaned_data = traj_clean_drift(trajectory_data, speed_limit=50, dis_limit=100, strict=True)
@@ -83,81 +105,167 @@ def clean_drift_traj_points(data: GeoDataFrame, col=[TRAJ_ID_COL, 'dt', 'geometr
     """
     [Rid, Time, Geometry] = col
     data.drop_duplicates(subset=[Rid, Time], inplace=True)
-    
-    def _preprocess(data):
-        df = data[col].copy()
-        df = df.sort_values(by=[Rid, Time])
-
-        if df.crs.to_epsg() == 4326:
-            convert_geom_to_utm_crs(df, inplace=True)
-        
-        for i in [Rid, Geometry, Time]:
-            df[i + '_pre'] = df[i].shift()
-            df[i + '_next'] = df[i].shift(-1)
-            
-        df['dis_pre'] = df[Geometry].distance(df[Geometry + '_pre'])
-        df['dis_next'] = df[Geometry].distance(df[Geometry + '_next'])
-        df['dis_prenext'] = df[Geometry + '_pre'].distance(df[Geometry + '_next'])
-
-        df['timegap_pre'] = df[Time] - df[Time + '_pre']
-        df['timegap_next'] = df[Time + '_next'] - df[Time]
-        df['timegap_prenext'] = df[Time + '_next'] - df[Time + '_pre']
 
-        df['speed_pre'] = df['dis_pre'] / df['timegap_pre'] * 3.6
-        df['speed_next'] = df['dis_next'] / df['timegap_next'] * 3.6
-        df['speed_prenext'] = df['dis_prenext'] / df['timegap_prenext'] * 3.6
-        
-        return df
+    # x, y, t 与轨迹编号只取出一次，按 (Rid, Time) 排序
+    geoms = np.asarray(data[Geometry].values, dtype=object)
+    # 空几何的坐标为 NaN，相关的距离与角度判断均不成立，按原逻辑保留
+    xy = _points_xy(geoms, allow_empty=True)
+    if data.crs.to_epsg() == 4326:
+        ctx = PROJECTION_CACHE.get_context(data)
+        xy = ctx.project_xy(xy)
+    codes, _ = pd.factorize(data[Rid].values, sort=True)
+    ts = data[Time].values
+    order = np.lexsort((ts, codes))
+    offsets = np.concatenate([[0], np.cumsum(np.bincount(codes, minlength=codes.max(initial=-1) + 1))])
+
+    keep, _, feats = clean_drift_mask(
+        xy[order, 0], xy[order, 1], ts[order], offsets, method=method, speed_limit=speed_limit,
+        dis_limit=dis_limit, angle_limit=angle_limit, alpha=alpha, strict=strict, per_traj=False,
+        return_features=True)
+    if verbose:
+        for key, limit, desc in [('speed_pre', speed_limit, 'Speed limit'), ('dis_pre', dis_limit, 'Distance limit')]:
+            if limit is not None and limit <= 0:
+                logger.debug(f"{desc}: {get_outliers_thred_by_iqr(pd.Series(feats[key]), alpha)[1]:.2f}")
+        logger.debug(f"\nAngels: {list(np.round(feats['angle'], 0))}, \nmask: {list(~keep)}")
+
+    df = pd.DataFrame({Rid: data[Rid].values[order], Time: ts[order], **feats}, index=data.index[order])
+    mask = np.empty(len(data), dtype=bool)
+    mask[order] = keep
+    
+    return data[mask], df
+
+def _segment_ids(offsets):
+    return np.repeat(np.arange(len(offsets) - 1), np.diff(offsets))
+
+@njit(cache=True)
+def _quantile(vals, q):
+    pos = q * (len(vals) - 1)
+    lo = int(np.floor(pos))
+    hi = min(lo + 1, len(vals) - 1)
+
+    return vals[lo] + (vals[hi] - vals[lo]) * (pos - lo)
+
+@njit(cache=True)
+def _segmented_iqr_upper_nb(values, offsets, alpha):
+    res = np.full(len(offsets) - 1, np.nan)
+    for s in range(len(offsets) - 1):
+        vals = values[offsets[s]: offsets[s + 1]]
+        vals = np.sort(vals[~np.isnan(vals)])
+        if len(vals) == 0:
+            continue
+        q25, q75 = _quantile(vals, 0.25), _quantile(vals, 0.75)
+        res[s] = q75 + alpha * (q75 - q25)
+
+    return res
+
+def _segmented_iqr_upper(values, offsets, alpha):
+    """每段的 IQR 上限 q75 + alpha * (q75 - q25)，分位数为线性插值、忽略 NaN，与 `get_outliers_thred_by_iqr` 一致"""
+    if len(offsets) == 2:
+        # 单段时用 O(n) 的选择算法
+        vals = values[~np.isnan(values)]
+        if len(vals) == 0:
+            return np.full(1, np.nan)
+        q25, q75 = np.quantile(vals, [0.25, 0.75])
+        return np.array([q75 + alpha * (q75 - q25)])
+
+    return _segmented_iqr_upper_nb(values, offsets, alpha)
+
+@njit(cache=True, error_model='numpy')
+def _drift_features(x, y, t, seg, per_traj):
+    """
+    一次遍历计算每个点与前、后点的距离、速度（km/h），以及前、后点之间的距离、速度.
+    `per_traj` 时不跨轨迹取前、后点，否则与按整表 `shift` 的结果相同.
+    """
+    n = len(x)
+    feats = np.full((6, n), np.nan)
+    for i in range(n):
+        has_pre = i > 0 and (not per_traj or seg[i - 1] == seg[i])
+        has_next = i < n - 1 and (not per_traj or seg[i + 1] == seg[i])
+        if has_pre:
+            dx, dy = x[i] - x[i - 1], y[i] - y[i - 1]
+            feats[0, i] = np.sqrt(dx * dx + dy * dy)
+            feats[3, i] = feats[0, i] / (t[i] - t[i - 1]) * 3.6
+        if has_next:
+            dx, dy = x[i] - x[i + 1], y[i] - y[i + 1]
+            feats[1, i] = np.sqrt(dx * dx + dy * dy)
+            feats[4, i] = feats[1, i] / (t[i + 1] - t[i]) * 3.6
+        if has_pre and has_next:
+            dx, dy = x[i - 1] - x[i + 1], y[i - 1] - y[i + 1]
+            feats[2, i] = np.sqrt(dx * dx + dy * dy)
+            feats[5, i] = feats[2, i] / (t[i + 1] - t[i - 1]) * 3.6
+
+    return feats
+
+DRIFT_FEATURES = ['dis_pre', 'dis_next', 'dis_prenext', 'speed_pre', 'speed_next', 'speed_prenext']
+
+def clean_drift_mask(x, y, t, offsets=None, method='twoside', speed_limit=None, dis_limit=None,
+                     angle_limit=30, alpha=1, strict=False, per_traj=True, return_features=False):
+    """
+    `clean_drift_traj_points` 的数组版本，返回保留点的 bool 掩码.
+
+    Args:
+        x, y, t (np.ndarray): 按 (轨迹, 时间) 排序的投影坐标与时间.
+        offsets (np.ndarray, optional): 轨迹的分段偏移，第 i 条轨迹为 [offsets[i], offsets[i + 1])，默认为单条轨迹.
+        per_traj (bool, optional): True 时前、后点与 IQR 阈值均在每条轨迹内计算，与逐条轨迹处理的结果相同；
+            False 时与 `clean_drift_traj_points` 处理多条轨迹的整表相同（跨轨迹取前、后点，IQR 阈值为全局）.
+        return_features (bool, optional): 是否同时返回去重后的点的位置及其特征 (dis_pre, ..., angle).
+        其余参数与 `clean_drift_traj_points` 相同.
+    """
+    n = len(x)
+    offsets = np.array([0, n]) if offsets is None else np.asarray(offsets)
+    n_seg = len(offsets) - 1
+    seg = _segment_ids(offsets)
+    t = np.asarray(t, dtype=np.float64)
+
+    # 同一轨迹中重复的时间戳只保留第一个
+    keep = np.ones(n, dtype=bool)
+    keep[1:] = (seg[1:] != seg[:-1]) | (t[1:] != t[:-1])
+    idx = np.flatnonzero(keep)
+    x, y, t, seg = np.asarray(x, dtype=np.float64)[idx], np.asarray(y, dtype=np.float64)[idx], t[idx], seg[idx]
+    m = len(idx)
+
+    dis_pre, dis_next, dis_prenext, speed_pre, speed_next, speed_prenext = _drift_features(x, y, t, seg, per_traj)
+    has_pre = np.zeros(m, dtype=bool)
+    has_pre[1:] = seg[1:] == seg[:-1]
+    has_next = np.zeros(m, dtype=bool)
+    has_next[:-1] = seg[:-1] == seg[1:]
+    iqr_seg = seg if per_traj else np.zeros(m, dtype=np.int64)
+    iqr_offsets = np.searchsorted(seg, np.arange(n_seg + 1)) if per_traj else np.array([0, m])
 
     def op(a, b):
         return a | b if not strict else a & b
 
-    df = _preprocess(data)
-    
-    # traj mask
-    traj_mask = (df[Rid + '_pre'] == df[Rid])
-    if method == 'twoside':
-        traj_mask = traj_mask & (df[Rid + '_next'] == df[Rid])
-
-    # speed limit
-    speed_mask = False
-    if speed_limit is not None:
-        if speed_limit <= 0:
-            _, speed_limit = get_outliers_thred_by_iqr(df['speed_pre'], alpha)
-            if verbose: 
-                logger.debug(f"Speed limit: {speed_limit:.2f} m/s")
-        
-        if method == 'oneside':
-            speed_mask = df['speed_pre'] > speed_limit
-        elif method == 'twoside':
-            speed_mask = op(df['speed_pre'] > speed_limit, df['speed_next'] > speed_limit)
-            if strict:
-                speed_mask &= (df['speed_prenext'] < speed_limit)
-
-    # distance limit
-    dis_mask = False
-    if dis_limit is not None:
-        if dis_limit <= 0:
-            _, dis_limit = get_outliers_thred_by_iqr(df['dis_pre'], alpha)
-            if verbose: 
-                logger.debug(f"Distance limit: {dis_limit:.2f} m")
+    traj_mask = has_pre & has_next if method == 'twoside' else has_pre
+
+    def _limit_mask(pre, nxt, prenext, limit):
+        if limit is None:
+            return np.zeros(m, dtype=bool)
+        limit = _segmented_iqr_upper(pre, iqr_offsets, float(alpha))[iqr_seg] if limit <= 0 else limit
         if method == 'oneside':
-            dis_mask = df['dis_pre'] > dis_limit
-        elif method == 'twoside':
-            dis_mask = op(df['dis_pre'] > dis_limit, df['dis_next'] > dis_limit)
+            return pre > limit
+        if method == 'twoside':
+            res = op(pre > limit, nxt > limit)
             if strict:
-                dis_mask &= (df['dis_prenext'] < dis_limit)
+                res &= prenext < limit
+            return res
+        return np.zeros(m, dtype=bool)
+
+    speed_mask = _limit_mask(speed_pre, speed_next, speed_prenext, speed_limit)
+    dis_mask = _limit_mask(dis_pre, dis_next, dis_prenext, dis_limit)
 
-    # angle limit
-    angle_mask = False
+    angle = np.full(m, np.nan)
+    angle_mask = np.zeros(m, dtype=bool)
     if angle_limit is not None:
-        df['angle'] = 180 - calculate_angle_between_sides(df['dis_pre'], df['dis_next'], df['dis_prenext'])
-        angle_mask = (df['angle'] > angle_limit).fillna(False)
-        if verbose: 
-            logger.debug(f"\nAngels: {list(np.round(df['angle'].values, 0))}, \nmask: {list(angle_mask)}")
-    mask = (traj_mask & (speed_mask | dis_mask | angle_mask))
-    
-    return data[~mask], df
+        with np.errstate(divide='ignore', invalid='ignore'):
+            angle = 180 - calculate_angle_between_sides(dis_pre, dis_next, dis_prenext)
+        angle_mask = angle > angle_limit
+
+    keep[idx] = ~(traj_mask & (speed_mask | dis_mask | angle_mask))
+    if return_features:
+        feats = dict(zip(DRIFT_FEATURES, (dis_pre, dis_next, dis_prenext, speed_pre, speed_next, speed_prenext)))
+        return keep, idx, {**feats, 'angle': angle}
+
+    return keep
 
 @njit
 def find_updates(xy, radius):
@@ -177,7 +285,58 @@ def find_updates(xy, radius):
             
     return np.array(update_indices)
 
-def filter_by_point_update_policy(gdf:GeoDataFrame, radius:float, keep_last=True):
+@njit(parallel=True, cache=True)
+def _segmented_updates(x, y, offsets, radius, keep_last):
+    # 各轨迹只写自己的区间，按 prange 并行
+    mask = np.zeros(len(x), dtype=np.bool_)
+    for s in prange(len(offsets) - 1):
+        start, end = offsets[s], offsets[s + 1]
+        if start == end:
+            continue
+
+        mask[start] = True
+        last = start
+        for i in range(start + 1, end):
+            dx = x[i] - x[last]
+            dy = y[i] - y[last]
+            if np.sqrt(dx**2 + dy**2) >= radius:
+                mask[i] = True
+                last = i
+
+        # the last point
+        if keep_last and last != end - 1 and (x[last] != x[end - 1] or y[last] != y[end - 1]):
+            mask[end - 1] = True
+
+    return mask
+
+def update_policy_mask(x, y, radius, keep_last=True, offsets=None):
+    """
+    点更新策略的数组版本：返回 bool 掩码，保留与上一个更新点的距离不小于 `radius` 的点，多条轨迹按 prange 并行.
+
+    Args:
+        x, y (np.ndarray): 按 (轨迹, 时间) 排序的投影坐标.
+        radius (float): 更新半径.
+        keep_last (bool, optional): 最后一个点与最后一个更新点不重合时保留最后一个点. Defaults to True.
+        offsets (np.ndarray, optional): 轨迹的分段偏移，默认为单条轨迹.
+    """
+    offsets = np.array([0, len(x)]) if offsets is None else offsets
+
+    return _segmented_updates(np.ascontiguousarray(x, dtype=np.float64), np.ascontiguousarray(y, dtype=np.float64),
+                              np.ascontiguousarray(offsets, dtype=np.int64), float(radius), keep_last)
+
+def update_policy_index(xy, offsets, radius, keep_last=True):
+    """
+    多轨迹的点更新策略，返回保留点在 `xy` 中的全局位置.
+
+    Args:
+        xy (np.ndarray): (N, 2) 按 (轨迹, 时间) 排序的投影坐标，如 `_points_xy` 的结果.
+        offsets (np.ndarray): 轨迹的分段偏移，第 i 条轨迹为 xy[offsets[i]: offsets[i + 1]].
+        radius (float): 更新半径.
+        keep_last (bool, optional): 同 `update_policy_mask`. Defaults to True.
+    """
+    return np.flatnonzero(update_policy_mask(xy[:, 0], xy[:, 1], radius, keep_last, offsets))
+
+def filter_by_point_update_policy(gdf:GeoDataFrame, radius:float, keep_last=True, traj_id_col=None):
     """
     Optimized point update policy for GeoDataFrame with projected coordinates.
     
@@ -190,6 +349,9 @@ def filter_by_point_update_policy(gdf:GeoDataFrame, radius:float, keep_last=True
         It should be projected and indexed by time.
     - radius (float): The radius threshold in the same units as the GeoDataFrame's 
         projection (e.g., meters).
+    - keep_last (bool): Keep the last point of each trajectory if it differs from the last update.
+    - traj_id_col (str, optional): If given, the policy is applied to every trajectory
+        in one pass of the segmented kernel, and the result is sorted by (trajectory, index).
     
     Returns:
     - GeoDataFrame: A new GeoDataFrame with points that qualify as updates based on 
@@ -199,33 +361,98 @@ def filter_by_point_update_policy(gdf:GeoDataFrame, radius:float, keep_last=True
     """
     
     gdf = gdf.sort_index()
-    # last_update_index = gdf.index[0]
-    # update_indices = [last_update_index]
-    
-    # for idx, row in gdf.iterrows():
-    #     if idx == last_update_index:
-    #         continue
-
-    #     distance = row.geometry.distance(gdf.at[last_update_index, 'geometry'])
-    #     if distance < radius:
-    #         continue
-        
-    #     # Record index if distance exceeds the threshold
-    #     last_update_index = idx
-    #     update_indices.append(idx)
-    
-    xy = np.array([(geom.x, geom.y) for geom in gdf.geometry])
-    update_indices = find_updates(xy, radius)
-    
-    # the last point
-    idx = len(gdf) - 1
-    if keep_last and update_indices[-1] != idx:
-        p_0 = gdf.iloc[update_indices[-1]].geometry
-        p_1 = gdf.iloc[-1].geometry
-        if not p_0.equals(p_1):
-            update_indices = np.append(update_indices, idx)
-        
-    return gdf.loc[update_indices]
+    geoms = np.asarray(gdf.geometry.values, dtype=object)
+    xy = _points_xy(geoms)
+
+    if traj_id_col is None:
+        return gdf.iloc[update_policy_index(xy, [0, len(xy)], radius, keep_last)]
+
+    codes, _ = pd.factorize(gdf[traj_id_col].values, sort=True)
+    order = np.argsort(codes, kind='stable')
+    offsets = np.concatenate([[0], np.cumsum(np.bincount(codes, minlength=codes.max(initial=-1) + 1))])
+
+    return gdf.iloc[order[update_policy_index(xy[order], offsets, radius, keep_last)]]
+
+@njit(cache=True)
+def _point_to_segment(px, py, ax, ay, bx, by):
+    # 与 GEOS 的 LineSegment::distance 相同：投影落在线段外时取到端点的距离
+    dx, dy = bx - ax, by - ay
+    d2 = dx * dx + dy * dy
+    r = ((px - ax) * dx + (py - ay) * dy) / d2 if d2 > 0 else 0.
+    r = min(max(r, 0.), 1.)
+    ex, ey = px - ax - r * dx, py - ay - r * dy
+
+    return np.sqrt(ex * ex + ey * ey)
+
+@njit(cache=True)
+def _synchronized_distance(px, py, pt, ax, ay, at, bx, by, bt):
+    # SED：与按时间同步插值位置的距离
+    r = (pt - at) / (bt - at) if bt != at else 0.
+    ex, ey = px - ax - r * (bx - ax), py - ay - r * (by - ay)
+
+    return np.sqrt(ex * ex + ey * ey)
+
+@njit(cache=True)
+def _douglas_peucker(x, y, t, start, end, tolerance, sed, keep):
+    """以显式栈迭代的 Douglas-Peucker，标记 [start, end) 中保留的点"""
+    keep[start] = True
+    keep[end - 1] = True
+    stack = np.empty((end - start, 2), dtype=np.int64)
+    stack[0, 0], stack[0, 1] = start, end - 1
+    top = 1
+    while top > 0:
+        top -= 1
+        a, b = stack[top, 0], stack[top, 1]
+        dmax, idx = -1., -1
+        for i in range(a + 1, b):
+            if sed:
+                d = _synchronized_distance(x[i], y[i], t[i], x[a], y[a], t[a], x[b], y[b], t[b])
+            else:
+                d = _point_to_segment(x[i], y[i], x[a], y[a], x[b], y[b])
+            if d > dmax:
+                dmax, idx = d, i
+
+        if idx >= 0 and dmax > tolerance:
+            keep[idx] = True
+            stack[top, 0], stack[top, 1] = a, idx
+            stack[top + 1, 0], stack[top + 1, 1] = idx, b
+            top += 2
+
+@njit(parallel=True, cache=True)
+def _segmented_simplify(x, y, t, offsets, tolerance, sed):
+    keep = np.zeros(len(x), dtype=np.bool_)
+    for s in prange(len(offsets) - 1):
+        start, end = offsets[s], offsets[s + 1]
+        if end - start <= 2:
+            keep[start: end] = True
+        else:
+            _douglas_peucker(x, y, t, start, end, tolerance, sed, keep)
+
+    return keep
+
+def simplify_traj_mask(x, y, tolerance, offsets=None, t=None):
+    """
+    Douglas-Peucker 化简的数组版本：返回保留点的 bool 掩码，`offsets` 为轨迹的分段偏移（默认为单条轨迹）.
+    直接在坐标上标记保留的点，不经过 LineString，重叠点也不会误判；各轨迹按 prange 并行.
+    给出时间 `t` 时使用同步欧氏距离（SED，即 TD-TR 算法），否则为点到线段的距离（与 `shapely.simplify(..., preserve_topology=False)` 一致）.
+    """
+    x = np.ascontiguousarray(x, dtype=np.float64)
+    y = np.ascontiguousarray(y, dtype=np.float64)
+    offsets = np.array([0, len(x)]) if offsets is None else offsets
+    sed = t is not None
+    if sed:
+        t = np.asarray(t)
+        t = np.ascontiguousarray(t.view(np.int64) if t.dtype.kind in 'mM' else t, dtype=np.float64)
+    else:
+        t = np.empty(0)
+
+    return _segmented_simplify(x, y, t, np.ascontiguousarray(offsets, dtype=np.int64), float(tolerance), sed)
+
+def simplify_traj_index(xy, tolerance, offsets=None, t=None):
+    """
+    多轨迹的 Douglas-Peucker 化简，返回保留点在 `xy` 中的全局位置，参数同 `simplify_traj_mask`.
+    """
+    return np.flatnonzero(simplify_traj_mask(xy[:, 0], xy[:, 1], tolerance, offsets, t))
 
 def simplify_traj_points(gdf, tolerance, precision=6):
     """
@@ -242,30 +469,22 @@ def simplify_traj_points(gdf, tolerance, precision=6):
         Tolerance parameter for the Douglas-Peucker algorithm. 
         It determines the degree of simplification.
     precision : int, optional
-        The number of decimal places to consider for comparing coordinates.
-        Defaults to 6.
+        Unused, kept for compatibility. The retained points are marked by
+        `simplify_traj_index` directly instead of matching rounded coordinates.
 
     Returns:
     -------
     GeoDataFrame
-        A simplified GeoDataFrame containing only the points that are within
-        'precision' decimal places of the points on the simplified trajectory.
+        A simplified GeoDataFrame containing only the retained points.
     """
     if gdf.shape[0] <= 2:
         return gdf
     
     gdf.sort_values(by='dt', inplace=True)
-    simplified_line = LineString(gdf['geometry'].values).simplify(tolerance)
-    simplified_points = [tuple(np.round(p, precision)) for p in simplified_line.coords]
-
-    def is_near_simplified_line(point):
-        point_rounded = tuple(np.round(point.coords[0], precision))
-        return point_rounded in simplified_points
-    # FIXME 存在重叠点的问题
-    mask = gdf['geometry'].apply(is_near_simplified_line)
-
-    return gdf[mask]
+    geoms = np.asarray(gdf['geometry'].values, dtype=object)
+    idx = simplify_traj_index(_points_xy(geoms), tolerance)
 
+    return gdf.iloc[idx]
 
 if __name__ == "__main__":
     from ..geo.serialization import read_csv_to_geodataframe
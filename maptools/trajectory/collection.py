@@ -0,0 +1,190 @@
+import shapely
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+from loguru import logger
+
+from .traj import Trajectory
+from .cleaner import clean_drift_mask
+from .cleaner import simplify_traj_mask
+from .cleaner import update_policy_mask
+
+TRAJ_ID_COL = "traj_id"
+
+
+class TrajectoryCollection:
+    """
+    多条轨迹的列式集合：全部点按 (traj_id, t) 排序后存储为连续的 NumPy 数组（投影坐标 `x`、`y`、时间 `t`、
+    保留掩码 `mask`），第 i 条轨迹为 [offsets[i], offsets[i + 1]).
+
+    - 所有点只做一次投影；
+    - `preprocess` 中的点更新策略、漂移点清洗、化简均为分段的数组算子，一次处理全部轨迹，只更新 `mask`；
+    - `collection[traj_id]` 与迭代返回的 `Trajectory` 共享集合中的数组切片，可直接用于匹配与可视化.
+
+    Example:
+    >>> trajs = TrajectoryCollection(pts, traj_id_col='traj_id', t='dt', utm_crs=32649)
+    >>> trajs.preprocess(radius=800, speed_limit=0, dis_limit=None, angle_limit=60, alpha=3, tolerance=250)
+    >>> for traj_id, traj in trajs.items():
+    ...     matcher.matching(traj.points)
+    """
+
+    def __init__(self, df:gpd.GeoDataFrame, traj_id_col=TRAJ_ID_COL, t='dt', time_unit=1, utm_crs=None,
+                 latlon=False, ll_sys='wgs'):
+        self.traj_id_col = traj_id_col
+        self.time_col = t
+        self.time_unit = time_unit
+        self.latlon = latlon
+        self.utm_crs = utm_crs
+
+        geoms = np.asarray(df.geometry.values, dtype=object)
+        xy = np.column_stack([shapely.get_x(geoms), shapely.get_y(geoms)])
+        crs = df.crs if df.crs is not None else 4326
+        if latlon is False:
+            xy, crs = Trajectory._project(xy, crs, utm_crs, ll_sys)
+        self._crs = gpd.GeoSeries(crs=crs).crs
+
+        # 按 (traj_id, t) 排序
+        codes, self.traj_ids = pd.factorize(df[traj_id_col].values, sort=True)
+        ts = df[t].values
+        order = np.lexsort((ts, codes))
+        self.offsets = np.zeros(len(self.traj_ids) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(codes, minlength=len(self.traj_ids)), out=self.offsets[1:])
+        self.x = np.ascontiguousarray(xy[order, 0])
+        self.y = np.ascontiguousarray(xy[order, 1])
+        self.t = np.ascontiguousarray(ts[order])
+        self.mask = np.ones(len(order), dtype=bool)
+
+        self._geom_col = df.geometry.name
+        self._columns = list(df.columns)
+        self._df = df.drop(columns=[self._geom_col, t]).iloc[order]
+        self._index = {traj_id: i for i, traj_id in enumerate(self.traj_ids)}
+
+    def __len__(self):
+        return len(self.traj_ids)
+
+    def __repr__(self):
+        return f"TrajectoryCollection({len(self)} trajectories, {len(self.x)} points, {self.mask.sum()} kept)"
+
+    def __getitem__(self, traj_id):
+        i = self._index[traj_id]
+        sl = slice(self.offsets[i], self.offsets[i + 1])
+
+        return Trajectory.from_arrays(
+            self._df.iloc[sl], self.x[sl], self.y[sl], self.t[sl], self.mask[sl], self._crs, traj_id,
+            traj_id_col=self.traj_id_col, time_col=self.time_col, columns=self._columns, geometry=self._geom_col,
+            time_unit=self.time_unit, utm_crs=self.utm_crs, latlon=self.latlon)
+
+    def __iter__(self):
+        for traj_id in self.traj_ids:
+            yield self[traj_id]
+
+    def items(self):
+        for traj_id in self.traj_ids:
+            yield traj_id, self[traj_id]
+
+    @property
+    def crs(self):
+        return f"EPSG:{self._crs.to_epsg()}"
+
+    def _active(self):
+        """当前保留的点的位置，及其分段偏移"""
+        positions = np.flatnonzero(self.mask)
+        offsets = np.searchsorted(positions, self.offsets)
+
+        return positions, offsets
+
+    def _update_mask(self, positions, keep, desc=None, verbose=False):
+        ori_size = len(positions)
+        self.mask[positions[~keep]] = False
+        if verbose:
+            cur_size = int(keep.sum())
+            logger.debug(f"{desc} {ori_size} -> {cur_size}, "
+                         f"cut down {(ori_size - cur_size) / max(ori_size, 1) * 100:.1f}%")
+
+        return self.mask
+
+    def filter_by_point_update_policy(self, radius=500, verbose=False):
+        if self.latlon:
+            radius /= 110_000
+
+        positions, offsets = self._active()
+        keep = update_policy_mask(self.x[positions], self.y[positions], radius, offsets=offsets)
+
+        return self._update_mask(positions, keep, "Filter points", verbose)
+
+    def clean_drift_points(self, method='twoside', speed_limit=None, dis_limit=None,
+                           angle_limit=30, alpha=1, strict=False, verbose=False):
+        positions, offsets = self._active()
+        keep = clean_drift_mask(self.x[positions], self.y[positions], self.t[positions], offsets,
+                                method=method, speed_limit=speed_limit, dis_limit=dis_limit,
+                                angle_limit=angle_limit, alpha=alpha, strict=strict)
+
+        return self._update_mask(positions, keep, "Clean drift points", verbose)
+
+    def simplify(self, tolerance=100, verbose=False, sed=False):
+        positions, offsets = self._active()
+        t = self.t[positions] if sed else None
+        keep = simplify_traj_mask(self.x[positions], self.y[positions], tolerance, offsets, t)
+
+        return self._update_mask(positions, keep, "Simplify points", verbose)
+
+    def preprocess(
+        self,
+        radius=500,
+        speed_limit=0,
+        dis_limit=0,
+        angle_limit=45,
+        alpha=3,
+        strict=False,
+        tolerance=None,
+        verbose=False,
+    ):
+        """与 `Trajectory.preprocess` 相同的预处理流程，一次处理全部轨迹"""
+        self.filter_by_point_update_policy(radius=radius, verbose=verbose)
+        self.clean_drift_points(
+            speed_limit=speed_limit,
+            dis_limit=dis_limit,
+            angle_limit=angle_limit,
+            alpha=alpha,
+            strict=strict,
+            verbose=verbose,
+        )
+
+        if tolerance:
+            self.simplify(tolerance, verbose=verbose)
+
+        return self.mask
+
+    @property
+    def points(self):
+        """全部保留的点的 GeoDataFrame"""
+        positions = np.flatnonzero(self.mask)
+        df = self._df.iloc[positions].assign(**{
+            self.time_col: self.t[positions],
+            self._geom_col: gpd.points_from_xy(self.x[positions], self.y[positions], crs=self._crs)})
+
+        return gpd.GeoDataFrame(df[self._columns], geometry=self._geom_col, crs=self._crs)
+
+
+if __name__ == "__main__":
+    import time
+
+    # 5000 条轨迹，共 100 万个点
+    n_traj, n = 5_000, 1_000_000
+    rng = np.random.default_rng(0)
+    traj_ids = np.sort(rng.integers(0, n_traj, n))
+    xy = np.cumsum(rng.normal(0, 0.002, (n, 2)), axis=0) % 0.5 + [113.8, 22.5]
+    pts = gpd.GeoDataFrame({'traj_id': traj_ids, 'dt': np.arange(n) * 30},
+                           geometry=gpd.points_from_xy(*xy.T), crs=4326)
+    params = dict(radius=800, speed_limit=0, dis_limit=None, angle_limit=60, alpha=3, tolerance=250)
+
+    start = time.perf_counter()
+    for traj_id, df in pts.groupby('traj_id'):
+        Trajectory(df, traj_id=traj_id, traj_id_col='traj_id', utm_crs=32649).preprocess(**params)
+    legacy_cost = time.perf_counter() - start
+
+    start = time.perf_counter()
+    trajs = TrajectoryCollection(pts, utm_crs=32649)
+    trajs.preprocess(**params)
+    print(f"{n_traj} trajectories, per trajectory: {legacy_cost:.2f} s, "
+          f"collection: {time.perf_counter() - start:.2f} s, {trajs}")
@@ -1,39 +1,167 @@
 import sys
 sys.path.append('../')
 
+import shapely
+import numpy as np
 import geopandas as gpd
 from loguru import logger
 
-from tilemap import plot_geodata
-
 from .base import BaseTrajectory
-from .cleaner import simplify_traj_points
-from .cleaner import clean_drift_traj_points
-from .cleaner import filter_by_point_update_policy
+from .cleaner import simplify_traj_mask
+from .cleaner import update_policy_mask
+from .cleaner import clean_drift_mask
 from ..geo.serialization import read_csv_to_geodataframe, to_geojson
-from ..geo.geo_utils import convert_geom_to_utm_crs, convert_geom_to_wgs
+from ..geo.geo_utils import convert_geom_to_wgs
+from ..geo.projection import PROJECTION_CACHE
+from ..geo.coordtransform.GeoCoordinateTransform import CoordTransformPipeline
 
 TRAJ_ID_COL = "tid"
 
 
 class Trajectory(BaseTrajectory):
+    """
+    列式存储的轨迹：按时间排序的投影坐标 `x`、`y`、时间 `t` 以及保留掩码 `mask`，均为连续的 NumPy 数组.
+
+    - 输入的 DataFrame 不做复制与原地投影，只保留其属性列（写时复制下与输入共享内存），不持有几何对象，
+      取值均为 `traj_id` 的轨迹编号列也不保存；
+    - 预处理的各个步骤（点更新策略、漂移点清洗、化简）只更新 `mask`，并返回保留的点 `points`；
+    - `raw_df`（全部点）与 `points`（保留的点）为按需构建的 GeoDataFrame 视图，`mask` 变化后 `points` 重新构建.
+    """
+
     def __init__(self, df:gpd.GeoDataFrame, traj_id:int, traj_id_col=TRAJ_ID_COL, obj_id=None, 
                  x=None, y=None, t='dt', time_unit=1, geometry='geometry', utm_crs=None, parent=None,
-                 latlon=False):
+                 latlon=False, ll_sys='wgs'):
         assert not (x is None and y is None) or geometry is not None, "Check Coordination"
-        self.raw_df = df
         self.latlon = latlon
         self.utm_crs = utm_crs
         self.time_col = t
         self.time_unit = time_unit
+        self.traj_id = traj_id
+        self.traj_id_col = traj_id_col
+
+        # 坐标
+        if isinstance(df, gpd.GeoDataFrame) and (x is None or y is None):
+            geoms = np.asarray(df.geometry.values, dtype=object)
+            xy = np.column_stack([shapely.get_x(geoms), shapely.get_y(geoms)])
+            crs = df.crs if df.crs is not None else 4326
+        else:
+            xy = np.column_stack([df[x].values, df[y].values]).astype(np.float64)
+            crs = 4326
         if self.latlon is False:
-            self.raw_df = convert_geom_to_utm_crs(self.raw_df, utm_crs)
+            xy, crs = self._project(xy, crs, utm_crs, ll_sys)
+        self._crs = gpd.GeoSeries(crs=crs).crs
+
+        # 按时间排序，已有序时不保存排列
+        ts = df[t].values if t in df.columns else np.arange(len(df))
+        order = np.argsort(ts, kind='stable')
+        self._order = None if (order[1:] > order[:-1]).all() else order
+        self.x = np.ascontiguousarray(xy[order, 0])
+        self.y = np.ascontiguousarray(xy[order, 1])
+        self.t = np.ascontiguousarray(ts[order])
+        self.mask = np.ones(len(order), dtype=bool)
+
+        # 属性列：几何与时间列由数组还原
+        self._geom_col = df.geometry.name if isinstance(df, gpd.GeoDataFrame) else geometry
+        self._columns = [c for c in df.columns if c not in (x, y)] + \
+                        ([self._geom_col] if self._geom_col not in df.columns else [])
+        drop = [c for c in [self._geom_col, t, x, y] if c in df.columns]
+        # 取值全为 traj_id 的轨迹编号列不保存，视图中按原 dtype 还原
+        self._tid_dtype = None
+        if traj_id_col in df.columns and traj_id_col not in drop and (df[traj_id_col].values == traj_id).all():
+            self._tid_dtype = df[traj_id_col].dtype
+            drop.append(traj_id_col)
+        self._df = df.drop(columns=drop)
+        self._views = {}
+
+    @classmethod
+    def from_arrays(cls, attrs, x, y, t, mask, crs, traj_id, traj_id_col=TRAJ_ID_COL, time_col='dt',
+                    columns=None, geometry='geometry', time_unit=1, utm_crs=None, latlon=False):
+        """
+        由已投影、按时间排序的数组构建轨迹，不做复制，`mask` 等数组可以是 `TrajectoryCollection` 中数组的切片.
 
-        self.points = self.raw_df.copy()
+        Args:
+            attrs (pd.DataFrame): 与数组逐行对应的属性列（不含几何与时间列）.
+            columns (list, optional): 视图的列顺序，默认为属性列 + 时间列 + 几何列.
+        """
+        traj = cls.__new__(cls)
+        traj.latlon = latlon
+        traj.utm_crs = utm_crs
+        traj.time_col = time_col
+        traj.time_unit = time_unit
+        traj.traj_id = traj_id
+        traj.traj_id_col = traj_id_col
+        traj._crs = gpd.GeoSeries(crs=crs).crs
+        traj._order = None
+        traj.x, traj.y, traj.t, traj.mask = x, y, t, mask
+        traj._geom_col = geometry
+        traj._columns = columns if columns is not None else [*attrs.columns, time_col, geometry]
+        traj._df = attrs
+        traj._tid_dtype = None
+        traj._views = {}
+
+        return traj
+
+    @staticmethod
+    def _project(xy, crs, utm_crs, ll_sys):
+        crs = gpd.GeoSeries(crs=crs).crs
+        if utm_crs is None and len(xy) == 0:
+            # 空轨迹无法确定投影带，保持原坐标系
+            return xy, crs
+        if utm_crs is None and crs.is_geographic:
+            utm_crs = PROJECTION_CACHE.get_context((*np.nanmin(xy, axis=0), *np.nanmax(xy, axis=0))).crs
+        elif utm_crs is None:
+            utm_crs = gpd.GeoSeries(gpd.points_from_xy(*xy[:1].T), crs=crs).estimate_utm_crs()
+
+        pipeline = CoordTransformPipeline(ll_sys if ll_sys != 'wgs' else crs, utm_crs)
+        return pipeline(xy), pipeline.crs
+
+    def _build_view(self, positions):
+        df = self._df.iloc[positions if self._order is None else self._order[positions]]
+        cols = {self.time_col: self.t[positions],
+                self._geom_col: gpd.points_from_xy(self.x[positions], self.y[positions], crs=self._crs)}
+        if self._tid_dtype is not None:
+            cols[self.traj_id_col] = np.full(len(positions), self.traj_id).astype(self._tid_dtype)
+        df = df.assign(**cols)
+
+        return gpd.GeoDataFrame(df[self._columns], geometry=self._geom_col, crs=self._crs)
 
-        self.traj_id_col = traj_id_col
-        if traj_id_col not in self.points.columns:
-            self.points.loc[:, traj_id_col] = traj_id
+    @property
+    def raw_df(self):
+        """全部点的 GeoDataFrame 视图（投影坐标，按时间排序）"""
+        if 'raw' not in self._views:
+            self._views['raw'] = self._build_view(np.arange(len(self.x)))
+
+        return self._views['raw']
+
+    @property
+    def points(self):
+        """保留的点的 GeoDataFrame 视图"""
+        if 'points' not in self._views:
+            df = self._build_view(np.flatnonzero(self.mask))
+            if self.traj_id_col not in df.columns:
+                df[self.traj_id_col] = self.traj_id
+            self._views['points'] = df
+
+        return self._views['points']
+
+    @points.setter
+    def points(self, gdf):
+        labels = self._df.index.values if self._order is None else self._df.index.values[self._order]
+        self.mask = np.isin(labels, gdf.index.values)
+        self._views['points'] = gdf
+
+    def _update_mask(self, positions, keep, desc=None, verbose=False):
+        """`positions` 为当前保留点的位置，`keep` 为其中仍保留的掩码"""
+        ori_size = len(positions)
+        self.mask[positions[~keep]] = False
+        self._views.pop('points', None)
+
+        if verbose:
+            cur_size = int(keep.sum())
+            logger.debug(f"{desc} {ori_size} -> {cur_size}, "
+                         f"cut down {(ori_size - cur_size) / max(ori_size, 1) * 100:.1f}%")
+
+        return self.points
 
     def __str__(self):
         #  ({self.get_start_time()} to {self.get_end_time()}),  | Length: {round(self.get_length(), 1)}m
@@ -46,7 +174,7 @@ class Trajectory(BaseTrajectory):
         return super().__repr__()
 
     def is_valid(self):
-        return self.points.shape[0] > 1
+        return self.mask.sum() > 1
 
     def clean_drift_points(self, method='twoside', speed_limit=None, dis_limit=None,
                            angle_limit=30, alpha=1, strict=False, verbose=False):
@@ -54,21 +182,12 @@ class Trajectory(BaseTrajectory):
         Clean drift in trajectory data by filtering out points based on speed, distance, 
         and angle thresholds.
         """
+        positions = np.flatnonzero(self.mask)
+        keep = clean_drift_mask(self.x[positions], self.y[positions], self.t[positions], method=method,
+                                speed_limit=speed_limit, dis_limit=dis_limit, angle_limit=angle_limit,
+                                alpha=alpha, strict=strict)
 
-        if verbose:
-            ori_size = len(self.points)
-
-        self.points, mask = clean_drift_traj_points(
-            self.points, col = [self.traj_id_col, self.time_col, 'geometry'],
-            method = method, speed_limit = speed_limit, dis_limit = dis_limit,
-            angle_limit = angle_limit, alpha = alpha, strict = strict, verbose = verbose)
-
-        if verbose:
-            # logger_dataframe(mask, desc="clean_drift_traj_points mask:")
-            cur_size = len(self.points)
-            logger.debug(f"Clean drift points {ori_size} -> {cur_size}, cut down {(ori_size - cur_size) / ori_size * 100:.1f}%")
-
-        return self.points
+        return self._update_mask(positions, keep, "Clean drift points", verbose)
 
     def filter_by_point_update_policy(self, radius=500, verbose=False):
         """
@@ -77,28 +196,22 @@ class Trajectory(BaseTrajectory):
         number of updates sent to a server in a tracking system.
         """
         if self.latlon:
-            radius /= 110,000
-
-        if verbose:
-            ori_size = len(self.points)
-
-        self.points = filter_by_point_update_policy(self.points, radius)
+            radius /= 110_000
 
-        if verbose:
-            cur_size = len(self.points)
-            logger.debug(f"Filter points {ori_size} -> {cur_size}, cut down {(ori_size - cur_size) / ori_size * 100:.1f}%")
+        positions = np.flatnonzero(self.mask)
+        keep = update_policy_mask(self.x[positions], self.y[positions], radius)
 
-        return self.points
+        return self._update_mask(positions, keep, "Filter points", verbose)
 
-    def simplify(self, tolerance=100, precision=6, verbose=False):
-        if verbose:
-            ori_size = len(self.points)
-        self.points = simplify_traj_points(self.points, tolerance, precision)
-        if verbose:
-            cur_size = len(self.points)
-            logger.debug(f"Simplify points {ori_size} -> {cur_size}, cut down {(ori_size - cur_size) / ori_size * 100:.1f}%")
+    def simplify(self, tolerance=100, precision=6, verbose=False, sed=False):
+        """
+        Douglas-Peucker simplification; `sed=True` uses the synchronized euclidean distance (time-aware).
+        """
+        positions = np.flatnonzero(self.mask)
+        t = self.t[positions] if sed else None
+        keep = simplify_traj_mask(self.x[positions], self.y[positions], tolerance, t=t)
 
-        return self.points
+        return self._update_mask(positions, keep, "Simplify points", verbose)
 
     def preprocess(
         self,
@@ -123,18 +236,18 @@ class Trajectory(BaseTrajectory):
         )
 
         if tolerance:
-            self.points = self.simplify(tolerance, verbose=verbose)
+            self.simplify(tolerance, verbose=verbose)
 
         if plot:
             fig, ax = self.plot_preprocess_result()
 
     @property
     def crs(self):
-        return f"EPSG:{self.points.crs.to_epsg()}"
+        return f"EPSG:{self._crs.to_epsg()}"
 
     @property
     def get_epsg(self):
-        return self.crs.to_epsg()
+        return self._crs.to_epsg()
 
     def plot(self, *args, **kwargs):
         return self.points.plot(*args, **kwargs)
@@ -147,6 +260,8 @@ class Trajectory(BaseTrajectory):
 
     def plot_preprocess_result(self):
         """轨迹数据预处理结果可视化"""
+        from tilemap import plot_geodata
+
         fig, ax = plot_geodata(self.raw_df.to_crs(4326), 
                             tile_alpha=.5, color='r', alpha=.7, marker='x', label='Remove')
 
@@ -180,11 +295,10 @@ class Trajectory(BaseTrajectory):
         return to_geojson(df, fn)
 
     def size(self):
-        return self.raw_df.shape[0]
+        return len(self.x)
     
     def get_duration(self):
-        ts  = self.raw_df[self.time_col]
-        return (ts.max() - ts.min()) / self.time_unit
+        return (self.t.max() - self.t.min()) / self.time_unit
 
 
 if __name__ == "__main__":
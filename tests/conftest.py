@@ -0,0 +1,67 @@
+import pytest
+import shapely
+import numpy as np
+import geopandas as gpd
+
+
+@pytest.fixture
+def make_lines():
+    """随机线段：起点在 [0, extent) 的正方形内均匀分布，终点为起点加上标准差 `length` 的偏移."""
+    def _make(n=500, extent=5000, length=200, seed=0):
+        rng = np.random.default_rng(seed)
+        starts = rng.uniform(0, extent, (n, 2))
+
+        return shapely.linestrings(np.stack([starts, starts + rng.normal(0, length, (n, 2))], 1))
+
+    return _make
+
+
+@pytest.fixture
+def make_network(make_lines):
+    """
+    EPSG:32649 下的路网 `segs`（eid、way）与查询点 `pts`（pid）；
+    `n_towers` 不为空时，查询点为反复出现并带有亚米级抖动的基站位置.
+    """
+    def _make(n_segs=500, n_pts=300, extent=5000, n_towers=None, seed=0):
+        segs = gpd.GeoDataFrame({'eid': np.arange(n_segs), 'way': np.arange(n_segs) // 3},
+                                geometry=make_lines(n_segs, extent, seed=seed), crs=32649)
+        rng = np.random.default_rng(seed + 1)
+        if n_towers is None:
+            xy = rng.uniform(0, extent, (n_pts, 2))
+        else:
+            towers = rng.uniform(0, extent, (n_towers, 2))
+            xy = towers[rng.integers(0, n_towers, n_pts)] + rng.uniform(-0.3, 0.3, (n_pts, 2))
+        pts = gpd.GeoDataFrame({'pid': np.arange(n_pts) + 100}, geometry=gpd.points_from_xy(*xy.T), crs=32649)
+
+        return segs, pts
+
+    return _make
+
+
+@pytest.fixture
+def make_trajs():
+    """
+    随机游走的轨迹点：在 EPSG:32650 下从深圳附近出发，步长标准差 `step` 米，按 `jump_rate` 的比例叠加 `jump` 米的漂移.
+
+    Args:
+        n (int, optional): 每条轨迹的点数，默认随机取 [1, 150).
+        stop (slice, optional): 停留的点，位置与其中第一个点相同.
+        sort_dt (bool, optional): 时间是否严格递增，默认为乱序且可能重复的整数秒.
+    """
+    def _make(n_traj=1, n=None, seed=0, crs=32650, step=200, jump=3000, jump_rate=0.1, stop=None, sort_dt=False):
+        rng = np.random.default_rng(seed)
+        lst = []
+        for i in range(n_traj):
+            size = int(rng.integers(1, 150)) if n is None else n
+            xy = np.cumsum(rng.normal(0, step, (size, 2)), 0) + [195_000, 2_497_000]
+            xy[rng.random(size) < jump_rate] += jump
+            if stop is not None:
+                xy[stop] = xy[stop.start]
+            dt = np.cumsum(rng.integers(1, 40, size)) if sort_dt else rng.integers(0, size * 20, size)
+            lst.append(gpd.GeoDataFrame({'tid': i, 'dt': dt.astype(float), 'v': rng.normal(size=size)},
+                                        geometry=gpd.points_from_xy(*xy.T), crs=32650))
+        df = gpd.GeoDataFrame(gpd.pd.concat(lst, ignore_index=True), crs=32650)
+
+        return df.to_crs(crs) if crs != 32650 else df
+
+    return _make
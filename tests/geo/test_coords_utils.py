@@ -0,0 +1,56 @@
+import pytest
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+
+from maptools.geo.coords_utils import (
+    str_to_point, xyxy_str_to_linestring, xsys_str_to_linestring, decode_coords_column,
+    str_series_to_points, xyxy_str_series_to_linestrings, xsys_str_series_to_linestrings)
+
+
+@pytest.fixture
+def lines():
+    rng = np.random.default_rng(0)
+    return [np.round(rng.uniform([113.8, 22.5], [114.3, 22.7], (n, 2)), 6) for n in [2, 5, 17, 3]]
+
+
+def test_decode_coords_column(lines):
+    strs = [';'.join(f"{x},{y}" for x, y in line) for line in lines]
+    strs[1] += ';'
+    coords, offsets = decode_coords_column(pd.Series(strs + ['', None]))
+
+    assert (offsets == np.cumsum([0] + [len(line) for line in lines] + [0, 0])).all()
+    assert (coords == np.concatenate(lines)).all()
+
+
+@pytest.mark.parametrize("ll", ['wgs', 'gcj'])
+def test_column_decoders_match_scalar(lines, ll):
+    strs = pd.Series([';'.join(f"{x},{y}" for x, y in line) for line in lines], index=list('abcd'))
+    res = xyxy_str_series_to_linestrings(strs, ll)
+    ans = gpd.GeoSeries([xyxy_str_to_linestring(x, ll) for x in strs], index=strs.index, crs=4326)
+    assert res.geom_equals_exact(ans, 1e-9).all()
+
+    xs = pd.Series([','.join(map(str, line[:, 0])) for line in lines])
+    ys = pd.Series([','.join(map(str, line[:, 1])) for line in lines])
+    res = xsys_str_series_to_linestrings(xs, ys, ll)
+    ans = gpd.GeoSeries([xsys_str_to_linestring(x, y, ll) for x, y in zip(xs, ys)], crs=4326)
+    assert res.geom_equals_exact(ans, 1e-9).all()
+
+    pts = pd.Series([f"{x},{y}" for x, y in lines[2]])
+    res = str_series_to_points(pts, ll)
+    ans = gpd.GeoSeries([str_to_point(x, ll) for x in pts], crs=4326)
+    assert res.geom_equals_exact(ans, 1e-9).all()
+
+
+def test_column_decoder_degenerate_strings():
+    res = xyxy_str_series_to_linestrings(pd.Series(['114.0,22.5;114.1,22.6', '', '114.0,22.5']), 'gcj')
+
+    assert res.iloc[0].length > 0
+    assert res.iloc[1].is_empty
+    assert res.iloc[2] is None
+
+    with pytest.raises(ValueError):
+        xyxy_str_series_to_linestrings(pd.Series(['114.0,22.5;114.1']), 'gcj')
+    for bad in ['1,2,3;4', '1;2,3,4', '1,2;3', '1,2;;3,4,5']:
+        with pytest.raises(ValueError):
+            decode_coords_column([bad])
@@ -0,0 +1,233 @@
+import pytest
+import shapely
+import numpy as np
+import geopandas as gpd
+
+from maptools.geo.coordtransform import coordTransform_py as ct
+from maptools.geo.coordtransform import coordTransform_np as ct_np
+
+
+FUNCS = ['wgs84_to_gcj02', 'gcj02_to_wgs84', 'bd09_to_gcj02',
+         'gcj02_to_bd09', 'wgs84_to_bd09', 'bd09_to_wgs84']
+
+
+@pytest.fixture
+def lnglat():
+    rng = np.random.default_rng(0)
+    # 覆盖国内外的点
+    lng = rng.uniform(60, 150, 5000)
+    lat = rng.uniform(-5, 60, 5000)
+
+    return lng, lat
+
+
+@pytest.mark.parametrize("func", FUNCS)
+def test_vectorized_match_scalar(func, lnglat):
+    lng, lat = lnglat
+    xs, ys = getattr(ct_np, func)(lng, lat)
+    ans = np.array([getattr(ct, func)(x, y) for x, y in zip(lng, lat)])
+
+    assert np.abs(xs - ans[:, 0]).max() < 1e-9
+    assert np.abs(ys - ans[:, 1]).max() < 1e-9
+
+
+@pytest.mark.parametrize("func", FUNCS)
+def test_vectorized_edge_cases(func):
+    # 原点（atan2(0, 0)）、百度偏移原点、高纬度与经度超出 ±180 的点
+    lng = np.array([0, 0.0065, 0, 179.9, -720.5, 114.05, 73.66, 135.05])
+    lat = np.array([0, 0.006, 89.9, -89.9, 45.2, 22.55, 3.86, 53.55])
+    xs, ys = getattr(ct_np, func)(lng, lat)
+    ans = np.array([getattr(ct, func)(x, y) for x, y in zip(lng, lat)])
+    assert np.abs(xs - ans[:, 0]).max() < 1e-9 and np.abs(ys - ans[:, 1]).max() < 1e-9
+
+    # NaN 与标量版本一致：不在国内，不做偏移
+    lng, lat = np.array([np.nan, 114.05]), np.array([22.55, np.nan])
+    xs, ys = getattr(ct_np, func)(lng, lat)
+    ans = np.array([getattr(ct, func)(x, y) for x, y in zip(lng, lat)])
+    np.testing.assert_allclose(np.column_stack([xs, ys]), ans, rtol=0, atol=1e-9)
+
+
+def test_vectorized_geoseries_input():
+    pts = gpd.GeoSeries(gpd.points_from_xy([113.93, 128.543, 0], [22.53, 37.065, 0]), crs=4326)
+    xs, ys = ct_np.gcj02_to_wgs84(pts)
+
+    for x, y, p in zip(xs, ys, pts):
+        assert np.allclose([x, y], ct.gcj02_to_wgs84(p.x, p.y), atol=1e-9)
+    # 国外的点不做偏移
+    assert xs[-1] == 0 and ys[-1] == 0
+
+
+def test_gcj02_to_wgs84_iterative(lnglat):
+    lng, lat = lnglat
+    gcj_lng, gcj_lat = ct_np.wgs84_to_gcj02(lng, lat)
+
+    xs, ys, info = ct_np.gcj02_to_wgs84_iterative(gcj_lng, gcj_lat, tol=1e-10, return_info=True)
+    assert info['converged'].all()
+    assert info['residual'].max() <= 1e-10
+    # 国境线附近 WGS 与 GCJ 坐标可能分处 `out_of_china` 的两侧，仅比较两者都在国内的点
+    inside = ~ct_np.out_of_china(lng, lat) & ~ct_np.out_of_china(gcj_lng, gcj_lat)
+    assert np.abs(xs - lng)[inside].max() < 1e-9 and np.abs(ys - lat)[inside].max() < 1e-9
+
+    # 国外的点不迭代
+    outside = ct_np.out_of_china(lng, lat)
+    assert (info['iterations'][outside] == 0).all()
+
+    # 迭代次数不超过 `max_iter`
+    _, _, info = ct_np.gcj02_to_wgs84_iterative(gcj_lng, gcj_lat, tol=0, max_iter=2, return_info=True)
+    assert info['iterations'].max() == 2
+
+
+def test_gcj_offset_grid(tmp_path):
+    from maptools.geo.coordtransform import GCJOffsetGrid
+
+    bbox = (113.9, 22.5, 114.1, 22.6)
+    fn = tmp_path / 'grid.npy'
+    GCJOffsetGrid.build(bbox, step=0.002, filename=fn)
+    grid = GCJOffsetGrid.load(fn)
+    assert isinstance(grid.offsets, np.memmap)
+
+    rng = np.random.default_rng(0)
+    lng = rng.uniform(113.8, 114.2, 10000)
+    lat = rng.uniform(22.45, 22.65, 10000)
+    xs, ys = grid.wgs84_to_gcj02(lng, lat)
+    ans_xs, ans_ys = ct_np.wgs84_to_gcj02(lng, lat)
+    assert np.abs(xs - ans_xs).max() <= grid.max_error
+    assert np.abs(ys - ans_ys).max() <= grid.max_error
+
+    # 格网外的点使用精确公式
+    outside = (lng < bbox[0]) | (lng > grid.bounds[2]) | (lat < bbox[1]) | (lat > grid.bounds[3])
+    assert (xs[outside] == ans_xs[outside]).all() and (ys[outside] == ans_ys[outside]).all()
+
+    xs, ys = grid.gcj02_to_wgs84(ans_xs, ans_ys)
+    ans_xs, ans_ys = ct_np.gcj02_to_wgs84(ans_xs, ans_ys)
+    assert np.abs(xs - ans_xs).max() <= grid.max_error
+
+
+@pytest.mark.parametrize("bbox", [(120, 44.5, 121, 45), (125, 52.5, 126, 53), (80, 40, 85, 45)])
+def test_gcj_offset_grid_max_error_high_latitude(bbox, tmp_path):
+    from maptools.geo.coordtransform import GCJOffsetGrid
+
+    GCJOffsetGrid.build(bbox, step=0.01, filename=tmp_path / 'grid.npy')
+    grid = GCJOffsetGrid.load(tmp_path / 'grid.npy')
+    rng = np.random.default_rng(0)
+    lng = rng.uniform(bbox[0], bbox[2], 100_000)
+    lat = rng.uniform(bbox[1], bbox[3], 100_000)
+    dlng, dlat = grid.offset(lng, lat)
+    ans_lng, ans_lat = ct_np.gcj_offset(lng, lat)
+    err = max(np.abs(dlng - ans_lng).max(), np.abs(dlat - ans_lat).max())
+
+    # 原先不随纬度变化的估计 0.0065 * step^2 在这些范围内不成立
+    assert 0.0065 * grid.step ** 2 < err <= grid.max_error
+    grid._max_error = None
+    assert err <= grid.max_error
+
+
+def test_transform_geometries_mixed_types():
+    from shapely import LineString, MultiPolygon, Point, Polygon
+    from maptools.geo.coordtransform import convert_geodf_coordinates
+
+    shell = [(114.0, 22.5), (114.1, 22.5), (114.1, 22.6), (114.0, 22.5)]
+    hole = [(114.02, 22.51), (114.05, 22.51), (114.05, 22.54), (114.02, 22.51)]
+    geoms = [
+        Point(114.0, 22.5),
+        LineString([(113.9, 22.5), (114.0, 22.6), (114.1, 22.55)]),
+        Polygon(shell, [hole]),
+        MultiPolygon([Polygon(shell), Polygon(hole)]),
+    ]
+    gdf = gpd.GeoDataFrame({'id': range(4)}, geometry=geoms, crs=4326, index=list('abcd'))
+    res = convert_geodf_coordinates(gdf.copy(), 'GCJ-02', 'wgs')
+
+    assert list(res.index) == list('abcd') and res.crs == gdf.crs
+    assert list(res.geom_type) == list(gdf.geom_type)
+    assert len(res.loc['c', 'geometry'].interiors) == 1
+
+    coords = shapely.get_coordinates(res.geometry.values)
+    ans = np.array([ct.gcj02_to_wgs84(x, y) for x, y in shapely.get_coordinates(gdf.geometry.values)])
+    assert np.abs(coords - ans).max() < 1e-9
+
+
+def test_to_crs_fused_pipeline():
+    from maptools.geo.coordtransform import convert_geodf_coordinates, get_transformer
+
+    gdf = gpd.GeoDataFrame({'id': [0, 1]}, geometry=gpd.points_from_xy([114.0, 114.1], [22.5, 22.6]), crs=4326)
+    res = gdf.ct.to_crs(32649, source_crs='gcj')
+    ans = convert_geodf_coordinates(gdf.copy(), 'gcj', 'wgs').to_crs(32649)
+
+    assert res.crs.to_epsg() == 32649
+    assert res.geom_equals_exact(ans, 1e-6).all()
+    assert gdf.geometry.ct.to_crs('bd').crs.to_epsg() == 4326
+    assert get_transformer(4326, 32649) is get_transformer('EPSG:4326', 32649)
+
+
+@pytest.mark.parametrize("src, dst, func", [
+    ('gcj', 'bd', ct.gcj02_to_bd09), ('bd', 'gcj', ct.bd09_to_gcj02), ('gcj', 'gcj', None), ('bd', 'bd', None)])
+def test_pipeline_datum_pairs_direct(src, dst, func, lnglat):
+    from maptools.geo.coordtransform import CoordTransformPipeline
+
+    coords = np.column_stack(lnglat)
+    res = CoordTransformPipeline(src, dst)(coords)
+    ans = coords if func is None else np.array([func(x, y) for x, y in coords])
+    assert np.abs(res - ans).max() < 1e-9
+
+
+@pytest.mark.parametrize("func", FUNCS)
+def test_numba_kernels_match_scalar(func, lnglat):
+    from maptools.geo.coordtransform import coordTransform_nb as ct_nb
+
+    lng, lat = lnglat
+    xs, ys = getattr(ct_nb, func)(lng, lat)
+    ans = np.array([getattr(ct, func)(x, y) for x, y in zip(lng, lat)])
+
+    assert np.abs(xs - ans[:, 0]).max() < 1e-9
+    assert np.abs(ys - ans[:, 1]).max() < 1e-9
+
+
+def test_numba_bd_mercator():
+    from maptools.geo.coordtransform import coordTransform_nb as ct_nb
+
+    x, y = ct_nb.bd_coord_to_mc(np.array([116.404]), np.array([39.915]))
+    assert np.allclose([x[0], y[0]], [12958175.0, 4825923.77], atol=0.01)
+
+    rng = np.random.default_rng(0)
+    lng, lat = rng.uniform(73, 136, 1000), rng.uniform(3, 54, 1000)
+    xs, ys = ct_nb.bd_mc_to_coord(*ct_nb.bd_coord_to_mc(lng, lat))
+    assert np.abs(xs - lng).max() < 1e-6 and np.abs(ys - lat).max() < 1e-5
+
+
+@pytest.mark.parametrize("sys", ['bd', 'gcj', 'wgs'])
+def test_tiles_bd_array_matches_generator(sys):
+    from maptools.geo.coordtransform import baidutile as bt
+
+    bbox = (113.9, 22.5, 114.0, 22.6)
+    tiles = list(bt.tiles_bd(*bbox, [15, 16]))
+    arr = bt.tiles_bd_array(*bbox, [15, 16], sys=sys)
+
+    assert [(t.x, t.y, t.z) for t in tiles] == list(zip(arr['x'], arr['y'], arr['z']))
+    bounds = np.array([bt.bounds_bd(t, sys) for t in tiles])
+    assert np.abs(bounds - np.column_stack([arr['west'], arr['south'], arr['east'], arr['north']])).max() < 1e-9
+
+    chunks = list(bt.iter_tiles_bd_chunks(*bbox, [15, 16], sys=sys, chunk_size=50))
+    assert max(len(c) for c in chunks) <= 50
+    assert (np.concatenate(chunks) == arr).all()
+
+
+def test_merge_tiles_bd_memmap(tmp_path):
+    from maptools.geo.coordtransform import baidutile as bt
+
+    tiles = list(bt.tiles_bd(113.9, 22.5, 114.0, 22.6, 15))
+    arrays = [np.full((4, 4, 3), i, dtype=np.uint8) for i in range(len(tiles))]
+    img, extent = bt.merge_tiles_bd(tiles, arrays)
+
+    fn = tmp_path / 'mosaic.npy'
+    img_mm, extent_mm = bt.merge_tiles_bd(tiles, iter(arrays), filename=fn)
+    assert isinstance(img_mm, np.memmap)
+    assert (np.load(fn) == img).all()
+    assert extent_mm == extent
+    assert extent == bt.mosaic_extent_bd(bt.tiles_bd_array(113.9, 22.5, 114.0, 22.6, 15))
+
+    # 尺寸或波段数不一致的瓦片
+    for bad in [np.zeros((4, 3, 3), dtype=np.uint8), np.zeros((4, 4, 4), dtype=np.uint8)]:
+        with pytest.raises(ValueError):
+            bt.merge_tiles_bd(tiles, arrays[:-1] + [bad], filename=tmp_path / 'bad.npy')
+        with pytest.raises(ValueError):
+            bt.merge_tiles_bd(tiles, arrays[:-1] + [bad])
@@ -1,9 +1,10 @@
 import pytest
 import numpy as np
+import pandas as pd
 import geopandas as gpd
 from shapely import Point
 
-from maptools.geo.distance import cal_distance_matrix_geoseries
+from maptools.geo.distance import cal_distance_matrix_geoseries, distance_matrix, haversine_distance, knn_distance
 
 
 def test_cal_distance_matrix_geoseries():
@@ -31,3 +32,155 @@ def test_cal_distance_matrix_geoseries():
     # 如果无法确定预期结果，可以编写其他断言来验证结果的一些性质
     # assert len(result) == len(geoseries), "结果长度不符合预期"
     # assert isinstance(result[0], (int, float)), "结果类型不符合预期"
+
+
+@pytest.fixture
+def xy():
+    rng = np.random.default_rng(0)
+    return rng.uniform([113.8, 22.5], [114.3, 22.7], (300, 2)), rng.uniform([113.8, 22.5], [114.3, 22.7], (200, 2))
+
+
+def test_distance_matrix_blocks(xy, tmp_path):
+    xy1, xy2 = xy
+    ans = haversine_distance(xy1[:, None, 0], xy1[:, None, 1], xy2[None, :, 0], xy2[None, :, 1])
+
+    assert np.allclose(distance_matrix(xy1, xy2, block_size=1000), ans, rtol=0, atol=1e-6)
+
+    out = np.lib.format.open_memmap(tmp_path / 'dist.npy', mode='w+', dtype=np.float32, shape=ans.shape)
+    res = distance_matrix(xy1, xy2, dtype=np.float32, out=out, block_size=1000)
+    assert res is out and np.allclose(out, ans, rtol=1e-6)
+
+    mat = distance_matrix(xy1, xy2, max_distance=2000, block_size=1000)
+    assert mat.nnz == (ans <= 2000).sum()
+    assert np.allclose(mat.toarray(), np.where(ans <= 2000, ans, 0))
+
+
+def test_cal_distance_matrix_geoseries_keeps_index(xy):
+    xy1, xy2 = xy
+    points1 = gpd.GeoSeries(gpd.points_from_xy(*xy1.T), index=np.arange(300) + 10, crs=4326)
+    points2 = gpd.GeoSeries(gpd.points_from_xy(*xy2.T), crs=4326)
+    crs = points1.estimate_utm_crs()
+    ans = np.array([points2.to_crs(crs).distance(p).values for p in points1.to_crs(crs)])
+
+    res = cal_distance_matrix_geoseries(points1, points2)
+    assert (res.index == points1.index).all()
+    assert np.allclose(res.values, ans)
+
+    res = cal_distance_matrix_geoseries(points1, points2, dtype=np.float32)
+    assert isinstance(res, pd.DataFrame) and res.values.dtype == np.float32
+    assert (res.index == points1.index).all() and np.allclose(res.values, ans, rtol=1e-6)
+
+
+@pytest.mark.parametrize("metric", ['haversine', 'euclidean'])
+def test_knn_distance_matches_matrix(xy, metric):
+    xy1, xy2 = xy
+    if metric == 'euclidean':
+        xy1, xy2 = xy1 * 1e5, xy2 * 1e5
+    mat = distance_matrix(xy1, xy2, metric=metric)
+    order = np.argsort(mat, axis=1)[:, :3]
+
+    idxs, dists = knn_distance(xy1, xy2, k=3, metric=metric, chunk_size=64)
+    assert (idxs == order).all()
+    assert np.allclose(dists, np.take_along_axis(mat, order, axis=1), rtol=0, atol=1e-6)
+
+    idxs, dists = knn_distance(xy1, xy2, k=1, max_distance=1000, metric=metric)
+    nearest = mat.min(axis=1)
+    assert idxs.shape == (len(xy1), )
+    assert ((idxs == -1) == (nearest > 1000)).all()
+    assert np.allclose(dists[idxs >= 0], nearest[idxs >= 0], rtol=0, atol=1e-6)
+
+
+def test_pointwise_distance_projection_cache(xy):
+    from maptools.geo.distance import cal_pointwise_distance_geoseries, cal_pointwise_distance_xy
+    from maptools.geo.projection import ProjectionCache
+
+    xy1, xy2 = xy[0][:200], xy[1]
+    points1 = gpd.GeoSeries(gpd.points_from_xy(*xy1.T), crs=4326)
+    points2 = gpd.GeoSeries(gpd.points_from_xy(*xy2.T), crs=4326)
+    crs = points1.estimate_utm_crs()
+    ans = points1.to_crs(crs).distance(points2.to_crs(crs))
+
+    cache = ProjectionCache()
+    for _ in range(3):
+        assert np.allclose(cal_pointwise_distance_geoseries(points1, points2, cache=cache), ans)
+    assert cache.stats == {'context_hits': 2, 'context_misses': 1, 'array_hits': 4, 'array_misses': 2}
+
+    ctx = cache.get_context(points1)
+    assert ctx.crs == crs
+    dist = cal_pointwise_distance_xy(cache.project_points(points1, ctx), cache.project_points(points2, ctx))
+    assert np.allclose(dist, ans)
+
+
+def test_projection_cache_zone_independent_of_query_order():
+    from maptools.geo.projection import ProjectionCache
+
+    # 第一个 bbox 的中心 (114.0, 22.5) 恰在 49、50 带的边界上
+    bboxes = [(113.5, 22, 114.5, 23), (114.6, 22, 114.8, 23)]
+    for order in [bboxes, bboxes[::-1]]:
+        cache = ProjectionCache()
+        assert [cache.get_context(bbox).crs.to_epsg() for bbox in order] == [32650, 32650]
+
+
+def test_pointwise_distance_mixed_crs(xy):
+    from maptools.geo.distance import cal_pointwise_distance_geoseries
+
+    points1 = gpd.GeoSeries(gpd.points_from_xy(*xy[0][:200].T), crs=4326)
+    points2 = gpd.GeoSeries(gpd.points_from_xy(*xy[1].T), crs=4326)
+    crs = points1.estimate_utm_crs()
+    ans = points1.to_crs(crs).distance(points2.to_crs(crs))
+
+    assert np.allclose(cal_pointwise_distance_geoseries(points1, points1.to_crs(32649)), 0, atol=1e-6)
+    assert np.allclose(cal_pointwise_distance_geoseries(points1, points2.to_crs(32649)), ans)
+    assert np.allclose(cal_pointwise_distance_geoseries(points1.to_crs(crs), points2), ans)
+
+
+@pytest.mark.parametrize("metric", ['haversine', 'euclidean'])
+def test_knn_distance_mixed_crs(xy, metric):
+    points1 = gpd.GeoSeries(gpd.points_from_xy(*xy[0].T), crs=4326)
+    points2 = gpd.GeoSeries(gpd.points_from_xy(*xy[1].T), crs=4326)
+    ans = knn_distance(points1, points2, k=2, metric=metric)
+    idxs, dists = knn_distance(points1, points2.to_crs(32649), k=2, metric=metric)
+    assert (idxs == ans[0]).all() and np.allclose(dists, ans[1], rtol=1e-9)
+
+    # points2 按 points1 的 crs 计算
+    p1 = points1.to_crs(3857)
+    ans = knn_distance(p1, points2.to_crs(3857), k=2, metric=metric)
+    idxs, dists = knn_distance(p1, points2, k=2, metric=metric)
+    assert (idxs == ans[0]).all() and np.allclose(dists, ans[1], rtol=1e-9)
+
+
+def test_knn_distance_geoseries_with_bare_array(xy):
+    points1 = gpd.GeoSeries(gpd.points_from_xy(*xy[0].T), crs=4326)
+    points2 = gpd.GeoSeries(gpd.points_from_xy(*xy[1].T), crs=4326)
+    with pytest.raises(ValueError):
+        knn_distance(points1, xy[1], metric='euclidean')
+    with pytest.raises(ValueError):
+        knn_distance(xy[0], points2, metric='euclidean')
+
+    # 投影坐标系的 GeoSeries 与同一坐标系下的数组
+    ans = knn_distance(points1.to_crs(32650), points2.to_crs(32650), k=2, metric='euclidean')
+    res = knn_distance(points1.to_crs(32650), points2.to_crs(32650).get_coordinates().values, k=2,
+                       metric='euclidean')
+    assert (res[0] == ans[0]).all() and np.allclose(res[1], ans[1])
+    res = knn_distance(points1, xy[1], k=2)
+    assert (res[0] == knn_distance(points1, points2, k=2)[0]).all()
+
+
+@pytest.mark.parametrize("metric, rtol", [('equirectangular', 1e-6), ('haversine', 5e-3), ('geodesic', 1e-12)])
+def test_distance_backends(xy, metric, rtol):
+    from pyproj import Geod
+    from maptools.geo.distance import cal_pointwise_distance_geoseries, lnglat_distance
+
+    xy1, xy2 = xy[0][:200], xy[1]
+    ans = Geod(ellps='WGS84').inv(xy1[:, 0], xy1[:, 1], xy2[:, 0], xy2[:, 1])[2]
+    assert np.allclose(lnglat_distance(xy1, xy2, metric), ans, rtol=rtol)
+
+    points1 = gpd.GeoSeries(gpd.points_from_xy(*xy1.T), crs=4326)
+    points2 = gpd.GeoSeries(gpd.points_from_xy(*xy2.T), crs=4326)
+    assert np.allclose(cal_pointwise_distance_geoseries(points1, points2, metric=metric), ans, rtol=rtol)
+
+    mat = cal_distance_matrix_geoseries(points1[:20], points2[:30], metric=metric)
+    ans = Geod(ellps='WGS84').inv(*np.broadcast_arrays(xy1[:20, None, 0], xy1[:20, None, 1],
+                                                       xy2[None, :30, 0], xy2[None, :30, 1]))[2]
+    assert np.allclose(mat.values, ans, rtol=rtol)
+
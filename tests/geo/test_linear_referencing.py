@@ -0,0 +1,22 @@
+import shapely
+import numpy as np
+
+from maptools.geo.linear_referencing import linear_referencing_geom
+
+
+def test_linear_referencing_geom_matches_scalar():
+    rng = np.random.default_rng(0)
+    starts = rng.uniform(0, 1000, (500, 2))
+    coords = np.stack([starts, starts + rng.normal(0, 100, (500, 2)), starts + rng.normal(0, 100, (500, 2))], 1)
+    lines = shapely.linestrings(coords)
+    points = shapely.points(starts + rng.normal(0, 50, (500, 2)))
+
+    res = linear_referencing_geom(points, lines, chunk_size=128)
+    offset = np.array([line.project(p) for p, line in zip(points, lines)])
+
+    assert np.allclose(res['offset'], offset)
+    assert np.allclose(res['edge_len'], [line.length for line in lines])
+    assert np.allclose(res['dist_p2c'], [line.distance(p) for p, line in zip(points, lines)])
+    proj = [line.interpolate(o) for o, line in zip(offset, lines)]
+    assert np.allclose(res['proj_x'], [p.x for p in proj]) and np.allclose(res['proj_y'], [p.y for p in proj])
+    assert shapely.equals_exact(res['proj_point'], proj, 1e-9).all()
@@ -0,0 +1,80 @@
+import pytest
+import shapely
+import numpy as np
+
+from maptools.geo.spatial_index import GridIndex, PackedRTree
+
+
+@pytest.mark.parametrize("node_size", [2, 4, 16])
+def test_packed_rtree_matches_strtree(make_lines, node_size, tmp_path):
+    lines = make_lines(2000, 1000, 20)
+    lines[::97] = None
+    points = shapely.points(np.random.default_rng(1).uniform(0, 1000, (500, 2)))
+
+    tree = PackedRTree.from_geometries(lines, node_size=node_size)
+    tree = PackedRTree.load(tree.save(tmp_path / 'sindex.npy'))
+    ans = shapely.STRtree(lines)
+
+    boxes = shapely.buffer(points, 15, cap_style='square')
+    assert set(zip(*tree.query(boxes))) == set(zip(*ans.query(boxes)))
+    res = tree.query(points, 'dwithin', 10, lines)
+    assert set(zip(*res)) == set(zip(*ans.query(points, 'dwithin', distance=10)))
+
+
+@pytest.mark.parametrize("cell_size", [5, 10, 200])
+def test_grid_index_matches_strtree(make_lines, cell_size):
+    lines = make_lines(2000, 1000, 50, seed=1)
+    lines[::97] = None
+    points = shapely.points(np.random.default_rng(2).uniform(-50, 1050, (500, 2)))
+
+    grid = GridIndex.from_geometries(lines, cell_size)
+    ans = shapely.STRtree(lines)
+
+    boxes = shapely.buffer(points, 15, cap_style='square')
+    res = grid.query(boxes)
+    assert len(res[0]) == len(set(zip(*res)))
+    assert set(zip(*res)) == set(zip(*ans.query(boxes)))
+    res = grid.query(points, 'dwithin', 10, lines)
+    assert set(zip(*res)) == set(zip(*ans.query(points, 'dwithin', distance=10)))
+
+
+def test_grid_index_sparse_cells():
+    rng = np.random.default_rng(2)
+    geoms = shapely.points(rng.uniform(0, 1000, (2000, 2)))
+    points = shapely.points(rng.uniform(-50, 1050, (500, 2)))
+
+    grid = GridIndex.from_geometries(geoms, 3)
+    assert grid.cell_keys is not None
+    res = grid.query(points, 'dwithin', 3, geoms)
+    assert set(zip(*res)) == set(zip(*shapely.STRtree(geoms).query(points, 'dwithin', distance=3)))
+
+
+def test_get_grid_index_rebuilds_after_inplace_changes():
+    import geopandas as gpd
+    from maptools.geo.spatial_index import get_grid_index
+
+    rng = np.random.default_rng(1)
+    xy = rng.uniform([113.9, 22.5], [114.1, 22.6], (500, 2))
+    gdf = gpd.GeoDataFrame(geometry=gpd.points_from_xy(*xy.T), crs=4326)
+    grid = get_grid_index(gdf, 100)
+    assert get_grid_index(gdf, 100) is grid
+
+    # 同一对象原地投影
+    gdf.to_crs(32649, inplace=True)
+    assert get_grid_index(gdf, 100) is not grid
+    grid = get_grid_index(gdf, 100)
+    query = shapely.points(gdf.geometry.get_coordinates().values[:20])
+    res = grid.query(query, 'dwithin', 100, gdf.geometry.values)
+    ans = shapely.STRtree(gdf.geometry.values).query(query, 'dwithin', distance=100)
+    assert set(zip(*res)) == set(zip(*ans))
+
+    # 逐元素原地修改几何，需显式重建
+    gdf.loc[0, 'geometry'] = shapely.Point(0, 0)
+    assert get_grid_index(gdf, 100) is grid
+    grid = get_grid_index(gdf, 100, rebuild=True)
+    assert grid.bounds[0, 0] == 0 and get_grid_index(gdf, 100) is grid
+
+    # 整列替换几何
+    gdf['geometry'] = gdf.geometry.translate(1, 1)
+    assert get_grid_index(gdf, 100) is not grid
+    assert get_grid_index(gdf, 100).bounds[0, 0] == 1
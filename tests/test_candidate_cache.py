@@ -0,0 +1,34 @@
+import os
+
+from maptools.query import find_nearest_geometries
+from maptools.candidate_cache import CandidateCache
+
+
+def test_candidate_cache_matches_find_nearest_geometries(make_network):
+    segs, pts = make_network(n_pts=400, n_towers=50)
+    cache = CandidateCache(segs, precision=2, way_id='way')
+    for top_k in [None, 3]:
+        ans, _ = find_nearest_geometries(pts, segs, query_id='pid', max_distance=300, top_k=top_k, way_id='way')
+        for _ in range(2):
+            res, _ = cache.find_nearest_geometries(pts, query_id='pid', max_distance=300, top_k=top_k)
+            assert sorted(zip(res.pid, res.eid, res.dist_p2c)) == sorted(zip(ans.pid, ans.eid, ans.dist_p2c))
+
+    assert cache.stats['misses'] == cache.stats['hits'] <= 2 * 100
+    assert cache.hit_rate == 0.5
+
+
+def test_candidate_cache_disk_tier_and_invalidation(make_network, tmp_path):
+    segs, pts = make_network(n_pts=400, n_towers=50)
+    ckpt = tmp_path / 'network.ckpt'
+    ckpt.write_bytes(b'v1')
+
+    CandidateCache(segs, cache_dir=tmp_path, ckpt=ckpt).find_nearest_geometries(pts, max_distance=300, top_k=3)
+    cache = CandidateCache(segs, cache_dir=tmp_path, ckpt=ckpt)
+    cache.find_nearest_geometries(pts, max_distance=300, top_k=3)
+    assert cache.stats['misses'] == 0 and cache.stats['disk_hits'] > 0
+
+    ckpt.write_bytes(b'v2 network')
+    os.utime(ckpt, ns=(0, 0))
+    assert cache.check_network()
+    cache.find_nearest_geometries(pts, max_distance=300, top_k=3)
+    assert cache.stats['misses'] > 0
@@ -0,0 +1,118 @@
+import pytest
+import shapely
+import numpy as np
+
+from maptools.query import find_nearest_geometries, find_nearest_geometries_batch, iter_candidate_groups
+
+
+def brute_force(segs, pts, max_distance):
+    dist = shapely.distance(np.asarray(pts.geometry.values)[:, None], np.asarray(segs.geometry.values)[None, :])
+    qids, eids = np.nonzero(dist <= max_distance)
+
+    return set(zip(pts.pid.values[qids], eids)), dist
+
+
+@pytest.mark.parametrize("predicate", ['dwithin', 'intersects'])
+def test_find_nearest_geometries(make_network, predicate):
+    segs, pts = make_network()
+    res, no_cands = find_nearest_geometries(pts, segs, query_id='pid', max_distance=100, predicate=predicate,
+                                            check_diff=True)
+    ans, dist = brute_force(segs, pts, 100)
+
+    assert set(zip(res.pid, res.eid)) == ans
+    assert np.allclose(res.dist_p2c, dist[res.pid.values - 100, res.eid.values])
+    assert no_cands == set(pts.pid) - set(res.pid)
+
+
+def test_find_nearest_geometries_project(make_network):
+    segs, pts = make_network()
+    res, _ = find_nearest_geometries(pts, segs, query_id='pid', max_distance=100, project=True)
+    ans, _ = find_nearest_geometries(pts, segs, query_id='pid', max_distance=100)
+
+    assert np.allclose(res.dist_p2c, ans.dist_p2c)
+    assert ((res.offset >= 0) & (res.offset <= res.edge_len)).all()
+    assert np.allclose(shapely.distance(res.proj_point.values, res.query_geom.values), res.dist_p2c)
+
+
+@pytest.mark.parametrize("dedup", [False, True])
+def test_grouped_top_k_matches_pandas(dedup):
+    import pandas as pd
+    from maptools.query import filter_top_k_candidates
+
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({'pid': rng.integers(0, 1000, 20000) * 7, 'way': rng.integers(0, 50, 20000),
+                       'dist_p2c': rng.uniform(0, 100, 20000)})
+    ans = df.sort_values(['pid', 'dist_p2c'])
+    if dedup:
+        ans = ans.drop_duplicates(['pid', 'way'])
+    ans = ans.groupby('pid').head(3).reset_index(drop=True)
+
+    res = filter_top_k_candidates(df, 'pid', 3, way_id='way' if dedup else None)
+    assert res.equals(ans)
+
+
+def test_find_nearest_geometries_top_k(make_network):
+    segs, pts = make_network()
+    res, _ = find_nearest_geometries(pts, segs, query_id='pid', max_distance=300, top_k=2, way_id='way')
+    ans, _ = find_nearest_geometries(pts, segs, query_id='pid', max_distance=300)
+    ans = ans.sort_values(['pid', 'dist_p2c']).drop_duplicates(['pid', 'way']).groupby('pid').head(2)
+
+    assert list(zip(res.pid, res.eid)) == list(zip(ans.pid, ans.eid))
+
+
+@pytest.mark.parametrize("predicate", ['dwithin', 'intersects'])
+def test_find_nearest_geometries_packed_rtree(make_network, tmp_path, predicate):
+    from maptools.geo.spatial_index import PackedRTree, load_or_build_sindex, sindex_path
+
+    segs, pts = make_network()
+    tree = load_or_build_sindex(segs.geometry, tmp_path / 'network.ckpt')
+    assert sindex_path(tmp_path / 'network.ckpt').exists()
+    assert isinstance(PackedRTree.load(sindex_path(tmp_path / 'network.ckpt')).nodes, np.memmap)
+
+    res, _ = find_nearest_geometries(pts, segs, query_id='pid', max_distance=100, predicate=predicate, sindex=tree)
+    ans, _ = find_nearest_geometries(pts, segs, query_id='pid', max_distance=100, predicate=predicate)
+    assert sorted(zip(res.pid, res.eid)) == sorted(zip(ans.pid, ans.eid))
+
+
+def test_load_or_build_sindex_detects_rebuilt_network(make_network, tmp_path):
+    import os
+    from maptools.geo.spatial_index import load_or_build_sindex
+
+    segs, _ = make_network()
+    tree = load_or_build_sindex(segs.geometry, tmp_path / 'network.ckpt')
+    assert load_or_build_sindex(segs.geometry, tmp_path / 'network.ckpt').fingerprint == tree.fingerprint
+
+    # 边数不变，几何变化
+    moved = segs.geometry.translate(1000, 1000)
+    tree = load_or_build_sindex(moved, tmp_path / 'network.ckpt')
+    assert np.allclose(tree.nodes['minx'][:len(segs)].min(), moved.bounds.minx.min())
+
+    # checkpoint 重新保存
+    ckpt = tmp_path / 'network.ckpt'
+    ckpt.write_bytes(b'v1')
+    fingerprint = load_or_build_sindex(moved, ckpt).fingerprint
+    os.utime(ckpt, ns=(0, 0))
+    assert load_or_build_sindex(moved, ckpt).fingerprint != fingerprint
+
+
+@pytest.mark.parametrize("predicate", ['dwithin', 'intersects'])
+def test_find_nearest_geometries_grid_backend(make_network, predicate):
+    segs, pts = make_network()
+    res, _ = find_nearest_geometries(pts, segs, query_id='pid', max_distance=100, predicate=predicate, backend='grid')
+    ans, _ = find_nearest_geometries(pts, segs, query_id='pid', max_distance=100, predicate=predicate)
+    assert sorted(zip(res.pid, res.eid)) == sorted(zip(ans.pid, ans.eid))
+
+
+def test_find_nearest_geometries_batch(make_network):
+    segs, pts = make_network()
+    pts = pts.assign(traj_id=np.arange(len(pts)) % 7 * 10)
+    cands, traj_ids, offsets = find_nearest_geometries_batch(
+        pts.sample(frac=1, random_state=0), segs, 'traj_id', 'pid', max_distance=200, top_k=3)
+    assert list(traj_ids) == list(range(0, 70, 10))
+    assert offsets[-1] == len(cands)
+
+    for traj_id, df in iter_candidate_groups(cands, traj_ids, offsets):
+        traj = pts.query("traj_id == @traj_id").sample(frac=1, random_state=0)
+        ans, _ = find_nearest_geometries(traj, segs, query_id='pid', max_distance=200, top_k=3)
+        assert (df.traj_id == traj_id).all()
+        assert sorted(zip(df.pid, df.eid, df.dist_p2c)) == sorted(zip(ans.pid, ans.eid, ans.dist_p2c))
@@ -0,0 +1,209 @@
+import itertools
+import warnings
+import numpy as np
+import pytest
+import shapely
+import geopandas as gpd
+
+from maptools.geo.geo_utils import convert_geom_to_utm_crs
+from maptools.trajectory.cleaner import calculate_angle_between_sides, get_outliers_thred_by_iqr, \
+    clean_drift_traj_points, clean_drift_mask, find_updates, filter_by_point_update_policy, update_policy_index, \
+    simplify_traj_index, simplify_traj_mask, simplify_traj_points
+
+pytestmark = pytest.mark.filterwarnings("ignore:Boolean Series key will be reindexed")
+
+
+# GeoSeries `shift` + `.distance` 的原实现，作为回归测试的参照
+
+
+def legacy_clean_drift_traj_points(data, col=['tid', 'dt', 'geometry'],
+                     method='twoside', speed_limit=None, dis_limit=None,
+                     angle_limit=30, alpha=1, strict=False, verbose=False):
+    [Rid, Time, Geometry] = col
+    data.drop_duplicates(subset=[Rid, Time], inplace=True)
+    
+    def _preprocess(data):
+        df = data[col].copy()
+        df = df.sort_values(by=[Rid, Time])
+
+        if df.crs.to_epsg() == 4326:
+            convert_geom_to_utm_crs(df, inplace=True)
+        
+        for i in [Rid, Geometry, Time]:
+            df[i + '_pre'] = df[i].shift()
+            df[i + '_next'] = df[i].shift(-1)
+            
+        df['dis_pre'] = df[Geometry].distance(df[Geometry + '_pre'])
+        df['dis_next'] = df[Geometry].distance(df[Geometry + '_next'])
+        df['dis_prenext'] = df[Geometry + '_pre'].distance(df[Geometry + '_next'])
+
+        df['timegap_pre'] = df[Time] - df[Time + '_pre']
+        df['timegap_next'] = df[Time + '_next'] - df[Time]
+        df['timegap_prenext'] = df[Time + '_next'] - df[Time + '_pre']
+
+        df['speed_pre'] = df['dis_pre'] / df['timegap_pre'] * 3.6
+        df['speed_next'] = df['dis_next'] / df['timegap_next'] * 3.6
+        df['speed_prenext'] = df['dis_prenext'] / df['timegap_prenext'] * 3.6
+        
+        return df
+
+    def op(a, b):
+        return a | b if not strict else a & b
+
+    df = _preprocess(data)
+    
+    # traj mask
+    traj_mask = (df[Rid + '_pre'] == df[Rid])
+    if method == 'twoside':
+        traj_mask = traj_mask & (df[Rid + '_next'] == df[Rid])
+
+    # speed limit
+    speed_mask = False
+    if speed_limit is not None:
+        if speed_limit <= 0:
+            _, speed_limit = get_outliers_thred_by_iqr(df['speed_pre'], alpha)
+        
+        if method == 'oneside':
+            speed_mask = df['speed_pre'] > speed_limit
+        elif method == 'twoside':
+            speed_mask = op(df['speed_pre'] > speed_limit, df['speed_next'] > speed_limit)
+            if strict:
+                speed_mask &= (df['speed_prenext'] < speed_limit)
+
+    # distance limit
+    dis_mask = False
+    if dis_limit is not None:
+        if dis_limit <= 0:
+            _, dis_limit = get_outliers_thred_by_iqr(df['dis_pre'], alpha)
+        if method == 'oneside':
+            dis_mask = df['dis_pre'] > dis_limit
+        elif method == 'twoside':
+            dis_mask = op(df['dis_pre'] > dis_limit, df['dis_next'] > dis_limit)
+            if strict:
+                dis_mask &= (df['dis_prenext'] < dis_limit)
+
+    # angle limit
+    angle_mask = False
+    if angle_limit is not None:
+        df['angle'] = 180 - calculate_angle_between_sides(df['dis_pre'], df['dis_next'], df['dis_prenext'])
+        angle_mask = (df['angle'] > angle_limit).fillna(False)
+    mask = (traj_mask & (speed_mask | dis_mask | angle_mask))
+    
+    return data[~mask], df
+
+
+PARAMS = list(itertools.product(['oneside', 'twoside'], [None, 0, 50], [None, 0, 800], [None, 30], [False, True]))
+
+
+@pytest.mark.parametrize("seed,n_traj", [(0, 1), (1, 1), (2, 1), (3, 1), (4, 4), (5, 6)])
+def test_clean_drift_traj_points_matches_legacy(make_trajs, seed, n_traj):
+    warnings.simplefilter('ignore', RuntimeWarning)
+    # seed 为 3 的倍数时每条轨迹 50 个点，且第 5~7 个点重合
+    df = make_trajs(n_traj, n=None if seed % 3 else 50, seed=seed, stop=None if seed % 3 else slice(5, 8))
+    for method, speed_limit, dis_limit, angle_limit, strict in PARAMS:
+        kwargs = dict(method=method, speed_limit=speed_limit, dis_limit=dis_limit, angle_limit=angle_limit,
+                      alpha=1.5, strict=strict)
+        ans, _ = legacy_clean_drift_traj_points(df.copy(), **kwargs)
+        res, feats = clean_drift_traj_points(df.copy(), **kwargs)
+        assert list(res.index) == list(ans.index), kwargs
+        assert len(feats) == len(df.drop_duplicates(['tid', 'dt']))
+
+
+def test_clean_drift_traj_points_lnglat(make_trajs):
+    df = make_trajs(3, seed=1, crs=4326)
+    ans, _ = legacy_clean_drift_traj_points(df.copy(), speed_limit=0, dis_limit=0, angle_limit=30)
+    res, _ = clean_drift_traj_points(df.copy(), speed_limit=0, dis_limit=0, angle_limit=30)
+    assert list(res.index) == list(ans.index)
+
+
+def test_clean_drift_mask_per_traj(make_trajs):
+    warnings.simplefilter('ignore', RuntimeWarning)
+    df = make_trajs(5, seed=4).sort_values(['tid', 'dt'], kind='stable')
+    offsets = np.concatenate([[0], np.cumsum(df.tid.value_counts(sort=False).sort_index().values)])
+    for method, speed_limit, dis_limit, angle_limit, strict in PARAMS[::5]:
+        kwargs = dict(method=method, speed_limit=speed_limit, dis_limit=dis_limit, angle_limit=angle_limit,
+                      alpha=1.5, strict=strict)
+        keep = clean_drift_mask(df.geometry.x.values, df.geometry.y.values, df.dt.values, offsets, **kwargs)
+        ans = [legacy_clean_drift_traj_points(traj.copy(), **kwargs)[0] for _, traj in df.groupby('tid')]
+        assert list(df.index[keep]) == [i for traj in ans for i in traj.index]
+
+
+def test_update_policy_index_matches_per_traj():
+    rng = np.random.default_rng(3)
+    lens = rng.integers(0, 60, 40)
+    offsets = np.concatenate([[0], np.cumsum(lens)])
+    xy = np.cumsum(rng.normal(0, 80, (offsets[-1], 2)), 0)
+    xy[offsets[1:-1][lens[1:] > 3] - 1] = xy[offsets[1:-1][lens[1:] > 3] - 2]  # 末点与前一点重合
+
+    for keep_last in [True, False]:
+        ans = []
+        for start, end in zip(offsets[:-1], offsets[1:]):
+            if start == end:
+                continue
+            idx = find_updates(xy[start: end], 200) + start
+            if keep_last and idx[-1] != end - 1 and (xy[idx[-1]] != xy[end - 1]).any():
+                idx = np.append(idx, end - 1)
+            ans.append(idx)
+        assert np.array_equal(update_policy_index(xy, offsets, 200, keep_last), np.concatenate(ans))
+
+
+def test_filter_by_point_update_policy_multi_traj():
+    rng = np.random.default_rng(4)
+    n = 600
+    df = gpd.GeoDataFrame({'tid': rng.integers(0, 5, n)},
+                          geometry=gpd.points_from_xy(*np.cumsum(rng.normal(0, 100, (n, 2)), 0).T), crs=32650)
+    df = df.sample(frac=1, random_state=1)
+
+    res = filter_by_point_update_policy(df, 250, traj_id_col='tid')
+    ans = [filter_by_point_update_policy(grp, 250) for _, grp in df.groupby('tid')]
+    assert list(res.index) == [i for grp in ans for i in grp.index]
+
+
+@pytest.mark.parametrize("tolerance", [0, 50, 300])
+def test_simplify_traj_index_matches_geos(tolerance):
+    rng = np.random.default_rng(5)
+    lens = rng.integers(0, 80, 30)
+    offsets = np.concatenate([[0], np.cumsum(lens)])
+    xy = np.cumsum(rng.normal(0, 100, (offsets[-1], 2)), 0)
+
+    idx = simplify_traj_index(xy, tolerance, offsets)
+    seg = np.repeat(np.arange(len(lens)), lens)
+    for s, (start, end) in enumerate(zip(offsets[:-1], offsets[1:])):
+        if end - start < 2:
+            assert np.array_equal(idx[seg[idx] == s], np.arange(start, end))
+            continue
+        line = shapely.simplify(shapely.linestrings(xy[start: end]), tolerance, preserve_topology=False)
+        assert np.array_equal(xy[idx[seg[idx] == s]], shapely.get_coordinates(line))
+
+
+def test_simplify_traj_points_overlapping():
+    # 点 1 与拐点 5 重合，但位于 0-2 的直线上，不应保留
+    xy = np.array([[0, 0], [100, 0], [200, 0], [200, 100], [100, 100], [100, 0], [0, -100]], dtype=float)
+    df = gpd.GeoDataFrame({'dt': np.arange(len(xy))}, geometry=gpd.points_from_xy(*xy.T), crs=32650)
+
+    res = simplify_traj_points(df, 10)
+    assert list(res.index) == [0, 2, 3, 4, 5, 6]
+
+
+def test_cleaners_with_empty_geometries(make_trajs):
+    warnings.simplefilter('ignore', RuntimeWarning)
+    df = make_trajs(2, n=30, seed=1)
+    df.loc[[3, 20], 'geometry'] = [shapely.Point(), None]
+    ans, _ = legacy_clean_drift_traj_points(df.copy(), speed_limit=0, dis_limit=0, angle_limit=30)
+    res, _ = clean_drift_traj_points(df.copy(), speed_limit=0, dis_limit=0, angle_limit=30)
+    assert list(res.index) == list(ans.index)
+
+    # 空几何无法参与点更新与化简，直接报错而不是与其余行错位
+    with pytest.raises(ValueError):
+        filter_by_point_update_policy(df, 250, traj_id_col='tid')
+    with pytest.raises(ValueError):
+        simplify_traj_points(df[df.tid == 0].copy(), 10)
+
+
+def test_simplify_traj_mask_sed():
+    # 空间上共线但速度不均匀的点，SED 会保留速度变化处
+    x = np.array([0, 10, 20, 30, 200, 370, 380, 390, 400], dtype=float)
+    t = np.arange(len(x), dtype=float)
+    assert simplify_traj_mask(x, np.zeros_like(x), 5).tolist() == [True] + [False] * 7 + [True]
+    keep = simplify_traj_mask(x, np.zeros_like(x), 5, t=t)
+    assert keep[[0, 3, 5, 8]].all() and keep.sum() < len(x)
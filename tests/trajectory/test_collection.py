@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+
+from maptools.trajectory import Trajectory, TrajectoryCollection
+
+
+@pytest.fixture
+def make_df(make_trajs):
+    """乱序、轨迹编号不连续的多条轨迹"""
+    def _make(n_traj=30):
+        df = make_trajs(n_traj, crs=4326, jump_rate=0.05, sort_dt=True)
+        return df.assign(tid=df.tid * 3).sample(frac=1, random_state=0)
+
+    return _make
+
+
+@pytest.mark.parametrize("params", [
+    dict(radius=300, speed_limit=0, dis_limit=0, angle_limit=45, alpha=2, tolerance=300),
+    dict(radius=100, speed_limit=80, dis_limit=None, angle_limit=60, alpha=3, strict=True, tolerance=None),
+])
+def test_collection_matches_trajectory(make_df, params):
+    df = make_df()
+    trajs = TrajectoryCollection(df, 'tid', utm_crs=32650)
+    trajs.preprocess(**params)
+    assert len(trajs) == 30 and trajs.mask.sum() == len(trajs.points)
+
+    for traj_id, pts in df.groupby('tid'):
+        ans = Trajectory(pts, traj_id=traj_id, traj_id_col='tid', utm_crs=32650)
+        ans.preprocess(**params)
+        traj = trajs[traj_id]
+        assert list(traj.points.index) == list(ans.points.index)
+        assert list(traj.raw_df.columns) == list(ans.raw_df.columns)
+        assert np.allclose(traj.raw_df.get_coordinates().values, ans.raw_df.get_coordinates().values)
+
+
+def test_collection_views_share_the_mask(make_df):
+    trajs = TrajectoryCollection(make_df(5), 'tid', utm_crs=32650)
+    traj = next(iter(trajs))
+    traj.filter_by_point_update_policy(radius=500)
+    assert trajs.mask[trajs.offsets[0]: trajs.offsets[1]].sum() == len(traj.points)
+    assert trajs.mask[trajs.offsets[1]:].all()
@@ -0,0 +1,59 @@
+import pytest
+import numpy as np
+
+from maptools.trajectory import Trajectory
+from maptools.trajectory.cleaner import filter_by_point_update_policy, simplify_traj_mask
+
+
+@pytest.fixture
+def make_points(make_trajs):
+    """单条轨迹、时间严格递增、不含轨迹编号列"""
+    return lambda: make_trajs(n=400, crs=4326, sort_dt=True).drop(columns='tid')
+
+
+def test_trajectory_views_do_not_touch_input(make_points):
+    df = make_points()
+    shuffled = df.sample(frac=1, random_state=0)
+    traj = Trajectory(shuffled, traj_id=1)
+
+    assert shuffled.crs == df.crs and shuffled.geometry.equals(df.geometry.loc[shuffled.index])
+    assert traj.raw_df.crs.is_projected and list(traj.raw_df.index) == list(df.index)
+    assert list(traj.raw_df.columns) == list(df.columns)
+    assert np.allclose(traj.raw_df.to_crs(4326).get_coordinates().values, df.get_coordinates().values)
+    assert (traj.points.tid == 1).all() and traj.size() == len(df)
+
+
+def test_trajectory_stages_only_update_mask(make_points):
+    traj = Trajectory(make_points(), traj_id=1)
+    ans = filter_by_point_update_policy(traj.raw_df, 300)
+    pts = traj.filter_by_point_update_policy(radius=300)
+    assert pts is traj.points and list(pts.index) == list(ans.index)
+
+    traj.clean_drift_points(speed_limit=0, dis_limit=0, angle_limit=45, alpha=2)
+    pts = traj.points
+    traj.simplify(300)
+    keep = simplify_traj_mask(pts.geometry.x.values, pts.geometry.y.values, 300)
+    assert list(traj.points.index) == list(pts.index[keep])
+    assert traj.mask.sum() == len(traj.points) < len(pts)
+
+
+def test_trajectory_constant_traj_id_column_restored(make_points):
+    df = make_points()
+    df.insert(0, 'tid', np.int32(7))
+    traj = Trajectory(df, traj_id=7)
+    assert 'tid' not in traj._df.columns
+
+    raw = traj.raw_df
+    assert list(raw.columns) == list(df.columns) and raw['tid'].dtype == np.int32 and (raw['tid'] == 7).all()
+
+    # 与 traj_id 不一致的列照常保存
+    traj = Trajectory(df, traj_id=8)
+    assert 'tid' in traj._df.columns and (traj.raw_df['tid'] == 7).all()
+
+
+def test_trajectory_empty_frame(make_points):
+    traj = Trajectory(make_points().iloc[:0], traj_id=1)
+    assert traj.size() == 0 and not traj.is_valid()
+
+    traj.preprocess(tolerance=100)
+    assert len(traj.points) == 0 and list(traj.points.columns) == list(traj.raw_df.columns) + ['tid']